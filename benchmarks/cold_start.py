@@ -0,0 +1,190 @@
+"""Import-time and cold-start report for each dashboard page.
+
+Every measurement runs in a fresh interpreter, so nothing is shared between
+pages:
+
+* import: ``python -X importtime -c "import views.<page>"`` -- the total
+  import cost of the page module, and its share over ``views.shared``;
+* cold start: the whole app (``poc.py``) run once under Streamlit's
+  ``AppTest`` with that page selected, then rerun once (warm), with the
+  process's peak RSS and which heavy libraries ended up loaded.
+
+One-off work (generating the synthetic data, building indexes, first
+background jobs) is done in a separate warm-up process first, so the report
+tracks code and import cost rather than first-install cost.
+
+Usage::
+
+    python benchmarks/cold_start.py --output cold_start.json
+    python benchmarks/cold_start.py --baseline cold_start.json   # exit 1 on regressions
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sagara.config import JOBS_DB  # noqa: E402
+from views import PAGES  # noqa: E402
+
+# Libraries only some pages need (Streamlit itself already pulls in plotly.graph_objects)
+HEAVY = ("plotly.express", "plotly.subplots", "folium", "streamlit_folium")
+
+_RUN_PAGE = """
+import json, resource, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({script!r}, default_timeout=600)
+at.session_state["page"] = {page!r}
+at.run()
+cold = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+warm = time.perf_counter() - start
+print(json.dumps({{
+    "cold_s": cold,
+    "warm_s": warm,
+    "errors": [str(e.value) for e in at.exception],
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+
+def _python(code, *flags):
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout, result.stderr
+
+
+def import_time(module):
+    """Cumulative import time of ``module`` in a fresh interpreter, in seconds."""
+    _, trace = _python(f"import {module}", "-X", "importtime")
+    total = 0
+    for line in trace.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports only; nested ones are already in their parent's total
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def own_import_time(module):
+    """Import time of ``module`` on top of ``views.shared``, which every page already has loaded."""
+    stdout, _ = _python(
+        "import time, views.shared\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)"
+    )
+    return float(stdout.strip().splitlines()[-1])
+
+
+def run_page(page):
+    stdout, _ = _python(_RUN_PAGE.format(script=str(ROOT / "poc.py"), page=page, heavy=HEAVY))
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def wait_for_jobs(timeout=600):
+    if not JOBS_DB.exists():
+        return
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with sqlite3.connect(JOBS_DB, timeout=30) as db:
+            (active,) = db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()
+        if not active:
+            return
+        time.sleep(1)
+
+
+def warm_up():
+    """Visit every page once in one process and let its background jobs finish."""
+    pages = list(PAGES)
+    code = (
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({str(ROOT / 'poc.py')!r}, default_timeout=1200)\n"
+        "at.run()\n"
+        f"for page in {pages!r}:\n"
+        "    at.sidebar.selectbox[0].set_value(page).run()\n"
+        "import sqlite3, time\n"
+        f"db = sqlite3.connect({str(JOBS_DB)!r})\n"
+        "while db.execute(\"SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')\").fetchone()[0]:\n"
+        "    time.sleep(1)\n"
+    )
+    _python(code)
+
+
+def report(repeat):
+    rows = {}
+    shell = import_time("views.shared")
+    for page, module in PAGES.items():
+        imports = [import_time(f"views.{module}") for _ in range(repeat)]
+        own = [own_import_time(f"views.{module}") for _ in range(repeat)]
+        runs = [run_page(page) for _ in range(repeat)]
+        wait_for_jobs()
+        rows[module] = {
+            "page": page,
+            "import_s": statistics.median(imports),
+            "page_import_s": statistics.median(own),
+            "cold_s": statistics.median(run["cold_s"] for run in runs),
+            "warm_s": statistics.median(run["warm_s"] for run in runs),
+            "rss_mb": max(run["rss_mb"] for run in runs),
+            "loaded": runs[0]["heavy"],
+            "errors": runs[0]["errors"],
+        }
+    return {"python": sys.version.split()[0], "repeat": repeat, "shared_import_s": shell, "pages": rows}
+
+
+def regressions(current, baseline, tolerance):
+    found = []
+    for module, row in current["pages"].items():
+        before = baseline["pages"].get(module)
+        if before is None:
+            continue
+        for metric in ("import_s", "cold_s", "warm_s"):
+            if row[metric] > before[metric] * (1 + tolerance) and row[metric] - before[metric] > 0.05:
+                found.append(f"{module}.{metric}: {before[metric]:.3f}s -> {row[metric]:.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement (median is kept)")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, as a fraction")
+    parser.add_argument("--no-warm-up", action="store_true", help="measure first-install cost as well")
+    args = parser.parse_args()
+
+    if not args.no_warm_up:
+        warm_up()
+    result = report(args.repeat)
+    print(f"views.shared (every page): {result['shared_import_s']:.3f}s import")
+    print(f"{'page':<12}{'import':>9}{'own':>9}{'cold':>9}{'warm':>9}{'RSS MB':>9}  heavy libraries")
+    for module, row in result["pages"].items():
+        print(
+            f"{module:<12}{row['import_s']:>8.3f}s{row['page_import_s']:>8.3f}s{row['cold_s']:>8.3f}s"
+            f"{row['warm_s']:>8.3f}s{row['rss_mb']:>9.0f}  {', '.join(row['loaded']) or '-'}"
+            + (f"  ERRORS: {row['errors']}" if row["errors"] else "")
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        found = regressions(result, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
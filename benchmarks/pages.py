@@ -0,0 +1,205 @@
+"""Rerun latency, peak memory and payload size of every dashboard page at scale.
+
+The app is pointed (through ``SAGARA_DATA_DIR``) at a separate data
+directory whose oceanographic table is generated at the requested scale --
+by default a week of per-minute readings from all 847 sensors, up to years
+of them with ``--days`` -- and written to disk chunk by chunk.  The scale is
+recorded next to the data, which is only regenerated when it changes.
+
+Each page then runs headlessly under Streamlit's ``AppTest`` in a fresh
+process: one cold run, then ``--reruns`` timed reruns, recording latency
+percentiles, the process's peak RSS and the size of the messages the page
+sends to the browser.  As in ``cold_start.py``, one-off work (indexes,
+pyramids, first background jobs) is done in a warm-up pass first.
+
+Usage::
+
+    python benchmarks/pages.py --output pages.json
+    python benchmarks/pages.py --days 730 --output pages-2y.json
+    python benchmarks/pages.py --baseline pages.json   # exit 1 on regressions
+
+The run exits 1 as well when any page raises, so errors cannot pass as
+timings.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sagara.store import ColumnStore  # noqa: E402
+from sagara.synth import generate_marine_data  # noqa: E402
+from views import PAGES  # noqa: E402
+
+_RUN_PAGE = """
+import json, resource, time
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+# Every run's forward messages are what a browser would receive
+sizes = []
+parse = local_script_runner.parse_tree_from_messages
+def measure(messages):
+    sizes.append(sum(message.ByteSize() for message in messages))
+    return parse(messages)
+local_script_runner.parse_tree_from_messages = measure
+
+at = AppTest.from_file({script!r}, default_timeout=1200)
+at.session_state["page"] = {page!r}
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+reruns = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({{
+    "cold_s": cold,
+    "reruns_s": reruns,
+    "payload_bytes": sizes[-1],
+    "errors": [str(e.value) for e in at.exception],
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+_WARM_UP = """
+import sqlite3, time
+from streamlit.testing.v1 import AppTest
+from sagara.config import JOBS_DB
+at = AppTest.from_file({script!r}, default_timeout=3600)
+at.run()
+for page in {pages!r}:
+    at.sidebar.selectbox[0].set_value(page).run()
+db = sqlite3.connect(JOBS_DB)
+while db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]:
+    time.sleep(1)
+"""
+
+
+def _python(code, data_dir):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "SAGARA_DATA_DIR": str(data_dir)},
+    )
+    return result.stdout
+
+
+def prepare_data(data_dir, scale):
+    """Generate the dataset for ``scale`` under ``data_dir`` unless it is already there."""
+    marker = data_dir / "scale.json"
+    if marker.exists() and json.loads(marker.read_text()) == scale:
+        return 0.0
+    shutil.rmtree(data_dir, ignore_errors=True)
+    data_dir.mkdir(parents=True)
+    start = time.perf_counter()
+    generate_marine_data(
+        ColumnStore(data_dir / "store"), seed=scale["seed"], start=scale["start"], end=scale["end"],
+        freq=scale["freq"], chunk_rows=scale["chunk_rows"],
+    )
+    marker.write_text(json.dumps(scale))
+    return time.perf_counter() - start
+
+
+def warm_up(data_dir):
+    """Visit every page once in one process and let its background jobs finish."""
+    _python(_WARM_UP.format(script=str(ROOT / "poc.py"), pages=list(PAGES)), data_dir)
+
+
+def run_page(page, reruns, data_dir):
+    stdout = _python(_RUN_PAGE.format(script=str(ROOT / "poc.py"), page=page, reruns=reruns), data_dir)
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_s": cuts[49], "p95_s": cuts[94], "max_s": max(samples)}
+
+
+def report(data_dir, reruns):
+    rows = {}
+    for page, module in PAGES.items():
+        run = run_page(page, reruns, data_dir)
+        rows[module] = {
+            "page": page,
+            "cold_s": run["cold_s"],
+            **percentiles(run["reruns_s"]),
+            "rss_mb": run["rss_mb"],
+            "payload_kb": run["payload_bytes"] / 1024,
+            "errors": run["errors"],
+        }
+    return rows
+
+
+def regressions(current, baseline, tolerance):
+    found = []
+    for module, row in current["pages"].items():
+        before = baseline["pages"].get(module)
+        if before is None or baseline["scale"] != current["scale"]:
+            continue
+        for metric, floor in (("p50_s", 0.05), ("p95_s", 0.05), ("rss_mb", 50), ("payload_kb", 64)):
+            if row[metric] > before[metric] * (1 + tolerance) and row[metric] - before[metric] > floor:
+                found.append(f"{module}.{metric}: {before[metric]:.3f} -> {row[metric]:.3f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=float, default=7, help="span of generated readings, from 2024-01-01")
+    parser.add_argument("--freq", default="1min", help="reading interval of every sensor (pandas frequency)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows generated and written at a time")
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data" / "bench", help="where the scaled data lives")
+    parser.add_argument("--reruns", type=int, default=20, help="timed reruns per page")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, as a fraction")
+    args = parser.parse_args()
+
+    start = pd.Timestamp("2024-01-01")
+    # The last reading falls one interval before the end of the span
+    end = start + pd.Timedelta(days=args.days) - pd.tseries.frequencies.to_offset(args.freq)
+    scale = {"start": str(start), "end": str(end), "freq": args.freq, "seed": args.seed, "chunk_rows": args.chunk_rows}
+    generated = prepare_data(args.data_dir, scale)
+    store = ColumnStore(args.data_dir / "store")
+    rows = store.num_rows("oceanographic")
+    if generated:
+        print(f"generated {rows:,} readings in {generated:.1f}s")
+    warm_up(args.data_dir)
+
+    result = {
+        "python": sys.version.split()[0],
+        "scale": {**scale, "rows": rows},
+        "reruns": args.reruns,
+        "pages": report(args.data_dir, args.reruns),
+    }
+    print(f"{rows:,} oceanographic rows, {args.reruns} reruns per page")
+    print(f"{'page':<12}{'cold':>9}{'p50':>9}{'p95':>9}{'max':>9}{'RSS MB':>9}{'KB sent':>10}")
+    for module, row in result["pages"].items():
+        print(
+            f"{module:<12}{row['cold_s']:>8.3f}s{row['p50_s']:>8.3f}s{row['p95_s']:>8.3f}s{row['max_s']:>8.3f}s"
+            f"{row['rss_mb']:>9.0f}{row['payload_kb']:>10.1f}"
+            + (f"  ERRORS: {row['errors']}" if row["errors"] else "")
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    failed = [module for module, row in result["pages"].items() if row["errors"]]
+    found = regressions(result, json.loads(args.baseline.read_text()), args.tolerance) if args.baseline else []
+    for line in found:
+        print(f"REGRESSION {line}")
+    if failed:
+        print(f"FAILED pages raised errors: {', '.join(failed)}")
+    if failed or found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Backend services for the SĀGARA marine data portal (poc.py)."""
@@ -0,0 +1,203 @@
+"""Incremental rolling-window statistics per station.
+
+Every window is a fixed ring of ``BUCKETS`` time buckets, each holding the
+count, sum, sum of squares, min, max and time moments of the readings that
+fell into it.  A batch of readings is reduced per bucket with one
+``reduceat`` per moment, and buckets that slide out of the span are
+cleared whole, so a window's state stays a few kilobytes at any reading
+rate and history is never rescanned.  The window's trailing edge moves in
+steps of ``span / BUCKETS``.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+VARIABLES = ("Temperature", "Salinity", "pH", "Dissolved_Oxygen")
+WINDOWS = {"7d": pd.Timedelta(days=7), "30d": pd.Timedelta(days=30), "90d": pd.Timedelta(days=90)}
+# Buckets per window: the 90-day window moves in 6-hour steps, the 7-day one in 28 minutes
+BUCKETS = 360
+
+_NS_PER_DAY = 86400e9
+_MOMENTS = ("n", "sum_x", "sum_xx", "sum_t", "sum_tt", "sum_tx")
+
+
+class RollingWindow:
+    """Rolling statistics for a vector of variables over a time span.
+
+    Times are float days relative to the first reading and values are
+    shifted by each variable's first reading, so the power sums keep their
+    precision; missing values (NaN) are skipped per variable.
+    """
+
+    def __init__(self, span, n_vars, buckets=BUCKETS):
+        self.width = max(1, pd.Timedelta(span).value // buckets)
+        self.buckets = buckets
+        # Absolute index (time // width) of the newest bucket
+        self.head = None
+        self.origin = None
+        self.shift = np.full(n_vars, np.nan)
+        for name in _MOMENTS:
+            setattr(self, name, np.zeros((buckets, n_vars)))
+        self.low = np.full((buckets, n_vars), np.inf)
+        self.high = np.full((buckets, n_vars), -np.inf)
+
+    def update(self, time_ns, values):
+        self.update_batch(np.array([time_ns], dtype=np.int64), np.asarray(values, dtype=np.float64)[None])
+
+    def update_batch(self, times_ns, values):
+        """Add readings at ``times_ns``, in any order; ``values`` is ``(n, variables)``."""
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(times_ns):
+            return
+        if self.origin is None:
+            self.origin = int(times_ns.min())
+        ok = ~np.isnan(values)
+        fresh = np.isnan(self.shift) & ok.any(axis=0)
+        if fresh.any():
+            first = values[np.argmax(ok, axis=0), np.arange(values.shape[1])]
+            self.shift = np.where(fresh, first, self.shift)
+        index = times_ns // self.width
+        self._advance(int(index.max()))
+        # Readings older than the window (late arrivals) fall off the ring
+        live = index > self.head - self.buckets
+        if not live.all():
+            index, times_ns, values, ok = index[live], times_ns[live], values[live], ok[live]
+            if not len(index):
+                return
+        # Bucket runs of time-ordered readings, each reduced in one go
+        if (np.diff(index) < 0).any():
+            order = np.argsort(index, kind="stable")
+            index, times_ns, values, ok = index[order], times_ns[order], values[order], ok[order]
+        starts = np.flatnonzero(np.diff(index, prepend=index[0] - 1))
+        slots = index[starts] % self.buckets
+        x = np.where(ok, values - self.shift, 0.0)
+        t = np.where(ok, ((times_ns - self.origin) / _NS_PER_DAY)[:, None], 0.0)
+        for name, weights in (("n", ok.astype(np.float64)), ("sum_x", x), ("sum_xx", x * x),
+                              ("sum_t", t), ("sum_tt", t * t), ("sum_tx", t * x)):
+            getattr(self, name)[slots] += np.add.reduceat(weights, starts, axis=0)
+        self.low[slots] = np.minimum(self.low[slots], np.minimum.reduceat(np.where(ok, values, np.inf), starts, axis=0))
+        self.high[slots] = np.maximum(self.high[slots], np.maximum.reduceat(np.where(ok, values, -np.inf), starts, axis=0))
+
+    def _advance(self, newest):
+        """Move the head to bucket ``newest``, clearing the buckets that leave the window."""
+        if self.head is None:
+            self.head = newest
+            return
+        if newest <= self.head:
+            return
+        stale = np.arange(self.head + 1, newest + 1)[-self.buckets:] % self.buckets
+        for name in _MOMENTS:
+            getattr(self, name)[stale] = 0.0
+        self.low[stale] = np.inf
+        self.high[stale] = -np.inf
+        self.head = newest
+
+    def stats(self):
+        n, sx, sxx, st, stt, stx = (getattr(self, name).sum(axis=0) for name in _MOMENTS)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sx / n
+            var = np.where(n > 1, np.maximum(sxx - sx * mean, 0.0) / (n - 1), np.nan)
+            denom = n * stt - st ** 2
+            slope = np.where((n > 1) & (denom > 1e-12), (n * stx - st * sx) / denom, np.nan)
+        return {
+            "count": n.astype(np.int64),
+            "mean": np.where(n > 0, self.shift + mean, np.nan),
+            "std": np.sqrt(var),
+            "min": np.where(n > 0, self.low.min(axis=0), np.nan),
+            "max": np.where(n > 0, self.high.max(axis=0), np.nan),
+            "slope_per_day": slope,
+        }
+
+
+class AggregateEngine:
+    """Rolling windows for every station, fed in batches of readings."""
+
+    def __init__(self, variables=VARIABLES, windows=WINDOWS):
+        self.variables = tuple(variables)
+        self.windows = dict(windows)
+        self.stations = {}
+        self.last_time = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, table="oceanographic", variables=VARIABLES, windows=WINDOWS):
+        """Warm up fragment by fragment from only the tail of history the longest window can see."""
+        engine = cls(variables, windows)
+        time_column = store.time_column(table)
+        key_column = store.key_column(table)
+        _, last = store.stats(table, time_column)
+        if last is None:
+            return engine
+        since = last - max(engine.windows.values())
+        for chunk in store.scan(table, [time_column, key_column, *engine.variables], [(time_column, ">", since)]):
+            engine.update_batch(
+                chunk[key_column],
+                np.asarray(chunk[time_column], dtype="datetime64[ns]").view(np.int64),
+                np.column_stack([chunk[name] for name in engine.variables]).astype(np.float64),
+            )
+        return engine
+
+    def update(self, station, time_ns, values):
+        with self._lock:
+            self._update(station, np.array([time_ns], dtype=np.int64), np.asarray(values, dtype=np.float64)[None])
+
+    def update_batch(self, stations, times_ns, values):
+        """Apply readings, in any order; ``values`` is ``(n, variables)``."""
+        codes, names = pd.factorize(np.asarray(stations))
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        with self._lock:
+            for k, station in enumerate(names):
+                rows = order[bounds[k]:bounds[k + 1]]
+                self._update(str(station), times_ns[rows], values[rows])
+
+    def _update(self, station, times_ns, values):
+        windows = self.stations.get(station)
+        if windows is None:
+            windows = self.stations[station] = {
+                label: RollingWindow(span, len(self.variables)) for label, span in self.windows.items()
+            }
+        for window in windows.values():
+            window.update_batch(times_ns, values)
+        newest = int(times_ns.max())
+        self.last_time[station] = max(newest, self.last_time.get(station, newest))
+
+    def stats(self, station, window):
+        """``{statistic: {variable: value}}`` for one station and window label."""
+        with self._lock:
+            raw = self.stations[station][window].stats()
+        return {key: dict(zip(self.variables, values.tolist())) for key, values in raw.items()}
+
+    def snapshot(self, window, variable=None):
+        """One row per station (and variable) with the current window statistics."""
+        rows = []
+        with self._lock:
+            for station in sorted(self.stations):
+                raw = self.stations[station][window].stats()
+                for i, name in enumerate(self.variables):
+                    if variable is not None and name != variable:
+                        continue
+                    rows.append({
+                        "Station": station,
+                        "Variable": name,
+                        "Count": int(raw["count"][i]),
+                        "Mean": raw["mean"][i],
+                        "Std": raw["std"][i],
+                        "Min": raw["min"][i],
+                        "Max": raw["max"][i],
+                        "Trend_per_day": raw["slope_per_day"][i],
+                    })
+        return pd.DataFrame(rows)
+
+    def subscriber(self, station_of):
+        """Ingest callback mapping each sensor reading to its station via ``station_of``."""
+        def on_batch(sensors, times_ns, fields):
+            rows = np.column_stack([fields.get(name, np.full(len(sensors), np.nan)) for name in self.variables])
+            stations = [station_of.get(sensor) for sensor in sensors]
+            keep = [i for i, station in enumerate(stations) if station is not None]
+            self.update_batch([stations[i] for i in keep], times_ns[keep], rows[keep])
+        return on_batch
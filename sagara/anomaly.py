@@ -0,0 +1,377 @@
+"""Streaming spike and marine-heatwave detection across every station at once.
+
+Detection state is a handful of ``(station, variable)`` and per-station
+arrays, and each batch of readings updates them with vectorized scatter
+operations, so a batch costs the same however much history lies behind it:
+
+* Spikes: every reading's robust z-score ``0.6745 * (x - median) / MAD``
+  against a running median and MAD per station and variable; ``|z|`` above
+  ``SPIKE_Z`` is a spike.  Both are tracked by stochastic quantile
+  approximation -- each reading moves the estimate one step towards itself,
+  the step proportional to the current MAD, and a batch moves it by the
+  average of its readings' steps times their (capped) number -- so no
+  window of readings is kept, and a spike moves them no further than any
+  other reading.
+* Marine heatwaves (Hobday et al., 2016): readings accumulate into each
+  station's daily mean temperature.  When a day closes its mean is compared
+  with the station's climatological 90th percentile for that day of year;
+  ``HEATWAVE_DAYS`` consecutive days above it make a heatwave, which lasts
+  until a day falls back below.
+
+The climatology is the baseline: per station and day of year, the 90th
+percentile of the daily means within ``CLIMATOLOGY_HALF_WINDOW`` days
+across the store's history, smoothed over a month.  Daily sums are kept
+per fragment in a cache file, as the quality scores are, so a new store
+version only reads the fragments it adds.
+"""
+import json
+import os
+import threading
+import warnings
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+VARIABLES = ("Temperature", "Salinity", "pH", "Dissolved_Oxygen")
+HEATWAVE_VARIABLE = "Temperature"
+SPIKE_Z = 3.5
+# Smallest MAD a z-score is scaled by, so a near-constant series does not flag noise
+MIN_MAD = {"Temperature": 0.05, "Salinity": 0.02, "pH": 0.005, "Dissolved_Oxygen": 0.05}
+# Fraction of the MAD each reading moves the median and MAD estimates by, and the most
+# readings of one series a batch counts: a batch moves an estimate at most half a MAD
+QUANTILE_RATE = 0.05
+BATCH_STEPS = 10
+HEATWAVE_PERCENTILE = 90
+HEATWAVE_DAYS = 5
+CLIMATOLOGY_HALF_WINDOW = 5
+CLIMATOLOGY_SMOOTHING = 31
+# Readings the median and MAD start from, and the span spikes stay active for
+WARMUP = pd.Timedelta(days=2)
+SPIKE_ACTIVE = pd.Timedelta(hours=1)
+MAX_SPIKES = 1000
+
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def _day_of_year(days):
+    """0-based day of year of day numbers (days since 1970-01-01)."""
+    return pd.DatetimeIndex(np.asarray(days, dtype="datetime64[D]")).dayofyear.to_numpy() - 1
+
+
+def fragment_daily_sums(chunk, time_column, key_column, variable):
+    """``{"keys", "days", "sums", "counts"}`` of one fragment's readings, per key and day."""
+    values = np.asarray(chunk[variable], dtype=np.float64)
+    ok = ~np.isnan(values)
+    days = np.asarray(chunk[time_column]).astype("datetime64[ns]").view(np.int64)[ok] // _NS_PER_DAY
+    keys, key_codes = np.unique(np.asarray(chunk[key_column])[ok], return_inverse=True)
+    groups, codes = np.unique(np.stack([key_codes, days]), axis=1, return_inverse=True)
+    codes = codes.ravel()
+    return {
+        "keys": keys[groups[0]].tolist(),
+        "days": groups[1].tolist(),
+        "sums": np.bincount(codes, values[ok], len(groups[1])).tolist(),
+        "counts": np.bincount(codes, minlength=len(groups[1])).tolist(),
+    }
+
+
+def _circular_mean(field, width):
+    """Moving average over ``width`` days of year, wrapping around the year and skipping NaN."""
+    pad = width // 2
+    ok = ~np.isnan(field)
+    kernel = np.ones(width)
+    totals, counts = (
+        np.stack([np.convolve(np.concatenate([row[-pad:], row, row[:pad]]), kernel, "valid") for row in values])
+        for values in (np.where(ok, field, 0.0), ok.astype(np.float64))
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def climatology(daily, half_window=CLIMATOLOGY_HALF_WINDOW, percentile=HEATWAVE_PERCENTILE,
+                smoothing=CLIMATOLOGY_SMOOTHING):
+    """Per-day-of-year mean and ``percentile`` threshold of a ``(stations, days)`` daily-mean frame.
+
+    ``daily`` has one column per day number; returns two ``(stations, 366)``
+    arrays, NaN where a station has no history near that day of year.
+    """
+    days = daily.columns.to_numpy(dtype=np.int64)
+    if not len(days) or not len(daily):
+        return np.full((len(daily), 366), np.nan), np.full((len(daily), 366), np.nan)
+    years = np.asarray(days, dtype="datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+    # (stations, years, day of year), then each day of year's +/- half_window neighbours as extra "years"
+    grid = np.full((len(daily), years.max() - years.min() + 1, 366), np.nan)
+    grid[:, years - years.min(), _day_of_year(days)] = daily.to_numpy(dtype=np.float64)
+    nearby = np.concatenate([np.roll(grid, k, axis=2) for k in range(-half_window, half_window + 1)], axis=1)
+    with warnings.catch_warnings():
+        # All-NaN days of year (no history there) come out as NaN, which is what we want
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(nearby, axis=1)
+        threshold = np.nanpercentile(nearby, percentile, axis=1)
+    return _circular_mean(mean, smoothing), _circular_mean(threshold, smoothing)
+
+
+def daily_sums(store, table, cache_path, stations, variable=HEATWAVE_VARIABLE):
+    """``(stations, days)`` sums and counts of ``variable``, scanning only fragments not in ``cache_path``."""
+    cache_path = Path(cache_path)
+    cached = {}
+    if cache_path.exists():
+        with open(cache_path) as f:
+            cached = json.load(f)
+    time_column, key_column = store.time_column(table), store.key_column(table)
+    fragments = store.fragments(table)
+    fresh = 0
+    for frag in fragments:
+        if frag["path"] not in cached:
+            chunk = {name: store.column(frag, name) for name in (time_column, key_column, variable)}
+            cached[frag["path"]] = fragment_daily_sums(chunk, time_column, key_column, variable)
+            fresh += 1
+    live = {frag["path"] for frag in fragments}
+    cached = {path: sums for path, sums in cached.items() if path in live}
+    if fresh:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Per thread: the detector and the seasonal job may both bring a variable's sums up to date
+        tmp = cache_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(cached, f)
+        os.replace(tmp, cache_path)
+    parts = [pd.DataFrame(sums) for sums in cached.values() if sums["days"]]
+    if not parts:
+        empty = pd.DataFrame(index=stations, dtype=np.float64)
+        return empty, empty.copy()
+    totals = pd.concat(parts).groupby(["keys", "days"])[["sums", "counts"]].sum()
+    return tuple(
+        totals[name].unstack("days").reindex(stations).sort_index(axis=1).fillna(0.0)
+        for name in ("sums", "counts")
+    )
+
+
+class AnomalyDetector:
+    """Spike and heatwave state for a fixed list of stations, updated one batch at a time."""
+
+    def __init__(self, stations, variables=VARIABLES, clim_mean=None, clim_threshold=None):
+        self.stations = list(stations)
+        self.index = {station: i for i, station in enumerate(self.stations)}
+        self.variables = tuple(variables)
+        n, v = len(self.stations), len(self.variables)
+        self.min_mad = np.array([MIN_MAD.get(name, 1e-6) for name in self.variables])
+        self.median = np.full((n, v), np.nan)
+        self.mad = np.full((n, v), np.nan)
+        self.clim_mean = np.full((n, 366), np.nan) if clim_mean is None else clim_mean
+        self.clim_threshold = np.full((n, 366), np.nan) if clim_threshold is None else clim_threshold
+        self.heat = self.variables.index(HEATWAVE_VARIABLE) if HEATWAVE_VARIABLE in self.variables else None
+        # The open (not yet closed) day of every station and its running sum
+        self.day = np.full(n, -1, dtype=np.int64)
+        self.day_sum = np.zeros(n)
+        self.day_count = np.zeros(n)
+        # Current run of days above the threshold
+        self.run = np.zeros(n, dtype=np.int64)
+        self.run_start = np.zeros(n, dtype=np.int64)
+        self.run_peak = np.full(n, np.nan)
+        self.heatwaves = []
+        self.spikes = deque(maxlen=MAX_SPIKES)
+        self.readings = 0
+        self.last_time = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, cache_path, table="oceanographic", variables=VARIABLES):
+        """Baseline and past heatwaves from the per-fragment daily sums, spike state from the recent tail."""
+        time_column, key_column = store.time_column(table), store.key_column(table)
+        stations = store.read("locations", columns=["Station"])["Station"].tolist()
+        sums, counts = daily_sums(store, table, cache_path, stations)
+        detector = cls(stations, variables, *climatology(sums / counts))
+        detector.replay_days(sums, counts)
+        _, last = store.stats(table, time_column)
+        if last is None:
+            return detector
+        recent = store.read(
+            table, [time_column, key_column, *detector.variables], [(time_column, ">", last - WARMUP)]
+        ).sort_values(time_column, kind="stable")
+        known = recent[key_column].isin(detector.index).to_numpy()
+        recent = recent[known]
+        idx = recent[key_column].map(detector.index).to_numpy(dtype=np.int64)
+        values = recent[list(detector.variables)].to_numpy(dtype=np.float64)
+        times_ns = recent[time_column].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        with detector._lock:
+            detector._warm_up(idx, values)
+            detector._detect_spikes(idx, times_ns, values)
+            detector.readings += len(idx)
+            detector.last_time = int(times_ns.max()) if len(times_ns) else 0
+        return detector
+
+    def replay_days(self, sums, counts):
+        """Feed ``(stations, days)`` daily sums and counts through, day by day; the last day stays open."""
+        days = sums.columns.to_numpy(dtype=np.int64)
+        sums = sums.reindex(self.stations).to_numpy(dtype=np.float64)
+        counts = counts.reindex(self.stations).to_numpy(dtype=np.float64)
+        everyone = np.arange(len(self.stations))
+        with self._lock:
+            for k, day in enumerate(days):
+                has = counts[:, k] > 0
+                self._open_days(everyone[has], day)
+                self.day_sum[has] = sums[has, k]
+                self.day_count[has] = counts[has, k]
+
+    # ------------------------------------------------------------------ updates
+
+    def update_batch(self, stations, times_ns, values):
+        """Readings of ``stations`` (names) at ``times_ns``; ``values`` is ``(n, variables)``."""
+        idx = np.fromiter((self.index.get(station, -1) for station in stations), dtype=np.int64, count=len(stations))
+        self._update(idx, times_ns, values)
+
+    def _update(self, idx, times_ns, values):
+        known = idx >= 0
+        idx, times_ns = idx[known], np.asarray(times_ns, dtype=np.int64)[known]
+        values = np.asarray(values, dtype=np.float64)[known]
+        if not len(idx):
+            return
+        with self._lock:
+            self._warm_up(idx, values)
+            self._detect_spikes(idx, times_ns, values)
+            self._step_quantiles(idx, values)
+            if self.heat is not None:
+                self._accumulate_days(idx, times_ns, values[:, self.heat])
+            self.readings += len(idx)
+            self.last_time = max(self.last_time, int(times_ns.max()))
+
+    def _warm_up(self, idx, values):
+        """Start the median and MAD of series seen for the first time from these readings."""
+        fresh = np.isnan(self.median[idx]) & ~np.isnan(values)
+        if not fresh.any():
+            return
+        frame = pd.DataFrame(np.where(fresh, values, np.nan))
+        grouped = frame.groupby(idx)
+        median = grouped.median()
+        mad = (frame - median.reindex(idx).to_numpy()).abs().groupby(idx).median()
+        rows = median.index.to_numpy()
+        start = np.isnan(self.median[rows]) & ~np.isnan(median.to_numpy())
+        self.median[rows] = np.where(start, median.to_numpy(), self.median[rows])
+        self.mad[rows] = np.where(start, np.maximum(mad.to_numpy(), self.min_mad), self.mad[rows])
+
+    def _detect_spikes(self, idx, times_ns, values):
+        with np.errstate(invalid="ignore"):
+            z = 0.6745 * (values - self.median[idx]) / np.maximum(self.mad[idx], self.min_mad)
+            rows, cols = np.nonzero(np.abs(z) > SPIKE_Z)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            self.spikes.append((int(times_ns[r]), int(idx[r]), c, float(values[r, c]), float(z[r, c])))
+
+    def _step_quantiles(self, idx, values):
+        median, mad = self.median[idx], self.mad[idx]
+        ok = ~np.isnan(values) & ~np.isnan(median)
+        # Per series: readings in the batch, and the sums of their steps' directions
+        cells = (idx[:, None] * len(self.variables) + np.arange(len(self.variables)))[ok]
+        size = self.median.size
+        count = np.bincount(cells, minlength=size)
+        with np.errstate(invalid="ignore"):
+            toward = np.bincount(cells, np.sign(values - median)[ok], size)
+            wider = np.bincount(cells, np.sign(np.abs(values - median) - mad)[ok], size)
+        scale = QUANTILE_RATE * np.minimum(count, BATCH_STEPS) / np.maximum(count, 1)
+        step = (scale * np.maximum(self.mad, self.min_mad).ravel()).reshape(self.mad.shape)
+        self.median += step * toward.reshape(self.median.shape)
+        self.mad += step * wider.reshape(self.mad.shape)
+        np.maximum(self.mad, self.min_mad, out=self.mad)
+
+    def _accumulate_days(self, idx, times_ns, values):
+        days = times_ns // _NS_PER_DAY
+        # A batch covers one day, or two around midnight
+        for day in np.unique(days):
+            sel = days == day
+            stations, x = idx[sel], values[sel]
+            self._open_days(np.unique(stations[self.day[stations] < day]), day)
+            # Late readings for an already closed day are left out of it
+            ok = (self.day[stations] == day) & ~np.isnan(x)
+            np.add.at(self.day_sum, stations[ok], x[ok])
+            np.add.at(self.day_count, stations[ok], 1.0)
+
+    def _open_days(self, stations, day):
+        """Close the open day of ``stations`` and start ``day``; a gap in days ends a run."""
+        if not len(stations):
+            return
+        had = stations[self.day[stations] >= 0]
+        if len(had):
+            self._close_days(had)
+            gap = had[day - self.day[had] > 1]
+            self._end_runs(gap, self.day[gap])
+            self.run[gap] = 0
+        self.day[stations] = day
+        self.day_sum[stations] = 0.0
+        self.day_count[stations] = 0.0
+
+    def _close_days(self, stations):
+        day = self.day[stations]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.day_sum[stations] / self.day_count[stations]
+        doy = _day_of_year(day)
+        anomaly = mean - self.clim_mean[stations, doy]
+        with np.errstate(invalid="ignore"):
+            above = mean > self.clim_threshold[stations, doy]
+        ending = stations[~above]
+        self._end_runs(ending, day[~above] - 1)
+        starting = above & (self.run[stations] == 0)
+        self.run_start[stations[starting]] = day[starting]
+        self.run_peak[stations[starting]] = np.nan
+        self.run[stations] = np.where(above, self.run[stations] + 1, 0)
+        self.run_peak[stations[above]] = np.fmax(self.run_peak[stations[above]], anomaly[above])
+
+    def _end_runs(self, stations, last_days):
+        for station, last_day in zip(stations.tolist(), np.asarray(last_days).tolist()):
+            if self.run[station] >= HEATWAVE_DAYS:
+                self.heatwaves.append({
+                    "Station": self.stations[station],
+                    "Start": pd.Timestamp(self.run_start[station] * _NS_PER_DAY),
+                    "End": pd.Timestamp(last_day * _NS_PER_DAY),
+                    "Days": int(self.run[station]),
+                    "Peak_Anomaly": float(self.run_peak[station]),
+                })
+
+    # ------------------------------------------------------------------ results
+
+    def summary(self):
+        """Counts of active alerts: ongoing heatwaves and spikes within ``SPIKE_ACTIVE`` of the newest reading."""
+        with self._lock:
+            cutoff = self.last_time - SPIKE_ACTIVE.value
+            spikes = sum(1 for spike in self.spikes if spike[0] >= cutoff)
+            return {"heatwaves": int((self.run >= HEATWAVE_DAYS).sum()), "spikes": spikes}
+
+    def alerts(self):
+        """Active alerts, heatwaves first, one row each."""
+        rows = []
+        with self._lock:
+            for station in np.flatnonzero(self.run >= HEATWAVE_DAYS).tolist():
+                rows.append({
+                    "Kind": "Heatwave",
+                    "Station": self.stations[station],
+                    "Variable": HEATWAVE_VARIABLE,
+                    "Since": pd.Timestamp(self.run_start[station] * _NS_PER_DAY),
+                    "Days": int(self.run[station]),
+                    "Score": float(self.run_peak[station]),
+                })
+            cutoff = self.last_time - SPIKE_ACTIVE.value
+            for time_ns, station, variable, value, z in reversed(self.spikes):
+                if time_ns < cutoff:
+                    break
+                rows.append({
+                    "Kind": "Spike",
+                    "Station": self.stations[station],
+                    "Variable": self.variables[variable],
+                    "Since": pd.Timestamp(time_ns),
+                    "Value": value,
+                    "Score": z,
+                })
+        return pd.DataFrame(rows, columns=["Kind", "Station", "Variable", "Since", "Days", "Value", "Score"])
+
+    def past_heatwaves(self):
+        with self._lock:
+            return pd.DataFrame(list(self.heatwaves), columns=["Station", "Start", "End", "Days", "Peak_Anomaly"])
+
+    def subscriber(self, station_of):
+        """Ingest callback mapping each sensor reading to its station via ``station_of``."""
+        slot_of = {sensor: self.index.get(station, -1) for sensor, station in station_of.items()}
+
+        def on_batch(sensors, times_ns, fields):
+            idx = np.fromiter((slot_of.get(sensor, -1) for sensor in sensors), dtype=np.int64, count=len(sensors))
+            rows = np.column_stack([fields.get(name, np.full(len(sensors), np.nan)) for name in self.variables])
+            self._update(idx, times_ns, rows)
+        return on_batch
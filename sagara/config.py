@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+
+# Everything the app persists (column store, indexes, caches) lives under here
+DATA_DIR = Path(os.environ.get("SAGARA_DATA_DIR", Path(__file__).resolve().parent.parent / "data"))
+STORE_DIR = DATA_DIR / "store"
+INDEX_DIR = DATA_DIR / "index"
+PYRAMID_DIR = DATA_DIR / "pyramid"
+# Gridded (time, depth, lat, lon) fields behind the Digital Twin map layers
+CUBE_DIR = DATA_DIR / "cube"
+# Georeferenced satellite scenes and the tile pyramids built from them
+SATELLITE_DIR = Path(os.environ.get("SAGARA_SATELLITE_DIR", DATA_DIR / "satellite" / "scenes"))
+TILE_DIR = DATA_DIR / "satellite" / "tiles"
+QUALITY_DIR = DATA_DIR / "quality"
+# Per-fragment catch sums behind the fisheries rollups
+FISHERIES_DIR = DATA_DIR / "fisheries"
+# Per-fragment daily sums behind the marine-heatwave climatology and the seasonal trends
+CLIMATOLOGY_DIR = DATA_DIR / "climatology"
+KMER_DIR = DATA_DIR / "kmer"
+# Reference barcode library and the sample read batches matched against it
+EDNA_REFERENCE = Path(os.environ.get("SAGARA_EDNA_REFERENCE", DATA_DIR / "edna" / "reference.fasta"))
+EDNA_SAMPLES_DIR = Path(os.environ.get("SAGARA_EDNA_SAMPLES", DATA_DIR / "edna" / "samples"))
+MODEL_DIR = DATA_DIR / "models"
+OTOLITH_DIR = Path(os.environ.get("SAGARA_OTOLITH_DIR", DATA_DIR / "otoliths"))
+OTOLITH_CACHE = DATA_DIR / "otolith_cache.sqlite"
+INTERACTIONS_FILE = Path(os.environ.get("SAGARA_INTERACTIONS", DATA_DIR / "ecosystem" / "interactions.csv"))
+JOBS_DB = DATA_DIR / "jobs.sqlite"
+# Finished background exports, served by the side server
+EXPORT_DIR = DATA_DIR / "exports"
+# Collapsed-stack profiles of slow reruns, when the sampling profiler is enabled
+PROFILE_DIR = DATA_DIR / "profiles"
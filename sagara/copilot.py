@@ -0,0 +1,376 @@
+"""Offline, rule-based query planner behind the Oceanic Copilot.
+
+A question is normalized and mapped by keyword rules onto a small ``Plan``
+(intent, variable, aggregation, stations, species, time window).  The plan is
+executed as a projected, filtered read of the column store and rendered
+through a fixed answer template.  Answers are cached in an LRU keyed on the
+plan and the store version, so rephrasings of the same question and repeat
+questions are free until the data changes; live alerts, which move with the
+sensor feed rather than the store, are answered fresh every time.  Trends
+over the full record come from the batch seasonal decomposition once it has
+run for the store's version, and from a plain linear fit until then.
+"""
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+
+from .cache import LRUCache
+
+Plan = namedtuple("Plan", "intent variable agg stations species days")
+
+VARIABLE_WORDS = {
+    "Temperature": ("temperature", "temp", "sst", "warm", "warmest", "warming", "cold", "coldest", "cool", "coolest", "heat"),
+    "Salinity": ("salinity", "salt", "saline", "saltiest"),
+    "pH": ("ph", "acid", "acidity", "acidification", "alkalinity"),
+    "Dissolved_Oxygen": ("oxygen", "o2", "hypoxia", "hypoxic", "dissolved"),
+}
+AGG_WORDS = {
+    "trend": ("trend", "trending", "change", "changing", "warming", "cooling", "rising", "falling", "increase", "decrease"),
+    "max": ("max", "maximum", "highest", "peak", "warmest", "saltiest", "most"),
+    "min": ("min", "minimum", "lowest", "coldest", "coolest", "least"),
+    "std": ("variability", "variance", "std", "fluctuation", "fluctuations", "stable"),
+    "count": ("count", "many", "number"),
+    "mean": ("average", "mean", "typical", "avg"),
+}
+CATCH_WORDS = ("catch", "catches", "caught", "landings", "landed", "fisheries", "fishing", "gear")
+SPECIES_WORDS = ("species", "fish", "fisheries", "biomass", "catch", "abundance", "population")
+ALERT_WORDS = ("alert", "alerts", "anomaly", "anomalies", "heatwave", "heatwaves", "spike", "spikes", "unusual")
+STATION_WORDS = ("station", "stations", "location", "locations", "where", "which", "site", "sites", "coast")
+PERIOD_DAYS = {"day": 1, "week": 7, "fortnight": 14, "month": 30, "quarter": 90, "season": 90, "year": 365}
+UNITS = {"Temperature": "°C", "Salinity": " PSU", "pH": "", "Dissolved_Oxygen": " mg/L"}
+# Intents answered from live state, never from the answer cache
+LIVE_INTENTS = ("alerts",)
+# Intents whose full-record trend answers come from the seasonal decomposition
+SEASONAL_INTENTS = ("variable", "compare")
+AGG_LABELS = {"mean": "average", "max": "highest", "min": "lowest", "std": "variability (std) of", "count": "number of readings for"}
+
+
+def normalize(question):
+    return re.sub(r"[^a-z0-9\s]", " ", question.lower()).split()
+
+
+def _window_days(text):
+    match = re.search(r"(?:last|past|previous)\s+(\d+)\s*(day|week|fortnight|month|quarter|season|year)s?", text)
+    if match:
+        return int(match.group(1)) * PERIOD_DAYS[match.group(2)]
+    match = re.search(r"(?:last|past|previous|this)\s+(day|week|fortnight|month|quarter|season|year)", text)
+    if match:
+        return PERIOD_DAYS[match.group(1)]
+    if "today" in text:
+        return 1
+    return None
+
+
+def plan_query(question, stations, species):
+    """Map a question onto a Plan using keyword rules.
+
+    ``stations`` maps station code to location name; ``species`` lists the
+    species names known to the store.
+    """
+    words = normalize(question)
+    text = " ".join(words)
+    tokens = set(words)
+
+    variable = next((name for name, keys in VARIABLE_WORDS.items() if tokens & set(keys)), None)
+    agg = next((name for name, keys in AGG_WORDS.items() if tokens & set(keys)), None)
+    days = _window_days(text)
+
+    matched = tuple(sorted(
+        code for code, location in stations.items()
+        if code.lower() in tokens or location.lower() in text
+    ))
+    if not matched:
+        matched = tuple(sorted(
+            code for code, location in stations.items()
+            if any(part in tokens for part in location.lower().split() if len(part) > 3 and part not in ("coast", "region"))
+        ))
+    named_species = tuple(sorted(name for name in species if name.lower() in tokens))
+
+    if "quality" in tokens:
+        return Plan("quality", None, None, (), (), None)
+    if tokens & set(ALERT_WORDS):
+        return Plan("alerts", None, None, matched, (), None)
+    if not variable and tokens & set(CATCH_WORDS):
+        measure = "Count" if tokens & {"count", "many", "number", "individuals"} else "Catch_kg"
+        return Plan("catch", measure, "mean" if agg == "mean" else "sum", matched, named_species, days)
+    if named_species or (not variable and tokens & set(SPECIES_WORDS)):
+        measure = "Biomass_kg" if tokens & {"biomass", "weight", "kg"} else (
+            "Habitat_Depth" if tokens & {"depth", "deep", "habitat"} else "Count")
+        return Plan("species", measure, agg or "max", (), named_species, None)
+    if variable and not matched and tokens & set(STATION_WORDS) and agg in (None, "max", "min", "mean", "std", "trend"):
+        return Plan("compare", variable, agg or "mean", (), (), days)
+    if variable:
+        return Plan("variable", variable, agg or "mean", matched, (), days)
+    if tokens & set(STATION_WORDS) or tokens & {"sensors", "network"}:
+        return Plan("stations", None, None, matched, (), None)
+    return Plan("help", None, None, (), (), None)
+
+
+def _fmt(value, variable):
+    return f"{value:.2f}{UNITS.get(variable, '')}"
+
+
+def _slope_per_30d(times, values):
+    ok = ~np.isnan(values)
+    if ok.sum() < 3:
+        return np.nan
+    days = (times[ok] - times[ok][0]) / np.timedelta64(1, "D")
+    return np.polyfit(days, values[ok], 1)[0] * 30
+
+
+class Copilot:
+    """Answers questions against the store, caching answers per plan and data version."""
+
+    def __init__(self, store, quality=None, alerts=None, fisheries=None, trends=None, cache_size=256):
+        self.store = store
+        self.quality = quality
+        self.alerts = alerts
+        self.fisheries = fisheries
+        # Callable returning the seasonal decomposition's per-series frame, or None while it runs
+        self.trends = trends
+        self.cache = LRUCache(cache_size)
+        self._vocabulary = (None, {}, [])
+
+    def vocabulary(self):
+        version, stations, species = self._vocabulary
+        if version != self.store.version:
+            locations = self.store.read("locations", columns=["Station", "Location"])
+            stations = dict(zip(locations["Station"], locations["Location"]))
+            species = self.store.read("species", columns=["Species"])["Species"].tolist()
+            self._vocabulary = (self.store.version, stations, species)
+        return stations, species
+
+    def plan(self, question):
+        stations, species = self.vocabulary()
+        return plan_query(question, stations, species)
+
+    def answer(self, question):
+        plan = self.plan(question)
+        if plan.intent in LIVE_INTENTS:
+            return self.execute(plan)
+        # Looked up once: it both keys the cached answer and feeds it
+        seasonal = self._seasonal(plan)
+        return self.cache.get_or_compute((plan, self.store.version, seasonal is not None),
+                                         lambda: self._execute(plan, seasonal))
+
+    def execute(self, plan):
+        return self._execute(plan, self._seasonal(plan))
+
+    def _execute(self, plan, seasonal):
+        if plan.intent in SEASONAL_INTENTS:
+            return getattr(self, f"_answer_{plan.intent}")(plan, seasonal)
+        return getattr(self, f"_answer_{plan.intent}")(plan)
+
+    # ------------------------------------------------------------------ intents
+
+    def _read_variable(self, plan):
+        table = "oceanographic"
+        filters = []
+        if plan.stations:
+            filters.append(("Station", "in", list(plan.stations)))
+        if plan.days:
+            _, last = self.store.stats(table, "Date")
+            filters.append(("Date", ">", last - np.timedelta64(plan.days, "D")))
+        frame = self.store.read(table, columns=["Date", "Station", plan.variable], filters=filters)
+        return frame.sort_values("Date", kind="stable")
+
+    def _seasonal(self, plan):
+        """Decomposed trends of ``plan.variable`` at its stations (all, if none), or None if not available.
+
+        Only full-record trend questions use them.
+        """
+        if plan.intent not in SEASONAL_INTENTS or plan.agg != "trend" or plan.days:
+            return None
+        trends = self.trends() if self.trends is not None else None
+        if trends is None:
+            return None
+        rows = trends[(trends["Variable"] == plan.variable) & trends["Trend_per_year"].notna()]
+        if plan.stations:
+            rows = rows[rows["Station"].isin(plan.stations)]
+        return rows if len(rows) else None
+
+    def _scope(self, plan):
+        stations, _ = self.vocabulary()
+        where = ", ".join(stations[code] for code in plan.stations) if plan.stations else "all stations"
+        when = f"the last {plan.days} days" if plan.days else "the full record"
+        return where, when
+
+    def _answer_variable(self, plan, seasonal):
+        frame = self._read_variable(plan)
+        where, when = self._scope(plan)
+        values = frame[plan.variable].to_numpy(dtype=np.float64)
+        readings = int((~np.isnan(values)).sum())
+        name = plan.variable.replace("_", " ")
+        if readings == 0:
+            return f"I found no {name} readings for {where} over {when}."
+        if seasonal is not None:
+            slope = seasonal["Trend_per_year"].mean()
+            # Stations' fits are independent, so the mean's interval shrinks with their number
+            ci = np.sqrt((seasonal["Trend_CI95"] ** 2).sum()) / len(seasonal)
+            peak = date(2001, 1, 1) + timedelta(days=int(seasonal["Peak_Day"].median()) - 1)
+            direction = "rising" if slope > 0 else "falling"
+            return (f"Seasonally adjusted, {name} at {where} is {direction} by {_fmt(abs(slope), plan.variable)} per year "
+                    f"(±{_fmt(ci, plan.variable)}, 95%) over {when}, from a robust harmonic fit per station. Its "
+                    f"seasonal cycle swings ±{_fmt(seasonal['Seasonal_Amplitude'].mean(), plan.variable)}, "
+                    f"peaking around {peak:%d %B}.")
+        if plan.agg == "trend":
+            slopes = [
+                _slope_per_30d(group["Date"].to_numpy(), group[plan.variable].to_numpy(dtype=np.float64))
+                for _, group in frame.groupby("Station")
+            ]
+            slope = np.nanmean(slopes)
+            direction = "rising" if slope > 0 else "falling"
+            return (f"{name} at {where} is {direction} by {_fmt(abs(slope), plan.variable)} per 30 days "
+                    f"over {when} (linear fit per station, {readings:,} readings).")
+        if plan.agg == "count":
+            return f"There are {readings:,} {name} readings for {where} over {when}."
+        stat = {"mean": np.nanmean, "max": np.nanmax, "min": np.nanmin, "std": np.nanstd}[plan.agg](values)
+        return (f"The {AGG_LABELS[plan.agg]} {name} at {where} over {when} is {_fmt(stat, plan.variable)} "
+                f"(range {_fmt(np.nanmin(values), plan.variable)} to {_fmt(np.nanmax(values), plan.variable)}, "
+                f"{readings:,} readings).")
+
+    def _answer_compare(self, plan, seasonal):
+        frame = self._read_variable(plan)
+        stations, _ = self.vocabulary()
+        _, when = self._scope(plan)
+        name = plan.variable.replace("_", " ")
+        if seasonal is not None:
+            per_station = dict(zip(seasonal["Station"], seasonal["Trend_per_year"]))
+            label = "seasonally adjusted trend per year"
+        elif plan.agg == "trend":
+            per_station = {
+                code: _slope_per_30d(group["Date"].to_numpy(), group[plan.variable].to_numpy(dtype=np.float64))
+                for code, group in frame.groupby("Station")
+            }
+            label = "trend per 30 days"
+        else:
+            reducer = {"mean": "mean", "max": "max", "min": "min", "std": "std"}[plan.agg]
+            per_station = frame.groupby("Station")[plan.variable].agg(reducer).to_dict()
+            label = AGG_LABELS[plan.agg]
+        ranked = sorted(((v, k) for k, v in per_station.items() if v == v), reverse=plan.agg != "min")
+        if not ranked:
+            return f"I found no {name} readings over {when}."
+        lines = "\n".join(
+            f"| {stations.get(code, code)} ({code}) | {_fmt(value, plan.variable)} |" for value, code in ranked
+        )
+        top_value, top = ranked[0]
+        return (f"Ranked by {label} {name} over {when}, {stations.get(top, top)} comes first at "
+                f"{_fmt(top_value, plan.variable)}.\n\n"
+                f"| Station | {label.capitalize()} |\n|---|---|\n{lines}")
+
+    def _answer_species(self, plan):
+        frame = self.store.read("species", columns=["Species", "Count", "Biomass_kg", "Habitat_Depth"])
+        if plan.species:
+            rows = frame[frame["Species"].isin(plan.species)]
+            return " ".join(
+                f"{row.Species}: {row.Count:,} individuals, {row.Biomass_kg:,} kg biomass, "
+                f"typically found around {row.Habitat_Depth} m depth."
+                for row in rows.itertuples()
+            )
+        ascending = plan.agg == "min"
+        ranked = frame.sort_values(plan.variable, ascending=ascending)
+        label = {"Count": "individuals", "Biomass_kg": "kg biomass", "Habitat_Depth": "m habitat depth"}[plan.variable]
+        top = ranked.iloc[0]
+        listing = ", ".join(f"{row.Species} ({getattr(row, plan.variable):,})" for row in ranked.itertuples())
+        return (f"Across {len(frame)} tracked species, {top['Species']} ranks {'lowest' if ascending else 'highest'} "
+                f"with {top[plan.variable]:,} {label}. Full ranking: {listing}.")
+
+    def _answer_catch(self, plan):
+        if self.fisheries is None:
+            return "Fisheries catch data is not available right now."
+        self.fisheries.refresh()
+        stations, _ = self.vocabulary()
+        first, last = self.fisheries.months()
+        if last is None:
+            return "No fisheries landings have been recorded yet."
+        # The rollups are monthly, so a window is widened to whole months
+        filters = []
+        if plan.days:
+            first = (last.to_period("M") - (max(1, round(plan.days / 30.44)) - 1)).start_time
+            filters.append(("Month", ">=", first))
+        if plan.stations:
+            filters.append(("Station", "in", list(plan.stations)))
+        if plan.species:
+            filters.append(("Species", "in", list(plan.species)))
+        where = ", ".join(stations[code] for code in plan.stations) if plan.stations else "all stations"
+        when = f"in {last:%b %Y}" if first == last else f"from {first:%b %Y} to {last:%b %Y}"
+        unit = "kg" if plan.variable == "Catch_kg" else "fish"
+        total = self.fisheries.query([], plan.variable, "sum", filters)[plan.variable].iloc[0]
+        landings = self.fisheries.query([], plan.variable, "count", filters)[plan.variable].iloc[0]
+        if not landings:
+            return f"No landings were recorded at {where} {when}."
+        by = "Gear" if len(plan.species) == 1 else "Species"
+        ranked = self.fisheries.query([by], plan.variable, plan.agg, filters)
+        label = f"average {unit} per landing" if plan.agg == "mean" else f"{unit} landed"
+        listing = ", ".join(
+            f"{getattr(row, by)} {getattr(row, plan.variable):,.0f}"
+            + ("" if plan.agg == "mean" else f" ({getattr(row, plan.variable) / total:.0%})")
+            for row in ranked.itertuples()
+        )
+        caught = f"{', '.join(plan.species)} catch" if plan.species else "Catch"
+        return (f"{caught} at {where} {when}: {total:,.0f} {unit} over "
+                f"{landings:,.0f} landings. By {by.lower()}, {label}: {listing}.")
+
+    def _answer_stations(self, plan):
+        frame = self.store.read("locations", columns=["Station", "Location", "Latitude", "Longitude"])
+        if plan.stations:
+            frame = frame[frame["Station"].isin(plan.stations)]
+        sensors = self.store.num_rows("sensors") if self.store.has_table("sensors") else 0
+        listing = "; ".join(
+            f"{row.Location} ({row.Station}, {row.Latitude:.2f}°N {row.Longitude:.2f}°E)" for row in frame.itertuples()
+        )
+        return f"The network has {len(frame)} monitoring stations and {sensors:,} sensors: {listing}."
+
+    def _answer_quality(self, plan):
+        if self.quality is None:
+            return "Data quality scoring is not available right now."
+        scores = self.quality.scores()
+        listing = ", ".join(f"{name} {value:.1f}%" for name, value in scores.items() if value is not None)
+        return f"Current oceanographic data quality: {listing}."
+
+    def _answer_alerts(self, plan):
+        if self.alerts is None:
+            return "Marine alerting is not available right now."
+        stations, _ = self.vocabulary()
+        active = self.alerts.alerts()
+        past = self.alerts.past_heatwaves()
+        if plan.stations:
+            active = active[active["Station"].isin(plan.stations)]
+            past = past[past["Station"].isin(plan.stations)]
+        where = "at " + ", ".join(stations[code] for code in plan.stations) if plan.stations else "across the network"
+        heatwaves = active[active["Kind"] == "Heatwave"]
+        spikes = active[active["Kind"] == "Spike"]
+        parts = []
+        if heatwaves.empty:
+            parts.append(f"No marine heatwave is under way {where}.")
+        else:
+            parts.append(f"{len(heatwaves)} marine heatwave(s) under way {where}: " + "; ".join(
+                f"{stations.get(row.Station, row.Station)} for {row.Days:.0f} days since {row.Since:%d %b}, "
+                f"peaking {row.Score:+.2f}°C above the seasonal mean"
+                for row in heatwaves.itertuples()
+            ) + ".")
+        if spikes.empty:
+            parts.append("No sensor spikes in the last hour.")
+        else:
+            worst = spikes.loc[spikes["Score"].abs().idxmax()]
+            parts.append(
+                f"{len(spikes)} sensor spike(s) in the last hour; the largest is {worst['Variable'].replace('_', ' ')} "
+                f"at {stations.get(worst['Station'], worst['Station'])}, {_fmt(worst['Value'], worst['Variable'])} "
+                f"({abs(worst['Score']):.1f} robust deviations from its median)."
+            )
+        if not past.empty:
+            longest = past.loc[past["Days"].idxmax()]
+            parts.append(
+                f"The record holds {len(past)} past heatwave(s); the longest lasted {longest['Days']} days at "
+                f"{stations.get(longest['Station'], longest['Station'])} from {longest['Start']:%d %b %Y}."
+            )
+        return " ".join(parts)
+
+    def _answer_help(self, plan):
+        stations, species = self.vocabulary()
+        return ("I can answer questions about Temperature, Salinity, pH and Dissolved Oxygen "
+                f"(averages, extremes, variability and trends) at {len(stations)} stations, compare stations, "
+                f"and report on {len(species)} tracked species, fisheries catch, data quality or live marine alerts. Try \"What is the temperature trend "
+                "at Kutch Coast over the last 90 days?\" or \"Which station has the lowest oxygen?\"")
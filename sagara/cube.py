@@ -0,0 +1,309 @@
+"""Gridded (time, depth, lat, lon) ocean cube in memory-mapped chunks.
+
+The cube holds hourly temperature, salinity and current components on the
+habitat region's water column, derived from the station series: surface
+values are interpolated from the stations (inverse-distance weighting),
+carried down through a thermocline that an internal tide moves up and down,
+and set to NaN below the seafloor.  Currents are an along-shore coastal jet
+plus a tidal cross-shore component, both weakening offshore and with depth.
+
+Every variable is one raw ``float32`` file of ``(ct, cz, cy, cx)`` chunks,
+opened with ``np.memmap``.  ``chunks.npy`` maps each chunk's grid position
+to its slot in those files, or -1 for chunks that are entirely land or
+seafloor, which are not stored at all.  A read looks up the chunks its
+time step, depth range and bounds cover and reduces views of just those,
+so the cube can be far larger than memory; it is built one chunk at a time
+for the same reason.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+from .habitat import COAST, DEPTH_LEVELS, HALOCLINE_GAIN, REGION, THERMOCLINE_DROP, idw, seafloor_depth
+from .store import reinstate_version, retire_versions
+
+DAYS = int(os.environ.get("SAGARA_CUBE_DAYS", "7"))
+CELL_DEG = 0.05
+# (time steps, depth levels, lat cells, lon cells) per chunk
+CHUNK = (24, 7, 50, 50)
+VARIABLES = ("temperature", "salinity", "u", "v")
+# Map layers and the variables each is computed from
+LAYERS = {"Temperature": ("temperature",), "Salinity": ("salinity",), "Current Flow": ("u", "v")}
+
+# Principal lunar semidiurnal tide, in hours
+TIDE_HOURS = 12.42
+INTERNAL_TIDE_M = 8.0
+DIURNAL_AMPLITUDE = 0.4
+COASTAL_JET = 0.35
+TIDAL_CURRENT = 0.2
+
+
+def ocean_fields(times_ns, depths, lat, lon, surface_t, surface_s, stations, diurnal):
+    """Temperature, salinity, u and v (m/s) for every (time, depth, lat, lon) point.
+
+    ``surface_t`` and ``surface_s`` are ``(time, station)`` surface series; the
+    rest of the arguments are 1-D axes.  NaN below the seafloor.
+    """
+    hours = (times_ns // 3_600_000_000_000).astype(np.float64)[:, None, None, None]
+    z = depths.astype(np.float64)[None, :, None, None]
+    grid_lat, grid_lon = np.meshgrid(lat, lon, indexing="ij")
+    floor = seafloor_depth(grid_lat, grid_lon)
+    offshore = np.maximum(np.interp(grid_lat, *COAST) - grid_lon, 0.0)
+
+    surface = []
+    for series in (surface_t, surface_s):
+        surface.append(np.stack([
+            idw(grid_lat, grid_lon, stations["Latitude"].to_numpy(), stations["Longitude"].to_numpy(), step)
+            for step in series
+        ])[:, None])
+    sst, sss = surface
+    if diurnal:
+        sst = sst + DIURNAL_AMPLITUDE * np.sin(2 * np.pi * (hours % 24 - 9) / 24) * np.exp(-z / 10)
+
+    tide = np.sin(2 * np.pi * hours / TIDE_HOURS + grid_lon * 0.5)
+    displaced = np.maximum(z + INTERNAL_TIDE_M * tide, 0.0)
+    temperature = sst - THERMOCLINE_DROP * (1 - np.exp(-displaced / 60))
+    salinity = sss + HALOCLINE_GAIN * (1 - np.exp(-displaced / 100))
+    shear = np.exp(-z / 50)
+    u = TIDAL_CURRENT * np.cos(2 * np.pi * hours / TIDE_HOURS) * np.exp(-offshore / 0.3) * shear
+    v = COASTAL_JET * np.exp(-offshore / 0.6) * shear * np.ones_like(hours)
+
+    dry = (z > floor) | (floor <= 0)
+    return {
+        name: np.where(dry, np.nan, values).astype(np.float32)
+        for name, values in (("temperature", temperature), ("salinity", salinity), ("u", u), ("v", v))
+    }
+
+
+def _hourly(frame, value, stations, times_ns):
+    """Each station's ``value`` linearly interpolated onto ``times_ns``; ``(time, station)``."""
+    out = np.empty((len(times_ns), len(stations)))
+    for k, station in enumerate(stations["Station"]):
+        series = frame.loc[frame["Station"] == station, ["Date", value]].dropna()
+        hourly = series.groupby(series["Date"].dt.floor("h"))[value].mean()
+        if hourly.empty:
+            out[:, k] = np.nan
+            continue
+        out[:, k] = np.interp(times_ns, hourly.index.to_numpy(dtype="datetime64[ns]").view(np.int64), hourly.to_numpy())
+    # Stations without data take the mean of the others
+    return np.where(np.isnan(out), np.nanmean(out, axis=1, keepdims=True), out)
+
+
+class OceanCube:
+    """Read side of a built cube: chunk lookups over memory-mapped variable files."""
+
+    def __init__(self, directory, cache_size=256):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            self.meta = json.load(f)
+        self.times = pd.DatetimeIndex(np.asarray(self.meta["times"], dtype="datetime64[ns]"))
+        self.depths = np.asarray(self.meta["depths"])
+        self.region = tuple(self.meta["region"])
+        self.cell_deg = self.meta["cell_deg"]
+        self.shape = tuple(self.meta["shape"])
+        self.chunk = tuple(self.meta["chunk"])
+        self.ranges = self.meta["ranges"]
+        self.index = np.load(self.directory / "chunks.npy", mmap_mode="r")
+        self.cache = LRUCache(cache_size)
+        self._maps = {}
+
+    @classmethod
+    def open(cls, store, root, days=DAYS):
+        root = Path(root)
+        version = store.table_version("oceanographic", "locations")
+        directory = root / version
+        if not (directory / "meta.json").exists():
+            cls.build(store, directory, days)
+            retire_versions(root, version)
+        else:
+            reinstate_version(directory)
+        return cls(directory)
+
+    @staticmethod
+    def build(store, directory, days=DAYS, cell_deg=CELL_DEG, chunk=CHUNK, region=REGION):
+        """Write the last ``days`` of hourly fields, one chunk column (all depths) at a time."""
+        _, last = store.stats("oceanographic", "Date")
+        start = last.floor("D") - pd.Timedelta(days=days - 1)
+        times = pd.date_range(start, periods=days * 24, freq="h")
+        times_ns = times.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        stations = store.read("locations", columns=["Station", "Latitude", "Longitude"])
+        frame = store.read(
+            "oceanographic",
+            ["Date", "Station", "Temperature", "Salinity"],
+            [("Date", ">=", start - pd.Timedelta(days=1))],
+        )
+        steps = np.diff(np.sort(frame["Date"].unique()).astype(np.int64))
+        # Daily series carry no daily cycle, so one is added
+        diurnal = len(steps) == 0 or np.median(steps) > pd.Timedelta(hours=1).value
+        surface_t = _hourly(frame, "Temperature", stations, times_ns)
+        surface_s = _hourly(frame, "Salinity", stations, times_ns)
+
+        rows = int(round((region[2] - region[0]) / cell_deg))
+        cols = int(round((region[3] - region[1]) / cell_deg))
+        lat = region[0] + (np.arange(rows) + 0.5) * cell_deg
+        lon = region[1] + (np.arange(cols) + 0.5) * cell_deg
+        shape = (len(times), len(DEPTH_LEVELS), rows, cols)
+        grid = tuple(-(-n // c) for n, c in zip(shape, chunk))
+        index = np.full(grid, -1, dtype=np.int64)
+
+        tmp = Path(f"{directory}.{os.getpid()}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        files = {name: open(tmp / f"{name}.bin", "wb") for name in VARIABLES}
+        low = dict.fromkeys(VARIABLES, np.inf)
+        high = dict.fromkeys(VARIABLES, -np.inf)
+        top_speed = 0.0
+        slots = 0
+        ct, cz, cy, cx = chunk
+        for tc in range(grid[0]):
+            t = slice(tc * ct, (tc + 1) * ct)
+            for yc in range(grid[2]):
+                y = slice(yc * cy, (yc + 1) * cy)
+                for xc in range(grid[3]):
+                    x = slice(xc * cx, (xc + 1) * cx)
+                    fields = ocean_fields(times_ns[t], DEPTH_LEVELS, lat[y], lon[x], surface_t[t], surface_s[t],
+                                          stations, diurnal)
+                    if np.isnan(fields["temperature"]).all():
+                        continue
+                    top_speed = max(top_speed, float(np.nanmax(np.hypot(fields["u"], fields["v"]))))
+                    for zc in range(grid[1]):
+                        z = slice(zc * cz, (zc + 1) * cz)
+                        if np.isnan(fields["temperature"][:, z]).all():
+                            continue
+                        for name, values in fields.items():
+                            block = np.full(chunk, np.nan, dtype=np.float32)
+                            part = values[:, z]
+                            block[:part.shape[0], :part.shape[1], :part.shape[2], :part.shape[3]] = part
+                            files[name].write(block.tobytes())
+                            low[name] = min(low[name], float(np.nanmin(part)))
+                            high[name] = max(high[name], float(np.nanmax(part)))
+                        index[tc, zc, yc, xc] = slots
+                        slots += 1
+        for handle in files.values():
+            handle.close()
+
+        np.save(tmp / "chunks.npy", index)
+        meta = {
+            "times": times.strftime("%Y-%m-%dT%H:%M:%S").tolist(),
+            "depths": DEPTH_LEVELS.tolist(),
+            "region": list(region),
+            "cell_deg": cell_deg,
+            "shape": list(shape),
+            "chunk": list(chunk),
+            "slots": slots,
+            "ranges": {
+                "Temperature": [low["temperature"], high["temperature"]],
+                "Salinity": [low["salinity"], high["salinity"]],
+                "Current Flow": [0.0, top_speed],
+            },
+        }
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(meta, f)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def step(self, when):
+        """Index of the time step at or before ``when`` (clamped to the cube)."""
+        i = int(self.times.searchsorted(pd.Timestamp(when), side="right")) - 1
+        return min(max(i, 0), len(self.times) - 1)
+
+    def layer(self, name, step, depth_range=(0, 200), bounds=None):
+        """Depth-averaged map layer at time ``step`` over ``bounds``, like ``slab``.
+
+        "Current Flow" is the speed of the depth-averaged current.
+        """
+        rasters = []
+        for variable in LAYERS[name]:
+            raster, snapped = self.slab(variable, step, depth_range, bounds)
+            if raster is None:
+                return None, None
+            rasters.append(raster)
+        return (np.hypot(*rasters) if len(rasters) == 2 else rasters[0]), snapped
+
+    def slab(self, variable, step, depth_range=(0, 200), bounds=None):
+        """Mean of ``variable`` over the depth levels in ``depth_range`` at time ``step``.
+
+        Returns ``(raster, bounds)`` like ``HabitatEngine.raster``: south row
+        first, bounds snapped to cells, ``(None, None)`` when nothing is covered.
+        """
+        key = (variable, step, tuple(depth_range), bounds)
+        return self.cache.get_or_compute(key, lambda: self._slab(variable, step, depth_range, bounds))
+
+    def chunks(self, step, depth_range=(0, 200), bounds=None):
+        """Slots of the stored chunks a read covers, with their grid positions."""
+        cells = self._cells(step, depth_range, bounds)
+        if cells is None:
+            return []
+        return [(position, slot) for position, slot, *_ in self._covered(*cells)]
+
+    def _cells(self, step, depth_range, bounds):
+        south, west, north, east = bounds or self.region
+        rows, cols = self.shape[2], self.shape[3]
+        i0 = max(0, int(np.floor((south - self.region[0]) / self.cell_deg)))
+        i1 = min(rows, int(np.ceil((north - self.region[0]) / self.cell_deg)))
+        j0 = max(0, int(np.floor((west - self.region[1]) / self.cell_deg)))
+        j1 = min(cols, int(np.ceil((east - self.region[1]) / self.cell_deg)))
+        z0 = int(np.searchsorted(self.depths, depth_range[0], side="left"))
+        z1 = int(np.searchsorted(self.depths, depth_range[1], side="right"))
+        if i0 >= i1 or j0 >= j1 or z0 >= z1:
+            return None
+        return step, z0, z1, i0, i1, j0, j1
+
+    def _covered(self, step, z0, z1, i0, i1, j0, j1):
+        ct, cz, cy, cx = self.chunk
+        tc, tt = divmod(step, ct)
+        for zc in range(z0 // cz, (z1 - 1) // cz + 1):
+            zs = slice(max(z0, zc * cz) - zc * cz, min(z1, (zc + 1) * cz) - zc * cz)
+            for yc in range(i0 // cy, (i1 - 1) // cy + 1):
+                ys = slice(max(i0, yc * cy) - yc * cy, min(i1, (yc + 1) * cy) - yc * cy)
+                for xc in range(j0 // cx, (j1 - 1) // cx + 1):
+                    slot = int(self.index[tc, zc, yc, xc])
+                    if slot < 0:
+                        continue
+                    xs = slice(max(j0, xc * cx) - xc * cx, min(j1, (xc + 1) * cx) - xc * cx)
+                    # Where this chunk's piece lands in the output raster
+                    out = (slice(yc * cy + ys.start - i0, yc * cy + ys.stop - i0),
+                           slice(xc * cx + xs.start - j0, xc * cx + xs.stop - j0))
+                    yield (tc, zc, yc, xc), slot, (tt, zs, ys, xs), out
+
+    def _slab(self, variable, step, depth_range, bounds):
+        cells = self._cells(step, depth_range, bounds)
+        if cells is None:
+            return None, None
+        _, _, _, i0, i1, j0, j1 = cells
+        total = np.zeros((i1 - i0, j1 - j0), dtype=np.float64)
+        count = np.zeros((i1 - i0, j1 - j0), dtype=np.int64)
+        values = self._map(variable)
+        for _, slot, (tt, zs, ys, xs), out in self._covered(*cells):
+            # A view into the memory map: only these pages are read
+            block = values[slot, tt, zs, ys, xs]
+            wet = ~np.isnan(block)
+            total[out] += np.where(wet, block, 0.0).sum(axis=0)
+            count[out] += wet.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            raster = np.where(count > 0, total / count, np.nan).astype(np.float32)
+        snapped = (
+            self.region[0] + i0 * self.cell_deg, self.region[1] + j0 * self.cell_deg,
+            self.region[0] + i1 * self.cell_deg, self.region[1] + j1 * self.cell_deg,
+        )
+        return raster, snapped
+
+    def _map(self, variable):
+        values = self._maps.get(variable)
+        if values is None:
+            slots = self.meta["slots"]
+            if slots == 0:
+                values = np.empty((0, *self.chunk), dtype=np.float32)
+            else:
+                values = np.memmap(self.directory / f"{variable}.bin", dtype=np.float32, mode="r",
+                                   shape=(slots, *self.chunk))
+            self._maps[variable] = values
+        return values
@@ -0,0 +1,250 @@
+"""FracMinHash k-mer sketches for matching eDNA reads to reference species.
+
+Every canonical k-mer of a sequence is hashed to 64 bits and only hashes
+below ``2**64 / scale`` are kept, so a sketch holds about one k-mer in
+``scale`` and sketches of overlapping sequences keep the same k-mers.  The
+reference index is the sorted array of every kept reference hash with the
+species it came from, memory-mapped from disk.  A read is scored per species
+by containment: the fraction of its sketch found in that species' sketch.
+
+Hashing, lookup (binary search) and scoring are vectorized over a whole batch
+of reads; large batches are split across worker processes that each map the
+same index files.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .store import reinstate_version, retire_versions
+
+K = 21
+SCALE = 8
+MIN_SCORE = 0.3
+BATCH_READS = 2000
+NO_MATCH = "No match"
+
+# A/C/G/T (and U) as 2-bit codes; anything else breaks the k-mers spanning it
+_CODES = np.full(256, 4, dtype=np.uint8)
+for _i, _bases in enumerate(("Aa", "Cc", "Gg", "TtUu")):
+    for _base in _bases:
+        _CODES[ord(_base)] = _i
+
+_WORKER_INDEXES = {}
+
+
+def read_sequences(path):
+    """``(ids, sequences)`` from a FASTA or FASTQ file."""
+    ids, sequences = [], []
+    with open(path) as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == "@":
+            for i, line in enumerate(f):
+                if i % 4 == 0:
+                    ids.append(line[1:].split(maxsplit=1)[0] if line[1:].strip() else str(len(ids)))
+                elif i % 4 == 1:
+                    sequences.append(line.strip())
+            return ids, sequences
+        parts = []
+        for line in f:
+            if line.startswith(">"):
+                if parts:
+                    sequences.append("".join(parts))
+                    parts = []
+                ids.append(line[1:].strip())
+            elif line.strip():
+                parts.append(line.strip())
+        if ids:
+            sequences.append("".join(parts))
+    return ids, sequences
+
+
+def write_fasta(path, ids, sequences, width=80):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for name, sequence in zip(ids, sequences):
+            f.write(f">{name}\n")
+            for start in range(0, len(sequence), width):
+                f.write(sequence[start:start + width] + "\n")
+
+
+def _mix(x):
+    """splitmix64 finalizer: spreads k-mer codes uniformly over 64 bits."""
+    with np.errstate(over="ignore"):
+        x = x ^ (x >> np.uint64(30))
+        x = x * np.uint64(0xBF58476D1CE4E5B9)
+        x = x ^ (x >> np.uint64(27))
+        x = x * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def kmer_hashes(sequences, k=K, scale=SCALE):
+    """Sketch hashes of many sequences at once.
+
+    Returns ``(hashes, owner)`` where ``owner`` is the index of the sequence
+    each hash came from.  Sequences are joined with a separator that no k-mer
+    can span, so the whole batch is one pass of array operations.
+    """
+    joined = b"\0".join(sequence.encode() for sequence in sequences)
+    codes = _CODES[np.frombuffer(joined, dtype=np.uint8)]
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, np.uint64), np.empty(0, np.int64)
+    bad = np.concatenate([[0], np.cumsum(codes == 4)])
+    valid = (bad[k:] - bad[:n]) == 0
+    wide = codes.astype(np.uint64)
+    forward = np.zeros(n, dtype=np.uint64)
+    reverse = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        base = wide[j:j + n]
+        forward = (forward << np.uint64(2)) | base
+        reverse |= (np.uint64(3) - base) << np.uint64(2 * j)
+    # Reads come off either strand, so a k-mer and its reverse complement hash alike
+    hashes = _mix(np.minimum(forward, reverse))
+    keep = valid & (hashes < np.uint64(2 ** 64 // scale))
+    starts = np.cumsum([0] + [len(sequence) + 1 for sequence in sequences[:-1]])
+    owner = np.searchsorted(starts, np.flatnonzero(keep), side="right") - 1
+    return hashes[keep], owner
+
+
+def _unique_pairs(owner, hashes):
+    """Drop repeated ``(owner, hash)`` pairs, returned sorted by owner then hash."""
+    order = np.lexsort((hashes, owner))
+    owner, hashes = owner[order], hashes[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (owner[1:] != owner[:-1]) | (hashes[1:] != hashes[:-1])
+    return owner[first], hashes[first]
+
+
+class ReferenceIndex:
+    """Memory-mapped FracMinHash index of one reference library."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            meta = json.load(f)
+        self.k = meta["k"]
+        self.scale = meta["scale"]
+        self.species = meta["species"]
+        self.sketch_sizes = meta["sketch_sizes"]
+        self.sequences = meta["sequences"]
+        self.hashes = np.load(self.directory / "hashes.npy", mmap_mode="r")
+        self.species_ids = np.load(self.directory / "species.npy", mmap_mode="r")
+
+    @classmethod
+    def open(cls, reference, root, k=K, scale=SCALE):
+        """Load the index of ``reference``, rebuilding it when the file changes."""
+        reference = Path(reference)
+        stat = reference.stat()
+        key = hashlib.sha1(f"{reference.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{k}:{scale}".encode()).hexdigest()[:16]
+        root = Path(root)
+        directory = root / key
+        if not (directory / "meta.json").exists():
+            cls.build(reference, directory, k, scale)
+            retire_versions(root, key)
+        else:
+            reinstate_version(directory)
+        return cls(directory)
+
+    @staticmethod
+    def build(reference, directory, k=K, scale=SCALE):
+        """Sketch every reference sequence; headers read ``>accession Species name``."""
+        ids, sequences = read_sequences(reference)
+        labels = [name.split(maxsplit=1)[1] if len(name.split(maxsplit=1)) > 1 else name for name in ids]
+        species = sorted(set(labels))
+        species_of = np.array([species.index(label) for label in labels], dtype=np.int32)
+        hashes, owner = kmer_hashes(sequences, k, scale)
+        # Haplotypes of one species share most k-mers; keep each (species, hash) once
+        species_ids, hashes = _unique_pairs(species_of[owner].astype(np.int64), hashes)
+        order = np.argsort(hashes, kind="stable")
+
+        tmp = Path(f"{directory}.{os.getpid()}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "hashes.npy", hashes[order])
+        np.save(tmp / "species.npy", species_ids[order].astype(np.int32))
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({
+                "k": k,
+                "scale": scale,
+                "reference": str(reference),
+                "species": species,
+                "sequences": len(sequences),
+                "sketch_sizes": np.bincount(species_ids, minlength=len(species)).tolist(),
+            }, f)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def score(self, sequences):
+        """Best species and containment score per read: ``(species_ids, scores, sketch_sizes)``."""
+        n = len(sequences)
+        hashes, owner = kmer_hashes(sequences, self.k, self.scale)
+        owner, hashes = _unique_pairs(owner, hashes)
+        sizes = np.bincount(owner, minlength=n)
+        lo = np.searchsorted(self.hashes, hashes, side="left")
+        hits = np.searchsorted(self.hashes, hashes, side="right") - lo
+        found = hits > 0
+        lo, hits, owner = lo[found], hits[found], owner[found]
+        # One entry per (read hash, species sharing it)
+        total = int(hits.sum())
+        within = np.arange(total) - np.repeat(np.cumsum(hits) - hits, hits)
+        species = np.asarray(self.species_ids[np.repeat(lo, hits) + within], dtype=np.int64)
+        reads = np.repeat(owner, hits)
+        width = len(self.species)
+        shared = np.bincount(reads * width + species, minlength=n * width).reshape(n, width)
+        best = shared.argmax(axis=1) if width else np.zeros(n, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = np.where(sizes > 0, shared[np.arange(n), best] / sizes, 0.0) if width else np.zeros(n)
+        return best, scores, sizes
+
+    def match(self, sequences, ids=None, min_score=MIN_SCORE, pool=None, batch=BATCH_READS):
+        """Per-read ``Read_ID``, ``Species_Match``, ``Match_Score`` and ``Kmers``.
+
+        With a ``concurrent.futures`` process ``pool``, batches of ``batch``
+        reads are scored in the workers, each mapping this index once.
+        """
+        sequences = list(sequences)
+        if pool is not None and len(sequences) > batch:
+            chunks = [sequences[start:start + batch] for start in range(0, len(sequences), batch)]
+            results = list(pool.map(_score_batch, [str(self.directory)] * len(chunks), chunks))
+            best, scores, sizes = (np.concatenate(parts) for parts in zip(*results))
+        else:
+            best, scores, sizes = self.score(sequences)
+        names = np.array(self.species + [NO_MATCH], dtype=object)
+        matched = scores >= min_score
+        return pd.DataFrame({
+            "Read_ID": ids if ids is not None else np.arange(len(sequences)),
+            "Species_Match": names[np.where(matched, best, len(self.species))],
+            "Match_Score": scores.round(3),
+            "Kmers": sizes,
+        })
+
+
+def _score_batch(directory, sequences):
+    index = _WORKER_INDEXES.get(directory)
+    if index is None:
+        index = _WORKER_INDEXES[directory] = ReferenceIndex(directory)
+    return index.score(sequences)
+
+
+def sample_summary(matches):
+    """Dominant species of one sample, its median score and the matched fraction."""
+    hits = matches[matches["Species_Match"] != NO_MATCH]
+    if hits.empty:
+        return {"Reads": len(matches), "Species_Match": NO_MATCH, "Match_Score": 0.0, "Matched": 0.0}
+    top = hits["Species_Match"].value_counts().idxmax()
+    return {
+        "Reads": len(matches),
+        "Species_Match": top,
+        "Match_Score": float(hits.loc[hits["Species_Match"] == top, "Match_Score"].median()),
+        "Matched": len(hits) / len(matches),
+    }
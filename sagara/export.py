@@ -0,0 +1,148 @@
+"""Chunked exports straight from the time index and column store.
+
+Every format is a generator of byte chunks that gathers ``BATCH_ROWS`` rows at
+a time, so peak memory is bounded by the batch size and not by the result.
+"""
+import io
+import os
+import zipfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from .server import Response
+
+BATCH_ROWS = 65536
+
+FORMATS = {
+    "csv.gz": ("Compressed CSV (.csv.gz)", "application/gzip"),
+    "npz": ("NumPy columnar (.npz)", "application/zip"),
+}
+
+
+def csv_gz_chunks(index, lo, hi, quality=0, columns=None, batch=BATCH_ROWS):
+    """Gzip-compressed CSV, one batch of rows at a time."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    header = True
+    for positions in index.iter_positions(lo, hi, quality, batch):
+        text = index.take(positions, columns).to_csv(index=False, header=header)
+        header = False
+        yield compressor.compress(text.encode())
+    if header:
+        yield compressor.compress(",".join(columns or index.store.schema(index.table)).encode() + b"\n")
+    yield compressor.flush()
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable write target whose contents are drained after every write."""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def npz_chunks(index, lo, hi, quality=0, columns=None, batch=BATCH_ROWS):
+    """A ``.npz`` archive (one ``.npy`` per column) streamed column by column.
+
+    ``np.load`` reads the result directly.  The row count for each array
+    header comes from the quality bitmap, so nothing is buffered ahead.
+    """
+    schema = index.store.schema(index.table)
+    columns = list(columns or schema)
+    total = index.count(lo, hi, quality)
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name in columns:
+            dtype = np.dtype(schema[name])
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as entry:
+                np.lib.format.write_array_header_2_0(entry, {
+                    "descr": np.lib.format.dtype_to_descr(dtype),
+                    "fortran_order": False,
+                    "shape": (total,),
+                })
+                for positions in index.iter_positions(lo, hi, quality, batch):
+                    entry.write(index.take(positions, [name])[name].to_numpy(dtype=dtype).tobytes())
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_chunks(index, fmt, lo, hi, quality=0, columns=None):
+    if fmt == "csv.gz":
+        return csv_gz_chunks(index, lo, hi, quality, columns)
+    if fmt == "npz":
+        return npz_chunks(index, lo, hi, quality, columns)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_file(index, fmt, lo, hi, path, quality=0, columns=None, progress=None):
+    """Write an export to ``path`` (via a temporary file) and return its size in bytes.
+
+    ``progress(fraction)`` is called after every batch of every column.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    total = index.count(lo, hi, quality)
+    batches = max(1, -(-total // BATCH_ROWS)) * (len(columns or index.store.schema(index.table)) if fmt == "npz" else 1)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            for done, chunk in enumerate(export_chunks(index, fmt, lo, hi, quality, columns), 1):
+                f.write(chunk)
+                if progress is not None:
+                    progress(min(done / batches, 0.99))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return path.stat().st_size
+
+
+def export_route(index_for):
+    """Side-server handler for ``/export/<table>?start=&end=&quality=&format=``.
+
+    ``index_for(table)`` must return the table's current TimeIndex.
+    """
+    def handle(table, params):
+        index = index_for(table)
+        fmt = params.get("format", "csv.gz")
+        lo, hi = index.range(params.get("start"), params.get("end"))
+        quality = int(params.get("quality", 0))
+        filename = f"{params.get('name', table)}.{fmt}"
+        return Response(
+            export_chunks(index, fmt, lo, hi, quality),
+            FORMATS[fmt][1],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    return handle
+
+
+def file_route(directory, content_type="application/octet-stream", chunk_bytes=1 << 20):
+    """Side-server handler streaming finished files from ``directory`` by name."""
+    directory = Path(directory)
+
+    def handle(name, params):
+        path = directory / name
+        if "/" in name or not path.is_file():
+            raise KeyError(name)
+
+        def chunks():
+            with open(path, "rb") as f:
+                while chunk := f.read(chunk_bytes):
+                    yield chunk
+
+        return Response(chunks(), content_type, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+    return handle
@@ -0,0 +1,242 @@
+"""Pre-aggregated fisheries catch cube.
+
+The ``catch`` table holds one row per landing: when and where, which species
+and gear, the weight landed and the number of fish.  ``CatchCube`` sums
+every fragment down to the base grain -- species x station x month x gear --
+and caches those partial sums on disk keyed by fragment path, like the
+quality counts: fragments are immutable, so a refresh only reads the ones it
+has not seen.  From the base grain it materializes a rollup for every subset
+of the dimensions.
+
+A query is answered from the smallest rollup whose dimensions cover its
+group-by and filter columns, so a dashboard group-by touches a few hundred
+pre-summed rows however many years of landings are stored.  Only what the
+rollups cannot answer -- a column outside the cube, a date bound inside a
+month, a min or max -- falls back to a vectorized scan of the landings.
+"""
+import json
+import os
+import threading
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .store import _OPS
+
+DIMENSIONS = ("Species", "Station", "Month", "Gear")
+MEASURES = ("Catch_kg", "Count")
+# Aggregations the rollups answer: sums, landings counts, and means derived from the two
+ROLLUP_AGGS = ("sum", "count", "mean")
+AGGREGATIONS = ROLLUP_AGGS + ("min", "max")
+
+
+def _month(values):
+    return np.asarray(values, dtype="datetime64[ns]").astype("datetime64[M]")
+
+
+def fragment_sums(chunk, time_column):
+    """Catch, fish and landings summed per (species, station, month, gear) over one fragment."""
+    frame = pd.DataFrame({
+        "Species": chunk["Species"],
+        "Station": chunk["Station"],
+        "Month": _month(chunk[time_column]).astype(str),
+        "Gear": chunk["Gear"],
+        "Catch_kg": chunk["Catch_kg"],
+        "Count": chunk["Count"],
+    })
+    sums = frame.groupby(list(DIMENSIONS), sort=False).agg(
+        Catch_kg=("Catch_kg", "sum"), Count=("Count", "sum"), Landings=("Catch_kg", "size")
+    ).reset_index()
+    return {name: sums[name].tolist() for name in sums.columns}
+
+
+def _month_filters(filters, time_column):
+    """Rewrite month-aligned ``>=``/``<`` bounds on ``time_column`` as ``Month`` bounds; ``None`` if one is not."""
+    rewritten = []
+    for name, op, value in filters:
+        if name == time_column:
+            bound = pd.Timestamp(value)
+            if op not in (">=", "<") or bound != bound.to_period("M").start_time:
+                return None
+            name, value = "Month", bound
+        rewritten.append((name, op, value))
+    return rewritten
+
+
+def _coerce(name, op, value):
+    """Bring a ``Month`` filter value to the first instant of its month."""
+    if name != "Month":
+        return value
+    def start(v):
+        return pd.Timestamp(v).to_period("M").start_time.to_datetime64()
+    return [start(v) for v in value] if op == "in" else start(value)
+
+
+def _time_bounds(time_column, op, month):
+    """``Month`` bounds as bounds on the time column, so the store's zone maps can prune fragments."""
+    after = (pd.Timestamp(month).to_period("M") + 1).start_time.to_datetime64()
+    return {
+        "==": [(time_column, ">=", month), (time_column, "<", after)],
+        ">=": [(time_column, ">=", month)],
+        ">": [(time_column, ">=", after)],
+        "<": [(time_column, "<", month)],
+        "<=": [(time_column, "<", after)],
+    }.get(op)
+
+
+def _mask(columns, filters):
+    mask = None
+    for name, op, value in filters:
+        hit = np.asarray(_OPS[op](columns[name], value), dtype=bool)
+        mask = hit if mask is None else mask & hit
+    return mask
+
+
+class CatchCube:
+    """Rollups of the catch table over every subset of ``DIMENSIONS``, refreshed per store version.
+
+    Filters are ``(column, op, value)`` tuples combined with AND, as for
+    ``ColumnStore``; ``Month`` takes any timestamp inside the month.
+    """
+
+    def __init__(self, store, cache_path, table="catch"):
+        self.store = store
+        self.table = table
+        self.cache_path = Path(cache_path)
+        self.chunks = {}
+        self.rollups = {}
+        self.version = None
+        self.answered = {"rollup": 0, "scan": 0}
+        self._lock = threading.Lock()
+        if self.cache_path.exists():
+            with open(self.cache_path) as f:
+                self.chunks = json.load(f)
+        self.refresh()
+
+    def refresh(self):
+        """Bring the rollups up to the store's current version; returns how many fragments were summed."""
+        with self._lock:
+            self.store.refresh()
+            if self.version == self.store.version:
+                return 0
+            time_column = self.store.time_column(self.table)
+            fragments = self.store.fragments(self.table)
+            live = {frag["path"] for frag in fragments}
+            fresh = 0
+            for frag in fragments:
+                if frag["path"] not in self.chunks:
+                    chunk = {name: self.store.column(frag, name) for name in ("Species", "Station", "Gear", *MEASURES)}
+                    chunk[time_column] = self.store.column(frag, time_column)
+                    self.chunks[frag["path"]] = fragment_sums(chunk, time_column)
+                    fresh += 1
+            self.chunks = {path: sums for path, sums in self.chunks.items() if path in live}
+            self.rollups = self._materialize()
+            self.version = self.store.version
+            if fresh:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.cache_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+                with open(tmp, "w") as f:
+                    json.dump(self.chunks, f)
+                os.replace(tmp, self.cache_path)
+            return fresh
+
+    def _materialize(self):
+        base = pd.concat([pd.DataFrame(sums) for sums in self.chunks.values()], ignore_index=True)
+        if base.empty:
+            base = pd.DataFrame({name: [] for name in (*DIMENSIONS, *MEASURES, "Landings")})
+        base["Month"] = pd.to_datetime(base["Month"])
+        base = base.groupby(list(DIMENSIONS), as_index=False)[[*MEASURES, "Landings"]].sum()
+        rollups = {}
+        # Finest first, so each rollup is summed from the smallest parent already built
+        for size in range(len(DIMENSIONS), -1, -1):
+            for dims in combinations(DIMENSIONS, size):
+                parents = [frame for key, frame in rollups.items() if set(dims) < set(key)]
+                parent = min(parents, key=len) if parents else base
+                if dims:
+                    rollups[dims] = parent.groupby(list(dims), as_index=False)[[*MEASURES, "Landings"]].sum()
+                else:
+                    rollups[dims] = parent[[*MEASURES, "Landings"]].sum().to_frame().T
+        return rollups
+
+    def plan(self, group_by=(), agg="sum", filters=None):
+        """Dimensions of the smallest rollup that answers the query, or ``None`` if it needs a scan."""
+        if agg not in ROLLUP_AGGS:
+            return None
+        filters = _month_filters(filters or (), self.store.time_column(self.table))
+        if filters is None:
+            return None
+        wanted = set(group_by) | {name for name, _, _ in filters}
+        if not wanted <= set(DIMENSIONS):
+            return None
+        rollups = self.rollups
+        return min((dims for dims in rollups if wanted <= set(dims)), key=lambda dims: len(rollups[dims]))
+
+    def query(self, group_by=(), measure="Catch_kg", agg="sum", filters=None):
+        """``agg`` of ``measure`` per ``group_by`` combination over the landings matching ``filters``.
+
+        ``agg`` is one of ``AGGREGATIONS``; ``count`` counts landings.  Rows
+        come back largest first.
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation: {agg}")
+        if measure not in MEASURES:
+            raise KeyError(f"Unknown measure {measure!r}")
+        group_by = list(group_by)
+        filters = list(filters or ())
+        dims = self.plan(group_by, agg, filters)
+        if dims is None:
+            self.answered["scan"] += 1
+            result = self._scan(group_by, measure, agg, filters)
+        else:
+            self.answered["rollup"] += 1
+            filters = _month_filters(filters, self.store.time_column(self.table))
+            result = self._from_rollup(self.rollups[dims], group_by, measure, agg, filters)
+        return result.sort_values(measure, ascending=False, kind="stable").reset_index(drop=True)
+
+    def _from_rollup(self, rollup, group_by, measure, agg, filters):
+        filters = [(name, op, _coerce(name, op, value)) for name, op, value in filters]
+        mask = _mask({name: rollup[name].to_numpy() for name, _, _ in filters}, filters)
+        rows = rollup if mask is None else rollup[mask]
+        summed = rows.groupby(group_by, as_index=False)[[measure, "Landings"]].sum() if group_by else \
+            rows[[measure, "Landings"]].sum().to_frame().T
+        if agg == "count":
+            summed[measure] = summed["Landings"]
+        elif agg == "mean":
+            summed[measure] = summed[measure] / summed["Landings"].where(summed["Landings"] > 0)
+        return summed[[*group_by, measure]]
+
+    def _scan(self, group_by, measure, agg, filters):
+        time_column = self.store.time_column(self.table)
+        pushed, by_month = [], []
+        for name, op, value in filters:
+            if name != "Month":
+                pushed.append((name, op, value))
+                continue
+            value = _coerce(name, op, value)
+            bounds = None if op == "in" else _time_bounds(time_column, op, value)
+            if bounds is None:
+                by_month.append((name, op, value))
+            else:
+                pushed.extend(bounds)
+        columns = list(dict.fromkeys([*(c for c in group_by if c != "Month"), measure, time_column]))
+        frame = self.store.read(self.table, columns=columns, filters=pushed)
+        frame["Month"] = _month(frame[time_column]).astype("datetime64[ns]")
+        mask = _mask({"Month": frame["Month"].to_numpy()}, by_month)
+        if mask is not None:
+            frame = frame[mask]
+        reducer = {"sum": "sum", "count": "size", "mean": "mean", "min": "min", "max": "max"}[agg]
+        # Named aggregation keeps the column called ``measure``; "size" would otherwise name it "size"
+        if group_by:
+            return frame.groupby(group_by, as_index=False).agg(**{measure: (measure, reducer)})
+        return pd.DataFrame({measure: [frame[measure].agg(reducer)]})
+
+    def total(self, measure="Catch_kg"):
+        """Grand total of ``measure`` (or of landings, for ``"Landings"``) straight from the apex rollup."""
+        return self.rollups[()][measure].iloc[0].item()
+
+    def months(self):
+        """First and last month with landings."""
+        months = self.rollups[("Month",)]["Month"]
+        return (months.min(), months.max()) if len(months) else (None, None)
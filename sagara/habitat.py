@@ -0,0 +1,217 @@
+"""Tiled habitat-suitability rasters on a lat/lon/depth grid.
+
+The region is cut into square tiles of ``TILE_CELLS`` grid cells.  A tile is
+scored in one vectorized pass over (lat, lon, depth level, species): surface
+temperature and salinity are interpolated from the stations (inverse-distance
+weighting) and carried down the water column, and each species' Gaussian
+preference for temperature, salinity and depth is evaluated at every wet
+cell.  The best depth in the selected range gives the tile's 2-D score.
+
+Tiles live in an LRU cache keyed on tile, species, depth range and store
+version, so panning the map only scores tiles that were never seen, and a
+viewport raster is assembled from the tiles it touches rather than from the
+whole region.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+
+# south, west, north, east
+REGION = (17.0, 67.0, 22.0, 74.0)
+CELL_DEG = 0.02
+TILE_CELLS = 64
+DEPTH_LEVELS = np.arange(0, 201, 10)
+ALL_SPECIES = "All species"
+
+# Approximate shoreline longitude by latitude; the shelf deepens westward from it
+COAST = ([17.0, 18.5, 18.9, 19.2, 19.6, 20.2, 21.0, 22.0], [73.3, 73.0, 72.95, 73.05, 72.75, 72.85, 72.65, 72.5])
+SHELF_DEPTH = 200.0
+SHELF_WIDTH_DEG = 1.2
+
+# Temperature drop and salinity gain from the surface to below the thermocline
+THERMOCLINE_DROP = 8.0
+HALOCLINE_GAIN = 0.5
+
+# Temperature and salinity optimum / tolerance per species; depth comes from Habitat_Depth
+PREFERENCES = {
+    "Tuna": (24.0, 4.0, 35.0, 2.0),
+    "Sardine": (25.5, 3.0, 34.8, 1.5),
+    "Mackerel": (25.0, 3.0, 35.0, 1.5),
+    "Anchovy": (26.0, 3.0, 34.6, 1.5),
+    "Pomfret": (25.0, 3.0, 35.2, 1.5),
+    "Kingfish": (24.5, 3.5, 35.0, 2.0),
+}
+DEFAULT_PREFERENCE = (25.0, 3.5, 35.0, 2.0)
+
+
+def seafloor_depth(lat, lon):
+    """Water depth in metres; zero or less is land."""
+    coast = np.interp(lat, *COAST)
+    offshore = coast - lon
+    return np.where(offshore > 0, SHELF_DEPTH * (1 - np.exp(-offshore / SHELF_WIDTH_DEG)), 0.0)
+
+
+def idw(lat, lon, points_lat, points_lon, values, power=2):
+    """Inverse-distance-weighted interpolation of station ``values`` onto arrays of points."""
+    d2 = (lat[..., None] - points_lat) ** 2 + (lon[..., None] - points_lon) ** 2
+    weights = 1.0 / np.maximum(d2, 1e-12) ** (power / 2)
+    return (weights * values).sum(axis=-1) / weights.sum(axis=-1)
+
+
+VIRIDIS = [[68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]]
+
+
+def colorize(raster, alpha=0.65, stops=VIRIDIS, fade=True):
+    """RGBA image of a [0, 1] raster (north row first); NaN is transparent.
+
+    With ``fade`` (suitability) low values fade out and zero is transparent;
+    otherwise every finite cell gets ``alpha``.
+    """
+    stops = np.asarray(stops, dtype=np.float64)
+    missing = np.isnan(raster[::-1])
+    value = np.nan_to_num(raster[::-1], nan=0.0)
+    position = np.clip(value, 0, 1) * (len(stops) - 1)
+    low = np.minimum(position.astype(np.int64), len(stops) - 2)
+    frac = (position - low)[..., None]
+    rgb = stops[low] * (1 - frac) + stops[low + 1] * frac
+    if fade:
+        a = np.where(value > 0.05, alpha * 255 * np.sqrt(np.clip(value, 0, 1)), 0.0)
+    else:
+        a = np.where(missing, 0.0, alpha * 255)
+    return np.dstack([rgb, a]).astype(np.uint8)
+
+
+class HabitatEngine:
+    """Habitat suitability tiles for the species in ``store``."""
+
+    def __init__(self, store, region=REGION, cell_deg=CELL_DEG, tile_cells=TILE_CELLS, cache_size=512):
+        self.store = store
+        self.region = region
+        self.cell_deg = cell_deg
+        self.tile_cells = tile_cells
+        self.rows = int(round((region[2] - region[0]) / cell_deg))
+        self.cols = int(round((region[3] - region[1]) / cell_deg))
+        self.cache = LRUCache(cache_size)
+        self._inputs = (None, None, None)
+        self._lock = threading.Lock()
+
+    def inputs(self):
+        """Station surface conditions (last 30 days) and species preferences for this version."""
+        with self._lock:
+            version, stations, species = self._inputs
+            if version != self.store.version:
+                _, last = self.store.stats("oceanographic", "Date")
+                recent = self.store.read(
+                    "oceanographic",
+                    ["Station", "Temperature", "Salinity"],
+                    [("Date", ">", last - pd.Timedelta(days=30))],
+                )
+                stations = self.store.read("locations", columns=["Station", "Location", "Latitude", "Longitude"]).merge(
+                    recent.groupby("Station")[["Temperature", "Salinity"]].median().reset_index(), on="Station"
+                )
+                species = self.store.read("species", columns=["Species", "Habitat_Depth"])
+                prefs = np.array([PREFERENCES.get(name, DEFAULT_PREFERENCE) for name in species["Species"]])
+                species = species.assign(
+                    Temp_Opt=prefs[:, 0], Temp_Tol=prefs[:, 1], Salinity_Opt=prefs[:, 2], Salinity_Tol=prefs[:, 3],
+                    Depth_Tol=np.maximum(15.0, species["Habitat_Depth"] * 0.6),
+                )
+                self._inputs = (self.store.version, stations, species)
+            return stations, species
+
+    def species(self):
+        return self.inputs()[1]["Species"].tolist()
+
+    def score(self, lat, lon, species=ALL_SPECIES, depth_range=(0, 200)):
+        """Suitability in [0, 1] at arrays of points (NaN on land), best depth in ``depth_range``."""
+        stations, prefs = self.inputs()
+        if species != ALL_SPECIES:
+            prefs = prefs[prefs["Species"] == species]
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        floor = seafloor_depth(lat, lon)
+        surface_t = idw(lat, lon, stations["Latitude"].to_numpy(), stations["Longitude"].to_numpy(),
+                        stations["Temperature"].to_numpy())
+        surface_s = idw(lat, lon, stations["Latitude"].to_numpy(), stations["Longitude"].to_numpy(),
+                        stations["Salinity"].to_numpy())
+        z = DEPTH_LEVELS[(DEPTH_LEVELS >= depth_range[0]) & (DEPTH_LEVELS <= depth_range[1])].astype(np.float64)
+        # Axes: (*points, depth level, species)
+        temp = (surface_t[..., None] - THERMOCLINE_DROP * (1 - np.exp(-z / 60)))[..., None]
+        salt = (surface_s[..., None] + HALOCLINE_GAIN * (1 - np.exp(-z / 100)))[..., None]
+        depth = z[:, None]
+
+        def fit(value, opt, tol):
+            return np.exp(-0.5 * ((value - prefs[opt].to_numpy()) / prefs[tol].to_numpy()) ** 2)
+
+        suitability = (
+            fit(temp, "Temp_Opt", "Temp_Tol")
+            * fit(salt, "Salinity_Opt", "Salinity_Tol")
+            * fit(depth, "Habitat_Depth", "Depth_Tol")
+        )
+        wet = (z <= floor[..., None])[..., None]
+        best = np.where(wet, suitability, 0.0).max(axis=-2, initial=0.0).max(axis=-1, initial=0.0)
+        return np.where(floor > 0, best, np.nan)
+
+    def tile(self, row, col, species=ALL_SPECIES, depth_range=(0, 200)):
+        """``(TILE_CELLS, TILE_CELLS)`` float32 scores, south row first; NaN outside the region."""
+        key = (row, col, species, tuple(depth_range), self.store.version)
+        return self.cache.get_or_compute(key, lambda: self._tile(row, col, species, depth_range))
+
+    def _tile(self, row, col, species, depth_range):
+        n = self.tile_cells
+        i = row * n + np.arange(n)
+        j = col * n + np.arange(n)
+        lat = self.region[0] + (i + 0.5) * self.cell_deg
+        lon = self.region[1] + (j + 0.5) * self.cell_deg
+        grid_lat, grid_lon = np.meshgrid(lat, lon, indexing="ij")
+        scores = self.score(grid_lat, grid_lon, species, depth_range).astype(np.float32)
+        scores[i >= self.rows] = np.nan
+        scores[:, j >= self.cols] = np.nan
+        return scores
+
+    def raster(self, bounds=None, species=ALL_SPECIES, depth_range=(0, 200)):
+        """Scores over ``(south, west, north, east)`` clipped to the region, from the tiles it touches.
+
+        Returns ``(raster, bounds)`` with the raster south row first and the
+        bounds snapped to grid cells; ``(None, None)`` outside the region.
+        """
+        south, west, north, east = bounds or self.region
+        i0 = max(0, int(np.floor((south - self.region[0]) / self.cell_deg)))
+        i1 = min(self.rows, int(np.ceil((north - self.region[0]) / self.cell_deg)))
+        j0 = max(0, int(np.floor((west - self.region[1]) / self.cell_deg)))
+        j1 = min(self.cols, int(np.ceil((east - self.region[1]) / self.cell_deg)))
+        if i0 >= i1 or j0 >= j1:
+            return None, None
+        n = self.tile_cells
+        t0, t1, u0, u1 = i0 // n, (i1 - 1) // n, j0 // n, (j1 - 1) // n
+        out = np.empty(((t1 - t0 + 1) * n, (u1 - u0 + 1) * n), dtype=np.float32)
+        for row in range(t0, t1 + 1):
+            for col in range(u0, u1 + 1):
+                out[(row - t0) * n:(row - t0 + 1) * n, (col - u0) * n:(col - u0 + 1) * n] = self.tile(
+                    row, col, species, depth_range
+                )
+        raster = out[i0 - t0 * n:i1 - t0 * n, j0 - u0 * n:j1 - u0 * n]
+        snapped = (
+            self.region[0] + i0 * self.cell_deg, self.region[1] + j0 * self.cell_deg,
+            self.region[0] + i1 * self.cell_deg, self.region[1] + j1 * self.cell_deg,
+        )
+        return raster, snapped
+
+    def summary(self, depth_range=(0, 200)):
+        """Per species: share of water cells scoring above 0.5 and the best station."""
+        stations, prefs = self.inputs()
+        rows = []
+        for name in prefs["Species"]:
+            raster, _ = self.raster(None, name, depth_range)
+            water = ~np.isnan(raster)
+            at_stations = self.score(stations["Latitude"].to_numpy(), stations["Longitude"].to_numpy(), name, depth_range)
+            best = int(np.nanargmax(at_stations)) if np.isfinite(at_stations).any() else None
+            rows.append({
+                "Species": name,
+                "Suitable_Area": float((raster[water] > 0.5).mean()) if water.any() else 0.0,
+                "Best_Station": stations["Location"].iloc[best] if best is not None else None,
+                "Best_Score": float(at_stations[best]) if best is not None else np.nan,
+            })
+        return pd.DataFrame(rows)
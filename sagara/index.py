@@ -0,0 +1,195 @@
+"""Sorted time index and quality-flag bitmaps over a ColumnStore table.
+
+The index is a permutation of every row of the table ordered by time, stored
+as three memory-mapped arrays (timestamp, fragment number, row within the
+fragment).  A time range becomes two binary searches, and a page of results is
+gathered straight from the fragments' column files, so only the rows on
+screen are ever materialized.
+
+Quality filters use one packed bitmap per QC bit plus a cumulative popcount
+every ``BLOCK_BITS`` rows, giving counting and "k-th matching row" lookups
+without decoding the whole bitmap.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .quality import QC_HIGH, QC_VALID, SERIES_COLUMN, VALID_RANGES, quality_flags
+from .store import reinstate_version, retire_versions
+
+BLOCK_BITS = 4096
+
+QC_LABELS = {0: "Suspect", QC_VALID: "Validated", QC_VALID | QC_HIGH: "High"}
+
+
+class TimeIndex:
+    """Time-ordered row index for one table at one store version."""
+
+    def __init__(self, store, table, directory):
+        self.store = store
+        self.table = table
+        self.directory = Path(directory)
+        with open(self.directory / "fragments.json") as f:
+            self.fragments = json.load(f)
+        self.times = np.load(self.directory / "times.npy", mmap_mode="r")
+        self.fragment_ids = np.load(self.directory / "fragment.npy", mmap_mode="r")
+        self.rows = np.load(self.directory / "row.npy", mmap_mode="r")
+        self.flags = np.load(self.directory / "flags.npy", mmap_mode="r")
+        self._bitmaps = {
+            bit: (
+                np.load(self.directory / f"bitmap_{bit}.npy", mmap_mode="r"),
+                np.load(self.directory / f"rank_{bit}.npy", mmap_mode="r"),
+            )
+            for bit in (QC_VALID, QC_HIGH)
+        }
+
+    @classmethod
+    def open(cls, store, table, root):
+        """Load the index for the store's current version, building it if needed."""
+        table_dir = Path(root) / table
+        version = store.table_version(table)
+        directory = table_dir / version
+        if not (directory / "fragments.json").exists():
+            cls.build(store, table, directory)
+            # Indexes of older versions stay until the sessions pinned to them have moved on
+            retire_versions(table_dir, version)
+        else:
+            reinstate_version(directory)
+        return cls(store, table, directory)
+
+    @staticmethod
+    def build(store, table, directory):
+        fragments = store.fragments(table)
+        time_column = store.time_column(table)
+        has_quality = all(name in store.schema(table) for name in VALID_RANGES)
+        qc_columns = [*VALID_RANGES, *([SERIES_COLUMN] if SERIES_COLUMN in store.schema(table) else [])]
+        total = sum(frag["rows"] for frag in fragments)
+
+        tmp = Path(f"{directory}.{os.getpid()}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        times = np.empty(total, dtype=np.int64)
+        fragment_ids = np.empty(total, dtype=np.int32)
+        rows = np.empty(total, dtype=np.int64)
+        flags = np.zeros(total, dtype=np.uint8)
+        offset = 0
+        for number, frag in enumerate(fragments):
+            n = frag["rows"]
+            times[offset:offset + n] = store.column(frag, time_column).astype("datetime64[ns]").view(np.int64)
+            fragment_ids[offset:offset + n] = number
+            rows[offset:offset + n] = np.arange(n)
+            if has_quality:
+                flags[offset:offset + n] = quality_flags({name: store.column(frag, name) for name in qc_columns})
+            offset += n
+
+        # Fragments are already time-sorted runs, which the stable sort exploits
+        order = np.argsort(times, kind="stable")
+        np.save(tmp / "times.npy", times[order])
+        np.save(tmp / "fragment.npy", fragment_ids[order])
+        np.save(tmp / "row.npy", rows[order])
+        flags = flags[order]
+        np.save(tmp / "flags.npy", flags)
+        for bit in (QC_VALID, QC_HIGH):
+            mask = (flags & bit) != 0
+            starts = np.arange(0, total, BLOCK_BITS)
+            per_block = np.add.reduceat(mask.astype(np.int64), starts) if total else np.zeros(0, np.int64)
+            np.save(tmp / f"bitmap_{bit}.npy", np.packbits(mask))
+            np.save(tmp / f"rank_{bit}.npy", np.concatenate([[0], np.cumsum(per_block)]))
+        with open(tmp / "fragments.json", "w") as f:
+            json.dump(fragments, f)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another builder got there first with an identical index
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def __len__(self):
+        return len(self.times)
+
+    def span(self):
+        if len(self.times) == 0:
+            return None, None
+        return pd.Timestamp(int(self.times[0])), pd.Timestamp(int(self.times[-1]))
+
+    def range(self, start=None, end=None):
+        """Positions ``[lo, hi)`` of rows with ``start <= time <= end``."""
+        lo = 0 if start is None else int(np.searchsorted(self.times, pd.Timestamp(start).value, side="left"))
+        hi = len(self.times) if end is None else int(np.searchsorted(self.times, pd.Timestamp(end).value, side="right"))
+        return lo, max(lo, hi)
+
+    def count(self, lo, hi, quality=0):
+        """Number of rows in ``[lo, hi)`` carrying every bit of ``quality``."""
+        if not quality:
+            return hi - lo
+        return self._rank(quality, hi) - self._rank(quality, lo)
+
+    def positions(self, lo, hi, offset=0, limit=100, quality=0, descending=False):
+        """Index positions of one page of matching rows, in display order."""
+        total = self.count(lo, hi, quality)
+        if descending:
+            first, last = max(0, total - offset - limit), max(0, total - offset)
+        else:
+            first, last = min(total, offset), min(total, offset + limit)
+        if first >= last:
+            return np.empty(0, dtype=np.int64)
+        if not quality:
+            found = np.arange(lo + first, lo + last)
+        else:
+            base = self._rank(quality, lo)
+            found = self._select(quality, base + first, base + last)
+        return found[::-1] if descending else found
+
+    def iter_positions(self, lo, hi, quality=0, batch=65536):
+        """Yield ascending position arrays covering every match in ``[lo, hi)``."""
+        for start in range(lo, hi, batch):
+            stop = min(hi, start + batch)
+            found = np.arange(start, stop)
+            if quality:
+                found = found[(self.flags[start:stop] & quality) == quality]
+            if len(found):
+                yield found
+
+    def take(self, positions, columns=None, with_quality=False):
+        """Gather rows at ``positions`` from the fragments' memory-mapped columns."""
+        columns = list(columns or self.store.schema(self.table))
+        positions = np.asarray(positions, dtype=np.int64)
+        fragment_ids = self.fragment_ids[positions]
+        rows = self.rows[positions]
+        schema = self.store.schema(self.table)
+        data = {name: np.empty(len(positions), dtype=schema[name]) for name in columns}
+        for number in np.unique(fragment_ids):
+            where = np.flatnonzero(fragment_ids == number)
+            frag = self.fragments[number]
+            for name in columns:
+                data[name][where] = self.store.column(frag, name)[rows[where]]
+        frame = pd.DataFrame(data)
+        if with_quality:
+            flags = np.asarray(self.flags[positions])
+            frame["QC"] = pd.Series(flags).map(QC_LABELS).fillna("Suspect").to_numpy()
+        return frame
+
+    def _rank(self, bit, pos):
+        """Number of rows before ``pos`` with ``bit`` set."""
+        bitmap, rank = self._bitmaps[bit]
+        block = pos // BLOCK_BITS
+        start = block * BLOCK_BITS
+        count = int(rank[min(block, len(rank) - 1)])
+        if pos > start:
+            count += int(np.unpackbits(bitmap[start // 8:(pos + 7) // 8])[:pos - start].sum())
+        return count
+
+    def _select(self, bit, first, last):
+        """Positions of the ``first``-th up to ``last``-th rows with ``bit`` set."""
+        bitmap, rank = self._bitmaps[bit]
+        block_a = int(np.searchsorted(rank, first, side="right")) - 1
+        block_b = int(np.searchsorted(rank, last - 1, side="right")) - 1
+        start = block_a * BLOCK_BITS
+        stop = (block_b + 1) * BLOCK_BITS
+        hits = np.flatnonzero(np.unpackbits(bitmap[start // 8:stop // 8])) + start
+        skip = first - int(rank[block_a])
+        return hits[skip:skip + (last - first)]
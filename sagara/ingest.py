@@ -0,0 +1,314 @@
+"""Background sensor ingest into fixed-size, array-backed ring buffers.
+
+An asyncio loop on a daemon thread accepts newline-delimited JSON readings
+from a local TCP socket and from an appended-to file::
+
+    {"sensor": "S001", "time": "2024-12-31T10:00:00", "Temperature": 26.1, ...}
+
+Readings land in one preallocated ``(sensors, capacity)`` block per field, so
+memory is fixed no matter how long the feed runs.  Readers get read-only
+views of those blocks; nothing is copied to draw the dashboard.
+
+Only one process can own the socket.  With several server worker processes,
+the others follow the file alone and retry the socket every
+``RETRY_SECONDS``, taking it over if its owner exits.
+
+Run ``python -m sagara.ingest`` to stream synthetic readings to the socket.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import DATA_DIR
+
+FIELDS = ("Temperature", "Salinity", "pH", "Dissolved_Oxygen", "Battery")
+HOST = os.environ.get("SAGARA_INGEST_HOST", "127.0.0.1")
+PORT = int(os.environ.get("SAGARA_INGEST_PORT", "8503"))
+TAIL_PATH = Path(os.environ.get("SAGARA_INGEST_FILE", DATA_DIR / "ingest" / "readings.jsonl"))
+RETRY_SECONDS = 5.0
+
+
+def _readonly(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class RingBuffers:
+    """Last ``capacity`` readings of every sensor in shared 2-D arrays.
+
+    ``writes[i]`` counts every reading sensor ``i`` has ever received, so the
+    slot of the next write is ``writes[i] % capacity``.
+    """
+
+    def __init__(self, sensor_ids, capacity=1024, fields=FIELDS, spare=0.25):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        slots = len(sensor_ids) + max(1, int(len(sensor_ids) * spare))
+        self.sensor_ids = list(sensor_ids)
+        self.slot_of = {sensor: i for i, sensor in enumerate(self.sensor_ids)}
+        self.times = np.zeros((slots, capacity), dtype=np.int64)
+        self.values = np.full((len(self.fields), slots, capacity), np.nan, dtype=np.float32)
+        self.writes = np.zeros(slots, dtype=np.int64)
+        self.latest_time = np.zeros(slots, dtype=np.int64)
+        self.latest = np.full((len(self.fields), slots), np.nan, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sensor_ids)
+
+    def slots(self, sensors):
+        """Slot numbers for sensor ids, registering unseen ids in spare slots (-1 when full)."""
+        out = np.empty(len(sensors), dtype=np.int64)
+        for i, sensor in enumerate(sensors):
+            slot = self.slot_of.get(sensor)
+            if slot is None:
+                if len(self.sensor_ids) >= len(self.writes):
+                    out[i] = -1
+                    continue
+                slot = self.slot_of[sensor] = len(self.sensor_ids)
+                self.sensor_ids.append(sensor)
+            out[i] = slot
+        return out
+
+    def write(self, slots, times, values):
+        """Append a batch; ``values`` is ``(fields, n)`` and may repeat sensors."""
+        slots = np.asarray(slots, dtype=np.int64)
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        if len(slots) == 0:
+            return
+        # Readings of the same sensor within a batch take consecutive slots, in time order
+        order = np.lexsort((times, slots))
+        slots, times, values = slots[order], times[order], values[:, order]
+        run_start = np.concatenate([[0], np.flatnonzero(np.diff(slots)) + 1])
+        rank = np.arange(len(slots)) - np.repeat(run_start, np.diff(np.append(run_start, len(slots))))
+        with self._lock:
+            position = (self.writes[slots] + rank) % self.capacity
+            self.times[slots, position] = times
+            self.values[:, slots, position] = values
+            last = np.append(run_start[1:], len(slots)) - 1
+            newest = slots[last]
+            newer = times[last] >= self.latest_time[newest]
+            self.latest_time[newest[newer]] = times[last][newer]
+            self.latest[:, newest[newer]] = values[:, last][:, newer]
+            np.add.at(self.writes, slots, 1)
+
+    def latest_snapshot(self):
+        """Read-only views of the newest reading per sensor: ``(times, {field: values})``."""
+        n = len(self.sensor_ids)
+        return _readonly(self.latest_time[:n]), {
+            field: _readonly(self.latest[i, :n]) for i, field in enumerate(self.fields)
+        }
+
+    def online(self, within_s, now_ns=None):
+        """How many sensors sent a reading in the last ``within_s`` seconds."""
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        latest = self.latest_time[:len(self.sensor_ids)]
+        return int(((latest > 0) & (now_ns - latest < within_s * 1e9)).sum())
+
+    def window(self, sensor, field):
+        """Chronological ``[(times, values), ...]`` views of one sensor's buffer.
+
+        A wrapped ring comes back as two views (older part first) instead of
+        being copied into one array.
+        """
+        slot = self.slot_of[sensor]
+        count = int(self.writes[slot])
+        values = self.values[self.fields.index(field), slot]
+        times = self.times[slot]
+        if count <= self.capacity:
+            return [(_readonly(times[:count]), _readonly(values[:count]))]
+        head = count % self.capacity
+        return [
+            (_readonly(times[head:]), _readonly(values[head:])),
+            (_readonly(times[:head]), _readonly(values[:head])),
+        ]
+
+
+class IngestService:
+    """Asyncio ingest loop on a daemon thread, feeding ``buffers``.
+
+    Callables registered with ``subscribe`` receive every accepted batch as
+    ``(sensor_ids, times_ns, {field: values})`` on the ingest thread; one
+    that raises is counted in ``subscriber_errors`` and does not stop the
+    others or the ingest.
+    """
+
+    def __init__(self, buffers, host=HOST, port=PORT, tail_path=TAIL_PATH, batch_interval=0.25):
+        self.buffers = buffers
+        self.host = host
+        self.port = port
+        self.tail_path = Path(tail_path)
+        self.batch_interval = batch_interval
+        self.received = 0
+        self.rejected = 0
+        self.subscriber_errors = 0
+        self.last_batch_at = None
+        self.last_lag_s = None
+        self.listening = False
+        self._pending = []
+        self._subscribers = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="sagara-ingest", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._serve())
+        self._loop.create_task(self._tail())
+        self._loop.create_task(self._flush_forever())
+        self._loop.run_forever()
+
+    async def _serve(self):
+        while not self.listening:
+            try:
+                await asyncio.start_server(self._handle, self.host, self.port)
+                self.listening = True
+            except OSError:
+                # Another worker process owns the socket; the file tail still works meanwhile
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def _handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                self._pending.append(line)
+        finally:
+            writer.close()
+
+    async def _tail(self):
+        offset = None
+        while True:
+            try:
+                size = self.tail_path.stat().st_size
+                if offset is None or size < offset:
+                    # Start at the end on first sight, and again after truncation
+                    offset = size
+                elif size > offset:
+                    with open(self.tail_path, "rb") as f:
+                        f.seek(offset)
+                        chunk = f.read(size - offset)
+                    complete = chunk.rfind(b"\n") + 1
+                    self._pending.extend(chunk[:complete].splitlines())
+                    offset += complete
+            except FileNotFoundError:
+                offset = 0
+            await asyncio.sleep(self.batch_interval)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            if self._pending:
+                lines, self._pending = self._pending, []
+                self.flush(lines)
+
+    def flush(self, lines):
+        """Parse and write one batch of raw JSON lines."""
+        sensors, times, rows = [], [], []
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise TypeError("a reading must be a JSON object")
+                stamp = record.get("time", time.time())
+                if isinstance(stamp, (int, float)):
+                    stamp_ns = int(stamp * 1e9)
+                else:
+                    stamp = pd.Timestamp(stamp)
+                    stamp_ns = (stamp.tz_convert("UTC").tz_localize(None) if stamp.tzinfo else stamp).value
+                row = [float(record.get(field, np.nan)) for field in self.buffers.fields]
+                sensors.append(str(record["sensor"]))
+                times.append(stamp_ns)
+                rows.append(row)
+            except (ValueError, KeyError, TypeError):
+                self.rejected += 1
+        if not sensors:
+            return
+        slots = self.buffers.slots(sensors)
+        valid = slots >= 0
+        self.rejected += int((~valid).sum())
+        if not valid.any():
+            return
+        times_ns = np.asarray(times, dtype=np.int64)[valid]
+        values = np.asarray(rows, dtype=np.float64)[valid].T
+        self.buffers.write(slots[valid], times_ns, values)
+        self.received += int(valid.sum())
+        self.last_batch_at = time.time()
+        self.last_lag_s = max(0.0, self.last_batch_at - times_ns.max() / 1e9)
+        batch_sensors = [sensor for sensor, ok in zip(sensors, valid) if ok]
+        fields = {field: values[i] for i, field in enumerate(self.buffers.fields)}
+        for callback in self._subscribers:
+            try:
+                callback(batch_sensors, times_ns, fields)
+            except Exception:
+                # The readings are already buffered; a failing consumer must not stop the feed
+                self.subscriber_errors += 1
+
+
+def emit(sensors, stations, host=HOST, port=PORT, interval=1.0, seed=None):
+    """Stream one synthetic reading per sensor every ``interval`` seconds."""
+    rng = np.random.default_rng(seed)
+    base = stations.set_index("Station")["Temperature"].reindex(sensors["Station"]).to_numpy()
+    battery = rng.uniform(40, 100, len(sensors))
+    with socket.create_connection((host, port)) as conn:
+        while True:
+            now = time.time()
+            battery = np.clip(battery - rng.uniform(0, 0.01, len(sensors)), 0, 100)
+            lines = [
+                json.dumps({
+                    "sensor": sensor,
+                    "time": now,
+                    "Temperature": round(float(t), 3),
+                    "Salinity": round(float(s), 3),
+                    "pH": round(float(p), 3),
+                    "Dissolved_Oxygen": round(float(o), 3),
+                    "Battery": round(float(b), 1),
+                })
+                for sensor, t, s, p, o, b in zip(
+                    sensors["Sensor_ID"],
+                    base + rng.normal(0, 0.3, len(sensors)),
+                    35 + rng.normal(0, 0.2, len(sensors)),
+                    8.1 + rng.normal(0, 0.05, len(sensors)),
+                    6.5 + rng.normal(0, 0.3, len(sensors)),
+                    battery,
+                )
+            ]
+            conn.sendall(("\n".join(lines) + "\n").encode())
+            time.sleep(max(0.0, interval - (time.time() - now)))
+
+
+def main():
+    from .config import STORE_DIR
+    from .store import ColumnStore
+
+    parser = argparse.ArgumentParser(description="Stream synthetic sensor readings to the ingest socket.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between sweeps of all sensors")
+    args = parser.parse_args()
+    store = ColumnStore(STORE_DIR)
+    emit(
+        store.read("sensors", columns=["Sensor_ID", "Station"]),
+        store.read("locations", columns=["Station", "Temperature"]),
+        args.host,
+        args.port,
+        args.interval,
+    )
+
+
+if __name__ == "__main__":
+    main()
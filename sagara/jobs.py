@@ -0,0 +1,289 @@
+"""Background jobs with persisted progress, results and cancellation.
+
+Long tasks (model training, eDNA batches, scenario ensembles, large exports)
+are submitted by kind and parameters and run on a small thread pool whose
+size is the concurrency limit; anything beyond it waits in the queue.  Heavy
+work inside a job still goes to the shared process pool, so the threads
+mostly wait.  Every state change is written to SQLite, so any session (or a
+restarted server) can look a job up by id, and finished results outlive the
+process.  Several server processes may share one database: each job records
+the process that owns it, and only jobs whose owner has exited are marked
+interrupted, never those another live process is still running.
+
+A job function is called as ``fn(job, **params)`` and reports through
+``job.progress(fraction, message, **detail)``, which also raises
+``JobCancelled`` once the job has been cancelled, so cancellation takes
+effect at the next progress report.  Its return value must be JSON-able.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+MAX_CONCURRENT = int(os.environ.get("SAGARA_MAX_JOBS", "2"))
+# Progress reports closer together than this are kept in memory only
+SAVE_EVERY_S = 0.5
+
+_COLUMNS = (
+    "id", "kind", "params", "status", "progress", "message", "detail", "result", "error",
+    "created", "started", "finished", "pid", "owner",
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _key(params):
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _process_token(pid):
+    """Boot id and start time of process ``pid``, telling it from a later one given the same pid.
+
+    None where ``/proc`` is not available.
+    """
+    try:
+        boot = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name are space separated; the start time is the 20th of them
+    return f"{boot}-{stat.rsplit(')', 1)[1].split()[19]}"
+
+
+def _alive(pid, owner):
+    """Whether the process that recorded ``pid`` and ``owner`` is still running."""
+    if pid is None:
+        # Written before jobs recorded their owner
+        return False
+    if pid == os.getpid():
+        return owner == _process_token(pid)
+    if os.name == "nt":
+        # os.kill would terminate the process; another process's jobs are left alone
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists, under another user
+        pass
+    return owner == _process_token(pid)
+
+
+class Job:
+    """Handle passed to a running job function."""
+
+    def __init__(self, scheduler, job_id):
+        self.id = job_id
+        self._scheduler = scheduler
+        self._saved_at = 0.0
+
+    @property
+    def cancelled(self):
+        return self.id in self._scheduler._cancelled
+
+    def progress(self, fraction, message=None, **detail):
+        """Record progress in [0, 1]; raises ``JobCancelled`` if the job was cancelled."""
+        if self.cancelled:
+            raise JobCancelled(self.id)
+        now = time.monotonic()
+        final = fraction >= 1
+        if final or detail or now - self._saved_at >= SAVE_EVERY_S:
+            self._saved_at = now
+            fields = {"progress": min(max(float(fraction), 0.0), 1.0), "message": message}
+            if detail:
+                fields["detail"] = json.dumps(detail, default=str)
+            self._scheduler._update(self.id, **fields)
+
+
+class JobScheduler:
+    """Runs registered job kinds on ``max_concurrent`` threads, persisting state to ``path``."""
+
+    def __init__(self, path, max_concurrent=MAX_CONCURRENT):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent = max_concurrent
+        self.kinds = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="sagara-job")
+        self._pid = os.getpid()
+        self._owner = _process_token(self._pid)
+        with self._connect() as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, progress REAL, message TEXT, "
+                "detail TEXT, result TEXT, error TEXT, created REAL, started REAL, finished REAL, "
+                "pid INTEGER, owner TEXT)"
+            )
+            # Databases from before jobs recorded their owner
+            known = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (("pid", "INTEGER"), ("owner", "TEXT")):
+                if name not in known:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_kind ON jobs (kind, params, created)")
+        self.reap()
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def reap(self):
+        """Mark the unfinished jobs of processes that have exited as interrupted; returns how many."""
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT id, pid, owner FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))})", ACTIVE
+            ).fetchall()
+        orphans = [job_id for job_id, pid, owner in rows if not _alive(pid, owner)]
+        with self._connect() as db, db:
+            db.executemany(
+                "UPDATE jobs SET status = ?, error = 'Interrupted by a server restart', finished = ? "
+                f"WHERE id = ? AND status IN ({','.join('?' * len(ACTIVE))})",
+                [[FAILED, time.time(), job_id, *ACTIVE] for job_id in orphans],
+            )
+        return len(orphans)
+
+    def register(self, kind, fn):
+        self.kinds[kind] = fn
+
+    def submit(self, kind, **params):
+        """Queue a job and return its id."""
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as db, db:
+            db.execute(
+                f"INSERT INTO jobs ({','.join(_COLUMNS)}) VALUES ({','.join('?' * len(_COLUMNS))})",
+                [job_id, kind, _key(params), QUEUED, 0.0, "Queued", None, None, None, time.time(), None, None,
+                 self._pid, self._owner],
+            )
+        self._executor.submit(self._run, job_id, kind, params)
+        return job_id
+
+    def cancel(self, job_id):
+        """Ask a job to stop; queued jobs never start, running ones stop at their next progress report."""
+        job = self.get(job_id)
+        if job is None or job["status"] not in ACTIVE:
+            return
+        with self._lock:
+            self._cancelled.add(job_id)
+        with self._connect() as db, db:
+            db.execute(
+                "UPDATE jobs SET status = ?, message = 'Cancelled', finished = ? WHERE id = ? AND status = ?",
+                [CANCELLED, time.time(), job_id, QUEUED],
+            )
+
+    def get(self, job_id, with_result=True):
+        """The job as a dict (``params``, ``detail`` and ``result`` decoded), or None.
+
+        With ``with_result=False`` the result is neither read nor decoded and
+        comes back None, for callers that only need the status.
+        """
+        with self._connect() as db:
+            row = db.execute(f"SELECT {_select(with_result)} FROM jobs WHERE id = ?", [job_id]).fetchone()
+        return _decode(row)
+
+    def latest(self, kind, with_result=True, **params):
+        """Most recent job of ``kind`` submitted with exactly ``params``, or None."""
+        with self._connect() as db:
+            row = db.execute(
+                f"SELECT {_select(with_result)} FROM jobs WHERE kind = ? AND params = ? ORDER BY created DESC LIMIT 1",
+                [kind, _key(params)],
+            ).fetchone()
+        return _decode(row)
+
+    def ensure(self, kind, with_result=True, **params):
+        """The latest job for ``params`` unless it failed or was cancelled; otherwise a new one."""
+        job = self.latest(kind, with_result, **params)
+        if job is not None and job["status"] in ACTIVE and not _alive(job["pid"], job["owner"]):
+            # Its process exited since this one started
+            self.reap()
+            job = self.latest(kind, with_result, **params)
+        if job is None or job["status"] in (FAILED, CANCELLED):
+            job = self.get(self.submit(kind, **params), with_result)
+        return job
+
+    def jobs(self, limit=20, kind=None, with_result=True):
+        """Most recent jobs first."""
+        query = f"SELECT {_select(with_result)} FROM jobs"
+        args = []
+        if kind is not None:
+            query += " WHERE kind = ?"
+            args.append(kind)
+        with self._connect() as db:
+            rows = db.execute(query + " ORDER BY created DESC LIMIT ?", [*args, limit]).fetchall()
+        return [_decode(row) for row in rows]
+
+    def active(self):
+        with self._connect() as db:
+            (count,) = db.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))})", ACTIVE
+            ).fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._cancelled.update(job["id"] for job in self.jobs(limit=1000) if job["status"] in ACTIVE)
+        self._executor.shutdown(wait=True)
+
+    def _update(self, job_id, **fields):
+        with self._connect() as db, db:
+            db.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                [*fields.values(), job_id],
+            )
+
+    def _run(self, job_id, kind, params):
+        if job_id in self._cancelled:
+            with self._lock:
+                self._cancelled.discard(job_id)
+            return
+        with self._connect() as db, db:
+            # Only a job still queued starts: another process sharing the database may have cancelled it
+            started = db.execute(
+                "UPDATE jobs SET status = ?, message = 'Running', started = ? WHERE id = ? AND status = ?",
+                [RUNNING, time.time(), job_id, QUEUED],
+            ).rowcount
+        if not started:
+            return
+        try:
+            result = self.kinds[kind](Job(self, job_id), **params)
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, message="Cancelled", finished=time.time())
+        except Exception as exc:
+            self._update(job_id, status=FAILED, message="Failed", error=f"{type(exc).__name__}: {exc}",
+                         finished=time.time())
+        else:
+            self._update(job_id, status=DONE, progress=1.0, message="Done", result=json.dumps(result, default=str),
+                         finished=time.time())
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+
+def _select(with_result):
+    """Column list for a query; a NULL stands in for the result when it is not wanted."""
+    return ",".join("NULL" if name == "result" and not with_result else name for name in _COLUMNS)
+
+
+def _decode(row):
+    if row is None:
+        return None
+    job = dict(zip(_COLUMNS, row))
+    for name in ("params", "detail", "result"):
+        if job[name] is not None:
+            job[name] = json.loads(job[name])
+    return job
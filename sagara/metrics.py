@@ -0,0 +1,255 @@
+"""In-process metrics, exposed in the Prometheus text format.
+
+A ``Registry`` holds counters, gauges and histograms, each keyed by its
+label values.  Numbers other components already keep -- cache hit/miss
+counters, the ingest lag -- are not copied on every update: they are read
+at scrape time by collectors registered with ``collect()``, and caches
+registered with ``watch_cache()``.
+``metrics_route`` serves the whole registry from the side server, so a
+Prometheus scraper (or ``curl``) can read it at ``/metrics``.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from .server import Response
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family: a value per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+    def samples(self):
+        """``(suffix, labels, value)`` for every series, labels as ``(name, value)`` pairs."""
+        with self._lock:
+            items = list(self._values.items())
+        return [("", tuple(zip(self.labels, key)), value) for key, value in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count per series, plus the last observation."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "last": None}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+            series["last"] = value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q, **labels):
+        """Estimate of the ``q`` quantile, interpolated within its bucket as Prometheus does."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is not None:
+                series = dict(series, buckets=list(series["buckets"]))
+        if not series or not series["count"]:
+            return None
+        rank = q * series["count"]
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.buckets, series["buckets"]):
+            if cumulative >= rank:
+                return lower + (bound - lower) * (rank - below) / max(cumulative - below, 1)
+            lower, below = bound, cumulative
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            items = [(key, dict(series, buckets=list(series["buckets"]))) for key, series in self._values.items()]
+        out = []
+        for key, series in items:
+            labels = tuple(zip(self.labels, key))
+            for bound, cumulative in zip(self.buckets, series["buckets"]):
+                out.append(("_bucket", labels + (("le", _format_value(float(bound))),), cumulative))
+            out.append(("_bucket", labels + (("le", "+Inf"),), series["count"]))
+            out.append(("_sum", labels, series["sum"]))
+            out.append(("_count", labels, series["count"]))
+        return out
+
+
+class ActiveSet:
+    """Keys seen within the last ``window`` seconds, e.g. sessions that reran recently."""
+
+    def __init__(self, window=300.0):
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key):
+        with self._lock:
+            self._seen[key] = time.monotonic()
+
+    def __len__(self):
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            self._seen = {key: seen for key, seen in self._seen.items() if seen >= cutoff}
+            return len(self._seen)
+
+
+class Registry:
+    """Metric families by name, plus collectors read at scrape time."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = [self._cache_families]
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name!r} is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def collect(self, collector):
+        """Add ``collector() -> [(name, kind, help, [(labels_dict, value), ...]), ...]``, called per scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def watch_cache(self, name, cache):
+        """Report ``cache``'s hit, miss, entry (and, if sized, byte) counts as ``cache=name``.
+
+        A later cache under the same name (say, for a newer data version)
+        replaces the earlier one.
+        """
+        with self._lock:
+            self._caches[name] = cache
+        return cache
+
+    def _cache_families(self):
+        with self._lock:
+            caches = sorted(self._caches.items())
+        families = [
+            ("sagara_cache_hits_total", "counter", "Cache lookups that found an entry.",
+             [({"cache": name}, cache.hits) for name, cache in caches]),
+            ("sagara_cache_misses_total", "counter", "Cache lookups that found nothing.",
+             [({"cache": name}, cache.misses) for name, cache in caches]),
+            ("sagara_cache_entries", "gauge", "Entries held by the cache.",
+             [({"cache": name}, len(cache)) for name, cache in caches]),
+        ]
+        sized = [({"cache": name}, cache.bytes) for name, cache in caches if hasattr(cache, "bytes")]
+        if sized:
+            families.append(("sagara_cache_bytes", "gauge", "Bytes held by size-bounded caches.", sized))
+        return families if caches else []
+
+    def render(self):
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        families = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            families[metric.name] = (metric.kind, metric.help, metric.samples())
+        for collector in collectors:
+            for name, kind, help, samples in collector():
+                _, _, previous = families.get(name, (kind, help, []))
+                samples = [("", tuple(sorted(labels.items())), value) for labels, value in samples]
+                families[name] = (kind, help, previous + samples)
+        lines = []
+        for name, (kind, help, samples) in sorted(families.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def metrics_route(registry):
+    """Side-server handler serving ``registry`` for Prometheus to scrape."""
+
+    def handle(path, params):
+        if path:
+            raise KeyError(f"Unknown metrics path {path!r}")
+        return Response([registry.render().encode()], "text/plain; version=0.0.4; charset=utf-8")
+
+    return handle
@@ -0,0 +1,332 @@
+"""Batch otolith classification with a content-hash result cache.
+
+Images are hashed first; any hash already classified by the current model is
+answered from a SQLite cache without being decoded.  The rest are decoded and
+preprocessed (grey-scale, resized, scaled to [0, 1]) in a process pool, then
+classified in batches on the calling thread.  ``OtolithPipeline.classify``
+yields each batch of rows as soon as it is ready, so the page can render
+results while the remaining images are still in flight.
+
+Any object with ``name``, ``classes`` and ``predict_proba(batch)`` can stand
+in for the default ``FeatureClassifier``.  ``train_softmax`` fits a softmax
+regression over the same features epoch by epoch, reporting loss and
+held-out accuracy after each one, for retraining as a background job.
+"""
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+IMAGE_SIZE = 64
+BATCH_IMAGES = 32
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocess(path, size=IMAGE_SIZE):
+    """Decode one image into a ``(size, size)`` float32 array in [0, 1]."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image = image.convert("L").resize((size, size), Image.BILINEAR)
+        return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def shape_features(batch):
+    """Outline and growth-ring descriptors for a ``(n, size, size)`` batch."""
+    n, size, _ = batch.shape
+    mask = batch > 0.2
+    area = mask.mean(axis=(1, 2))
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    weight = np.maximum(mask.sum(axis=(1, 2)), 1)
+    cy = (mask * y).sum(axis=(1, 2)) / weight
+    cx = (mask * x).sum(axis=(1, 2)) / weight
+    dy = y - cy[:, None, None]
+    dx = x - cx[:, None, None]
+    syy = (mask * dy * dy).sum(axis=(1, 2)) / weight
+    sxx = (mask * dx * dx).sum(axis=(1, 2)) / weight
+    sxy = (mask * dx * dy).sum(axis=(1, 2)) / weight
+    # Eigenvalues of the second-moment matrix give the elongation of the outline
+    spread = np.sqrt(((sxx - syy) / 2) ** 2 + sxy ** 2)
+    major = (sxx + syy) / 2 + spread
+    minor = np.maximum((sxx + syy) / 2 - spread, 1e-9)
+    elongation = np.sqrt(major / minor)
+    # Boundary pixels relative to an ellipse of the same moments: lobed edges score high
+    edge = (mask ^ np.roll(mask, 1, axis=1)) | (mask ^ np.roll(mask, 1, axis=2))
+    roughness = edge.sum(axis=(1, 2)) / (2 * np.pi * size * np.sqrt(2 * (major + minor)) + 1e-9)
+    # Growth rings show up as intensity swings inside the outline
+    gradient = np.abs(np.diff(batch, axis=1)) * mask[:, 1:, :]
+    rings = gradient.sum(axis=(1, 2)) / weight
+    inside = (batch * mask).sum(axis=(1, 2)) / weight
+    return np.column_stack([area, elongation, roughness, rings, inside])
+
+
+class FeatureClassifier:
+    """Nearest-centroid classifier over standardized shape features."""
+
+    def __init__(self, classes, centroids, mean, scale, accuracy=None):
+        self.classes = list(classes)
+        self.centroids = np.asarray(centroids)
+        self.mean = np.asarray(mean)
+        self.scale = np.asarray(scale)
+        self.accuracy = accuracy
+        # Cached results are keyed on this, so refitting invalidates them
+        fingerprint = hashlib.sha1(self.centroids.tobytes() + "|".join(self.classes).encode()).hexdigest()[:12]
+        self.name = f"shape-centroid-{fingerprint}"
+
+    @classmethod
+    def fit(cls, images, labels, classes):
+        features = shape_features(images)
+        labels = np.asarray(labels)
+        mean, scale = features.mean(axis=0), features.std(axis=0) + 1e-9
+        z = (features - mean) / scale
+        centroids = np.stack([z[labels == i].mean(axis=0) for i in range(len(classes))])
+        return cls(classes, centroids, mean, scale)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["classes"], data["centroids"], data["mean"], data["scale"], meta["accuracy"])
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({"classes": self.classes, "accuracy": self.accuracy})
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, mean=self.mean, scale=self.scale, meta=meta)
+
+    def predict_proba(self, batch):
+        z = (shape_features(batch) - self.mean) / self.scale
+        distance = ((z[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        logits = -distance / 2
+        logits -= logits.max(axis=1, keepdims=True)
+        odds = np.exp(logits)
+        return odds / odds.sum(axis=1, keepdims=True)
+
+
+class SoftmaxClassifier:
+    """Multinomial logistic regression over standardized shape features."""
+
+    def __init__(self, classes, weights, bias, mean, scale, accuracy=None):
+        self.classes = list(classes)
+        self.weights = np.asarray(weights)
+        self.bias = np.asarray(bias)
+        self.mean = np.asarray(mean)
+        self.scale = np.asarray(scale)
+        self.accuracy = accuracy
+        fingerprint = hashlib.sha1(self.weights.tobytes() + self.bias.tobytes() + "|".join(self.classes).encode())
+        self.name = f"shape-softmax-{fingerprint.hexdigest()[:12]}"
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["classes"], data["weights"], data["bias"], data["mean"], data["scale"], meta["accuracy"])
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({"type": "softmax", "classes": self.classes, "accuracy": self.accuracy})
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale, meta=meta)
+
+    def _logits(self, features):
+        return ((features - self.mean) / self.scale) @ self.weights + self.bias
+
+    def predict_proba(self, batch):
+        return _softmax(self._logits(shape_features(batch)))
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    odds = np.exp(logits)
+    return odds / odds.sum(axis=1, keepdims=True)
+
+
+def load_classifier(path):
+    """Whichever classifier type was saved at ``path``."""
+    with np.load(path) as data:
+        kind = json.loads(str(data["meta"])).get("type")
+    return SoftmaxClassifier.load(path) if kind == "softmax" else FeatureClassifier.load(path)
+
+
+def _training_set(species, seed, per_species):
+    """Synthetic reference scans with labels and a held-out mask."""
+    from .synth import OTOLITH_SHAPES, otolith_image
+
+    rng = np.random.default_rng(seed)
+    labels = np.repeat(np.arange(len(species)), per_species)
+    images = np.stack([
+        _resize(otolith_image(OTOLITH_SHAPES[label % len(OTOLITH_SHAPES)], rng)) for label in labels
+    ])
+    return images, labels, rng.random(len(labels)) < 0.25
+
+
+def train_softmax(species, epochs=30, learning_rate=0.5, batch=64, seed=0, per_species=60, on_epoch=None):
+    """Fit a ``SoftmaxClassifier`` by mini-batch gradient descent.
+
+    ``on_epoch(epoch, loss, accuracy)`` is called after every epoch with the
+    training loss and held-out accuracy; it may raise to stop training.
+    """
+    images, labels, held_out = _training_set(species, seed, per_species)
+    features = shape_features(images)
+    train, test = features[~held_out], features[held_out]
+    train_labels, test_labels = labels[~held_out], labels[held_out]
+    mean, scale = train.mean(axis=0), train.std(axis=0) + 1e-9
+    model = SoftmaxClassifier(
+        species, np.zeros((features.shape[1], len(species))), np.zeros(len(species)), mean, scale
+    )
+    z = (train - mean) / scale
+    onehot = np.eye(len(species))[train_labels]
+    rng = np.random.default_rng(seed)
+    for epoch in range(1, epochs + 1):
+        for rows in np.array_split(rng.permutation(len(z)), max(1, len(z) // batch)):
+            error = _softmax(z[rows] @ model.weights + model.bias) - onehot[rows]
+            model.weights -= learning_rate * z[rows].T @ error / len(rows)
+            model.bias -= learning_rate * error.mean(axis=0)
+        probabilities = _softmax(z @ model.weights + model.bias)
+        loss = float(-np.log(probabilities[np.arange(len(z)), train_labels] + 1e-12).mean())
+        accuracy = float((model._logits(test).argmax(axis=1) == test_labels).mean())
+        if on_epoch is not None:
+            on_epoch(epoch, loss, accuracy)
+    return SoftmaxClassifier(species, model.weights, model.bias, mean, scale, accuracy)
+
+
+def train_default_classifier(species, path, seed=0, per_species=60):
+    """Fit the default classifier on synthetic reference scans and save it."""
+    images, labels, held_out = _training_set(species, seed, per_species)
+    model = FeatureClassifier.fit(images[~held_out], labels[~held_out], species)
+    predicted = model.predict_proba(images[held_out]).argmax(axis=1)
+    model.accuracy = float((predicted == labels[held_out]).mean())
+    model.save(path)
+    return model
+
+
+def _resize(pixels, size=IMAGE_SIZE):
+    from PIL import Image
+
+    return np.asarray(Image.fromarray(pixels).resize((size, size), Image.BILINEAR), dtype=np.float32) / 255.0
+
+
+class ResultCache:
+    """``(content hash, model) -> (species, confidence)`` in SQLite."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "hash TEXT, model TEXT, species TEXT, confidence REAL, PRIMARY KEY (hash, model))"
+            )
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def get_many(self, hashes, model):
+        found = {}
+        with self._connect() as db:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = db.execute(
+                    f"SELECT hash, species, confidence FROM results WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                )
+                found.update((digest, (species, confidence)) for digest, species, confidence in rows)
+        return found
+
+    def put_many(self, rows, model):
+        with self._connect() as db, db:
+            db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                [(digest, model, species, confidence) for digest, species, confidence in rows],
+            )
+
+
+class OtolithPipeline:
+    """Hash, look up, preprocess in ``pool`` and classify a set of images."""
+
+    def __init__(self, classifier, cache, pool=None, batch=BATCH_IMAGES):
+        self.classifier = classifier
+        self.cache = cache
+        self.pool = pool
+        self.batch = batch
+        self.cached = 0
+        self.computed = 0
+        self._hashes = {}
+
+    def _hash(self, path):
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(key)
+        if digest is None:
+            digest = self._hashes[key] = file_hash(path)
+        return digest
+
+    def classify(self, paths):
+        """Yield frames of ``Image_ID``, ``Species``, ``Confidence`` as batches finish.
+
+        Cached images come back first in a single frame.
+        """
+        paths = [Path(path) for path in paths]
+        hashes = [self._hash(path) for path in paths]
+        known = self.cache.get_many(sorted(set(hashes)), self.classifier.name)
+        hits = [i for i, digest in enumerate(hashes) if digest in known]
+        self.cached += len(hits)
+        if hits:
+            yield pd.DataFrame({
+                "Image_ID": [paths[i].stem for i in hits],
+                "Species": [known[hashes[i]][0] for i in hits],
+                "Confidence": [known[hashes[i]][1] for i in hits],
+            })
+        misses = [i for i, digest in enumerate(hashes) if digest not in known]
+        # Duplicate content is decoded once and shares the answer
+        first_of = {}
+        for i in misses:
+            first_of.setdefault(hashes[i], i)
+        todo = list(first_of.values())
+        if self.pool is not None:
+            decoded = self.pool.map(preprocess, [paths[i] for i in todo], chunksize=max(1, min(self.batch, len(todo) // 16)))
+        else:
+            decoded = map(preprocess, [paths[i] for i in todo])
+        pending, pending_images = [], []
+        for i, image in zip(todo, decoded):
+            pending.append(i)
+            pending_images.append(image)
+            if len(pending) == self.batch:
+                yield self._infer(paths, hashes, pending, pending_images, misses)
+                pending, pending_images = [], []
+        if pending:
+            yield self._infer(paths, hashes, pending, pending_images, misses)
+
+    def _infer(self, paths, hashes, batch, images, misses):
+        probabilities = self.classifier.predict_proba(np.stack(images))
+        best = probabilities.argmax(axis=1)
+        answers = {
+            hashes[i]: (self.classifier.classes[label], round(float(p), 3))
+            for i, label, p in zip(batch, best, probabilities[np.arange(len(batch)), best])
+        }
+        self.cache.put_many([(digest, *answer) for digest, answer in answers.items()], self.classifier.name)
+        rows = [i for i in misses if hashes[i] in answers]
+        self.computed += len(batch)
+        return pd.DataFrame({
+            "Image_ID": [paths[i].stem for i in rows],
+            "Species": [answers[hashes[i]][0] for i in rows],
+            "Confidence": [answers[hashes[i]][1] for i in rows],
+        })
+
+
+def image_paths(directory):
+    return sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
@@ -0,0 +1,85 @@
+"""Sampling profiler for catching slow reruns in production.
+
+While a ``capture()`` block runs, a background thread samples the calling
+thread's Python stack every ``interval`` seconds through
+``sys._current_frames()``; the profiled code is not traced or slowed down
+beyond the sampling itself.  If the block took at least ``threshold``
+seconds the samples are written as collapsed stacks (``frame;frame;frame
+count`` per line), the input of ``flamegraph.pl`` and speedscope; faster
+runs are discarded.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# Reruns at least this slow are kept; unset disables the profiler
+SLOW_SECONDS = float(os.environ["SAGARA_PROFILE_SLOW_S"]) if os.environ.get("SAGARA_PROFILE_SLOW_S") else None
+INTERVAL = float(os.environ.get("SAGARA_PROFILE_INTERVAL_S", "0.005"))
+
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Keeps collapsed-stack profiles of the ``capture()`` blocks slower than ``threshold`` seconds."""
+
+    def __init__(self, directory, threshold, interval=INTERVAL, keep=100):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.interval = interval
+        self.keep = keep
+        self.captured = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def capture(self, label):
+        """Sample the current thread for the ``with`` block; yields a dict that gets ``path`` if kept."""
+        target = threading.get_ident()
+        samples = Counter()
+        done = threading.Event()
+        result = {"path": None}
+
+        def sample():
+            while not done.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    samples[_stack(frame)] += 1
+
+        sampler = threading.Thread(target=sample, name="sagara-profiler", daemon=True)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield result
+        finally:
+            done.set()
+            sampler.join()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold and samples:
+                result["path"] = self._write(label, elapsed, samples)
+
+    def _write(self, label, elapsed, samples):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "run"
+        with self._lock:
+            self.captured += 1
+            number = self.captured
+        # Process id and run number keep two slow runs in the same second from sharing a file
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed * 1000:.0f}ms-{os.getpid()}-{number}.txt"
+        path = self.directory / name
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in samples.most_common()))
+        # Oldest profiles go first
+        profiles = sorted(self.directory.glob("*.txt"), key=lambda p: p.stat().st_mtime)
+        for stale in profiles[:-self.keep]:
+            stale.unlink(missing_ok=True)
+        return path
@@ -0,0 +1,308 @@
+"""Min/max/mean downsampling pyramid for time-series charts.
+
+For every station and variable the pyramid keeps aggregates over
+epoch-aligned buckets of increasing width (``LEVEL_WIDTHS``).  A chart asks
+for a time window and a point budget; the finest level whose bucket count
+fits the budget is read, so the payload size is fixed no matter how much raw
+data the window covers.  Windows that fit in the budget at native resolution
+read raw rows from the store instead, and LTTB trims any small overshoot.
+
+Each level is a set of raw column files sorted by (station, time), opened
+with ``np.memmap``; ``meta.json`` records each station's row span.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .store import reinstate_version, retire_versions
+
+LEVEL_WIDTHS = [pd.Timedelta(w) for w in ("1min", "5min", "15min", "1h", "6h", "1D", "7D", "30D")]
+POINT_BUDGET = 2000
+
+
+def _bucket_bounds(times, width):
+    """Start offsets of each run of equal epoch-aligned bucket ids in sorted ``times``."""
+    ids = times // width.value
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1]) if len(ids) else np.zeros(0, np.int64)
+    return starts, ids[starts] * width.value
+
+
+def _aggregate(times, columns, width):
+    """Reduce raw or already-aggregated columns into ``width`` buckets.
+
+    ``columns`` maps each variable to ``(sum, count, min, max)`` arrays.
+    """
+    starts, bucket_times = _bucket_bounds(times, width)
+    reduced = {}
+    for name, (total, count, low, high) in columns.items():
+        reduced[name] = (
+            np.add.reduceat(total, starts) if len(starts) else total[:0],
+            np.add.reduceat(count, starts) if len(starts) else count[:0],
+            np.minimum.reduceat(low, starts) if len(starts) else low[:0],
+            np.maximum.reduceat(high, starts) if len(starts) else high[:0],
+        )
+    return bucket_times, reduced
+
+
+def _cadence(times):
+    """Median step between distinct timestamps, or ``None`` with fewer than two.
+
+    Many sensors report at the same instant, so steps between raw rows are
+    mostly zero; only distinct timestamps give the series' cadence.
+    """
+    steps = np.diff(np.unique(times))
+    return pd.Timedelta(int(np.median(steps))) if len(steps) else None
+
+
+def _levels(native, directory):
+    """Level widths coarser than ``native``, with a directory made for each under ``directory``."""
+    levels = [w for w in LEVEL_WIDTHS if w > native]
+    for k in range(len(levels)):
+        (directory / f"level-{k}").mkdir()
+    return levels
+
+
+def _raw_columns(chunk, variables):
+    """Raw readings as ``(sum, count, min, max)`` columns, NaNs contributing nothing."""
+    columns = {}
+    for name in variables:
+        values = np.asarray(chunk[name], dtype=np.float64)
+        valid = ~np.isnan(values)
+        columns[name] = (
+            np.where(valid, values, 0.0),
+            valid.astype(np.int64),
+            np.where(valid, values, np.inf),
+            np.where(valid, values, -np.inf),
+        )
+    return columns
+
+
+def _sorted(times, columns):
+    """``times`` and ``columns`` in time order, untouched when already sorted."""
+    if len(times) < 2 or (np.diff(times) >= 0).all():
+        return times, columns
+    order = np.argsort(times, kind="stable")
+    return times[order], {name: tuple(part[order] for part in parts) for name, parts in columns.items()}
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` visually significant points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = np.nanmean(y[nxt_lo:nxt_hi]) if np.isfinite(y[nxt_lo:nxt_hi]).any() else y[a]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        keep[i + 1] = a
+    return keep
+
+
+class Pyramid:
+    """Precomputed aggregates for one table at one store version."""
+
+    def __init__(self, store, table, directory):
+        self.store = store
+        self.table = table
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            self.meta = json.load(f)
+        self.native = pd.Timedelta(self.meta["native"])
+        if self.native <= pd.Timedelta(0):
+            self.native = LEVEL_WIDTHS[0]
+        self.levels = [pd.Timedelta(w) for w in self.meta["levels"]]
+        self.variables = self.meta["variables"]
+        self._maps = {}
+
+    @classmethod
+    def open(cls, store, table, root, variables):
+        table_dir = Path(root) / table
+        version = store.table_version(table)
+        directory = table_dir / version
+        if not (directory / "meta.json").exists():
+            cls.build(store, table, directory, variables)
+            retire_versions(table_dir, version)
+        else:
+            reinstate_version(directory)
+        return cls(store, table, directory)
+
+    @staticmethod
+    def build(store, table, directory, variables):
+        """Aggregate station by station, fragment by fragment.
+
+        Each fragment is reduced to the finest level on its own and a
+        station's partial buckets are merged afterwards, so memory is bounded
+        by one fragment plus one station's finest level, not its raw history.
+        """
+        time_column = store.time_column(table)
+        key_column = store.key_column(table)
+        stations = np.unique(np.concatenate([
+            np.unique(store.column(frag, key_column)) for frag in store.fragments(table)
+        ])) if store.fragments(table) else []
+
+        tmp = Path(f"{directory}.{os.getpid()}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        native = None
+        levels = None
+        files, spans = {}, {}
+        for station in stations:
+            partials = []
+            for chunk in store.scan(table, [time_column, *variables], [(key_column, "==", station)]):
+                times = np.asarray(chunk[time_column], dtype="datetime64[ns]").view(np.int64)
+                if native is None:
+                    native = _cadence(times)
+                if native is None:
+                    # Cadence unknown until a fragment with two distinct timestamps; keep the raw rows till then
+                    partials.append((times, _raw_columns(chunk, variables)))
+                    continue
+                if levels is None:
+                    levels = _levels(native, tmp)
+                if not levels:
+                    break
+                partials.append(_aggregate(*_sorted(times, _raw_columns(chunk, variables)), levels[0]))
+            if not partials:
+                continue
+            if levels is None:
+                native = native or LEVEL_WIDTHS[0]
+                levels = _levels(native, tmp)
+            # Buckets straddling fragment boundaries (or late appends) are merged here
+            times = np.concatenate([part[0] for part in partials])
+            columns = {
+                name: tuple(np.concatenate([part[1][name][i] for part in partials]) for i in range(4))
+                for name in variables
+            }
+            times, columns = _sorted(times, columns)
+            for k, width in enumerate(levels):
+                times, columns = _aggregate(times, columns, width)
+                outputs = {"time": times}
+                for name, (total, count, low, high) in columns.items():
+                    outputs[f"{name}_sum"] = total
+                    outputs[f"{name}_count"] = count
+                    outputs[f"{name}_min"] = low
+                    outputs[f"{name}_max"] = high
+                start = spans.setdefault(k, {}).get("_rows", 0)
+                spans[k][str(station)] = [start, start + len(times)]
+                spans[k]["_rows"] = start + len(times)
+                for column, values in outputs.items():
+                    handle = files.get((k, column))
+                    if handle is None:
+                        handle = files[(k, column)] = open(tmp / f"level-{k}" / f"{column}.bin", "wb")
+                    handle.write(np.ascontiguousarray(values).tobytes())
+        for handle in files.values():
+            handle.close()
+
+        meta = {
+            "native": str(native or LEVEL_WIDTHS[0]),
+            "levels": [str(w) for w in levels or []],
+            "variables": list(variables),
+            "spans": {str(k): v for k, v in spans.items()},
+        }
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(meta, f)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def choose_level(self, start, end, budget):
+        """Finest level (``None`` for raw) whose point count fits ``budget``."""
+        span = pd.Timestamp(end) - pd.Timestamp(start)
+        if span / self.native <= budget:
+            return None
+        for k, width in enumerate(self.levels):
+            if span / width <= budget:
+                return k
+        return len(self.levels) - 1 if self.levels else None
+
+    def window(self, stations, variable, start, end, budget=POINT_BUDGET):
+        """Chart-ready rows for ``stations`` between ``start`` and ``end``.
+
+        Returns ``(frame, width)`` where ``frame`` has Date, Station, mean, min
+        and max columns, and ``width`` is the bucket width (``None`` for raw).
+        The budget is shared across stations.
+        """
+        per_station = max(3, budget // max(1, len(stations)))
+        level = self.choose_level(start, end, per_station)
+        if level is None:
+            return self._raw(stations, variable, start, end, per_station), None
+        lo, hi = pd.Timestamp(start).value, pd.Timestamp(end).value
+        frames = []
+        spans = self.meta["spans"][str(level)]
+        for station in stations:
+            if station not in spans:
+                continue
+            a, b = spans[station]
+            times = self._column(level, "time", np.int64)[a:b]
+            # Include the bucket that straddles ``start``
+            i = int(np.searchsorted(times, lo - self.levels[level].value, side="right"))
+            j = int(np.searchsorted(times, hi, side="right"))
+            count = self._column(level, f"{variable}_count", np.int64)[a + i:a + j]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = self._column(level, f"{variable}_sum", np.float64)[a + i:a + j] / count
+            low = self._column(level, f"{variable}_min", np.float64)[a + i:a + j]
+            high = self._column(level, f"{variable}_max", np.float64)[a + i:a + j]
+            empty = count == 0
+            frames.append(pd.DataFrame({
+                "Date": times[i:j].view("datetime64[ns]"),
+                "Station": station,
+                "mean": np.where(empty, np.nan, mean),
+                "min": np.where(empty, np.nan, low),
+                "max": np.where(empty, np.nan, high),
+            }))
+        frame = pd.concat(frames, ignore_index=True) if frames else self._empty()
+        return frame, self.levels[level]
+
+    def _raw(self, stations, variable, start, end, per_station):
+        time_column = self.store.time_column(self.table)
+        key_column = self.store.key_column(self.table)
+        raw = self.store.read(
+            self.table,
+            [time_column, key_column, variable],
+            [(key_column, "in", list(stations)), (time_column, ">=", start), (time_column, "<=", end)],
+        )
+        frames = []
+        for station, group in raw.groupby(key_column, sort=False):
+            group = group.sort_values(time_column, kind="stable")
+            keep = lttb(group[time_column].to_numpy().view(np.int64), group[variable].to_numpy(), per_station)
+            group = group.iloc[keep]
+            values = group[variable].to_numpy()
+            frames.append(pd.DataFrame({
+                "Date": group[time_column].to_numpy(),
+                "Station": station,
+                "mean": values,
+                "min": values,
+                "max": values,
+            }))
+        return pd.concat(frames, ignore_index=True) if frames else self._empty()
+
+    def _column(self, level, name, dtype):
+        key = (level, name)
+        values = self._maps.get(key)
+        if values is None:
+            path = self.directory / f"level-{level}" / f"{name}.bin"
+            if path.stat().st_size == 0:
+                values = np.empty(0, dtype=dtype)
+            else:
+                values = np.memmap(path, dtype=dtype, mode="r")
+            self._maps[key] = values
+        return values
+
+    @staticmethod
+    def _empty():
+        return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Station": [], "mean": [], "min": [], "max": []})
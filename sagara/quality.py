@@ -0,0 +1,256 @@
+"""Data-quality flags and scores for the sensor readings.
+
+Each row gets QC bits (validated: every variable in range; high quality:
+also free of spikes within its sensor's series).  The Completeness,
+Accuracy, Consistency and Timeliness scores are ratios of counts summed
+over the table's fragments.
+``QualityEngine`` keeps those counts per fragment in a JSON cache under
+``QUALITY_DIR``, keyed by fragment path, so a new store version only scores
+the fragments it adds.  Cadence and gaps are found within each fragment: a
+gap that straddles a fragment boundary is not counted.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Physically plausible ranges for automated validation
+VALID_RANGES = {
+    'Temperature': (-2.0, 40.0),
+    'Salinity': (0.0, 42.0),
+    'pH': (7.0, 8.8),
+    'Dissolved_Oxygen': (0.0, 15.0),
+}
+
+# Largest step between consecutive readings of one station before it is a spike
+SPIKE_LIMITS = {
+    'Temperature': 4.0,
+    'Salinity': 1.0,
+    'pH': 0.25,
+    'Dissolved_Oxygen': 1.5,
+}
+
+# Bits of the per-row quality flag
+QC_VALID = 1
+QC_HIGH = 2
+
+QUALITY_FILTERS = {
+    "All Data": 0,
+    "High Quality Only": QC_HIGH,
+    "Validated Only": QC_VALID,
+}
+
+
+# Column telling interleaved series apart, when a table holds several per station
+SERIES_COLUMN = 'Sensor_ID'
+
+
+def _series(chunk):
+    """Row order that groups each series together, and where each series starts in it.
+
+    Rows are time-ordered, so a stable sort keeps every series in time order.
+    """
+    n = len(next(iter(chunk.values())))
+    if SERIES_COLUMN not in chunk:
+        return np.arange(n), np.zeros(1 if n else 0, dtype=np.int64)
+    _, codes = np.unique(np.asarray(chunk[SERIES_COLUMN]), return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    return order, np.flatnonzero(np.diff(codes[order], prepend=-1))
+
+
+def spike_mask(chunk, order=None, starts=None):
+    """``(rows, variables)`` mask of readings that jump away from both neighbours in their series."""
+    if order is None:
+        order, starts = _series(chunk)
+    n = len(order)
+    first = np.zeros(n, dtype=bool)
+    first[starts] = True
+    last = np.roll(first, -1)
+    spikes = np.zeros((n, len(VALID_RANGES)), dtype=bool)
+    for j, name in enumerate(VALID_RANGES):
+        values = np.asarray(chunk[name], dtype=np.float64)[order]
+        # Steps between two series are not steps
+        big = (np.abs(np.diff(values)) > SPIKE_LIMITS[name]) & ~first[1:]
+        before = np.concatenate([[False], big])
+        after = np.concatenate([big, [False]])
+        # The ends of a series only have one neighbour
+        before, after = np.where(first, after, before), np.where(last, before, after)
+        spikes[order, j] = before & after
+    return spikes
+
+
+def quality_flags(chunk):
+    """Per-row QC bits for a chunk of time-ordered readings.
+
+    A row is *validated* when every variable is present and inside
+    ``VALID_RANGES``; it is *high quality* when it is also free of spikes.
+    Spikes are judged within each series (``SERIES_COLUMN``, when present).
+    """
+    n = len(next(iter(chunk.values())))
+    valid = np.ones(n, dtype=bool)
+    for name, (lo, hi) in VALID_RANGES.items():
+        values = np.asarray(chunk[name], dtype=np.float64)
+        valid &= (values >= lo) & (values <= hi)
+    smooth = ~spike_mask(chunk).any(axis=1) if n else valid
+    flags = np.where(valid, QC_VALID, 0).astype(np.uint8)
+    flags |= np.where(valid & smooth, QC_HIGH, 0).astype(np.uint8)
+    return flags
+
+
+# Bumped whenever chunk_counts changes meaning, so cached counts are not mixed across definitions
+COUNTS_VERSION = 2
+# Readings arriving later than this after observation count as untimely
+LAG_SLA_S = 15 * 60
+# Dissolved oxygen above this fraction of saturation is physically suspect
+MAX_DO_SATURATION = 1.25
+
+
+def oxygen_saturation(temperature, salinity):
+    """Approximate dissolved-oxygen saturation (mg/L) of seawater."""
+    t = np.asarray(temperature, dtype=np.float64)
+    s = np.asarray(salinity, dtype=np.float64)
+    fresh = 14.652 - 0.41022 * t + 0.007991 * t ** 2 - 0.000077774 * t ** 3
+    return fresh * (1 - 0.0053 * s + 0.0000102 * s * t)
+
+
+def chunk_counts(chunk, time_column='Date'):
+    """Raw counts behind the four quality scores for one time-ordered chunk.
+
+    Counts (not ratios) are returned so chunks can be summed into totals.
+    """
+    n = len(chunk[time_column])
+    counts = {'rows': n}
+    if n == 0:
+        return counts
+    # Cadence and gaps per series: interleaved sensors share timestamps
+    order, starts = _series(chunk)
+    times = np.asarray(chunk[time_column]).astype('datetime64[ns]').view(np.int64)[order]
+    expected = gaps = 0
+    for lo, hi in zip(starts, [*starts[1:], n]):
+        steps = np.diff(times[lo:hi])
+        cadence = float(np.median(steps)) if len(steps) else 0.0
+        if cadence > 0:
+            expected += int(round((times[hi - 1] - times[lo]) / cadence)) + 1
+            gaps += int((steps > 1.5 * cadence).sum())
+        else:
+            expected += hi - lo
+    counts['expected'] = expected
+    counts['gaps'] = gaps
+
+    values = np.column_stack([np.asarray(chunk[name], dtype=np.float64) for name in VALID_RANGES])
+    present = ~np.isnan(values)
+    counts['values'] = int(present.sum())
+    counts['slots'] = counts['expected'] * len(VALID_RANGES)
+
+    # Accuracy judges the values that are there: out of range or spiking, not missing
+    lows = np.array([lo for lo, _ in VALID_RANGES.values()])
+    highs = np.array([hi for _, hi in VALID_RANGES.values()])
+    in_range = present & (values >= lows) & (values <= highs)
+    counts['accurate'] = int((in_range & ~spike_mask(chunk, order, starts)).sum())
+
+    names = list(VALID_RANGES)
+    temp, sal, ph, do = (values[:, names.index(k)] for k in ('Temperature', 'Salinity', 'pH', 'Dissolved_Oxygen'))
+    complete = present.all(axis=1)
+    consistent = (
+        (do <= MAX_DO_SATURATION * oxygen_saturation(temp, sal))
+        # Fully marine water is well buffered; pH far from ~8 with high salinity is inconsistent
+        & ~((sal > 30) & ((ph < 7.6) | (ph > 8.5)))
+    )
+    counts['checked'] = int(complete.sum())
+    counts['consistent'] = int((complete & consistent).sum())
+
+    if 'Ingest_Lag_s' in chunk:
+        lag = np.asarray(chunk['Ingest_Lag_s'], dtype=np.float64)
+        counts['lagged'] = int((~np.isnan(lag)).sum())
+        counts['timely'] = int((lag <= LAG_SLA_S).sum())
+    return counts
+
+
+def scores_from_counts(totals):
+    """Percent Completeness/Accuracy/Consistency/Timeliness from summed counts."""
+    def pct(num, den):
+        return 100.0 * totals.get(num, 0) / totals[den] if totals.get(den) else None
+
+    return {
+        'Completeness': pct('values', 'slots'),
+        'Accuracy': pct('accurate', 'values'),
+        'Consistency': pct('consistent', 'checked'),
+        'Timeliness': pct('timely', 'lagged'),
+    }
+
+
+class QualityEngine:
+    """Per-fragment quality counts, cached on disk and updated incrementally.
+
+    Fragments are immutable once written, so their path identifies their
+    content: a refresh scores only fragments it has not seen and forgets
+    the ones that left the manifest.
+    """
+
+    def __init__(self, store, table, cache_path):
+        self.store = store
+        self.table = table
+        self.cache_path = Path(cache_path)
+        self.chunks = {}
+        self.version = None
+        self.previous = None
+        self.current = None
+        self.totals = {}
+        self._lock = threading.Lock()
+        if self.cache_path.exists():
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            # Counts taken under an older definition of the scores are recomputed
+            if cached.get('version') == COUNTS_VERSION:
+                self.chunks = cached['chunks']
+        self.refresh()
+
+    def refresh(self):
+        """Bring scores up to the store's current version; returns how many chunks were scored."""
+        with self._lock:
+            self.store.refresh()
+            if self.version == self.store.version:
+                return 0
+            fragments = self.store.fragments(self.table)
+            columns = [c for c in [self.store.time_column(self.table), *VALID_RANGES, 'Ingest_Lag_s', SERIES_COLUMN]
+                       if c in self.store.schema(self.table)]
+            live = {frag['path'] for frag in fragments}
+            fresh = 0
+            for frag in fragments:
+                if frag['path'] not in self.chunks:
+                    chunk = {name: self.store.column(frag, name) for name in columns}
+                    self.chunks[frag['path']] = chunk_counts(chunk, self.store.time_column(self.table))
+                    fresh += 1
+            self.chunks = {path: counts for path, counts in self.chunks.items() if path in live}
+            totals = {}
+            for counts in self.chunks.values():
+                for key, value in counts.items():
+                    totals[key] = totals.get(key, 0) + value
+            self.previous, self.current = self.current, scores_from_counts(totals)
+            self.totals = totals
+            self.version = self.store.version
+            if fresh:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.cache_path.with_suffix(f'.{os.getpid()}.tmp')
+                with open(tmp, 'w') as f:
+                    json.dump({'version': COUNTS_VERSION, 'chunks': self.chunks}, f)
+                os.replace(tmp, self.cache_path)
+            return fresh
+
+    def scores(self):
+        return dict(self.current)
+
+    def deltas(self):
+        """Change of each score since the previous store version, where known."""
+        if not self.previous:
+            return {name: None for name in self.current}
+        return {
+            name: None if value is None or self.previous.get(name) is None else value - self.previous[name]
+            for name, value in self.current.items()
+        }
+
+    def overall(self):
+        known = [value for value in self.current.values() if value is not None]
+        return sum(known) / len(known) if known else None
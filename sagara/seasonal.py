@@ -0,0 +1,171 @@
+"""Batch seasonal decomposition and robust trends for every station and variable.
+
+Each daily-mean series is fitted with a harmonic regression -- level, linear
+trend and ``HARMONICS`` annual harmonics -- so trend, seasonal cycle and
+residual fall out of one least-squares fit.  All series share the day grid
+and the design matrix, so a chunk of series is solved together: the
+per-series normal equations (missing days weighted out) are built with two
+matrix products and solved as a batch.  The fit is made robust by iteratively
+reweighting with Tukey's bisquare on the residuals' MAD, so sensor spikes
+and heatwaves do not drag the trend.  The trend's confidence interval is
+widened for the residuals' lag-1 autocorrelation, which daily series always
+have.
+
+Chunks of series are spread over a process pool; the daily means themselves
+come from the per-fragment daily sums the anomaly detector caches, so a new
+store version only reads the fragments it adds.
+"""
+import numpy as np
+import pandas as pd
+
+from .anomaly import VARIABLES, daily_sums
+
+HARMONICS = 2
+YEAR_DAYS = 365.25
+ROBUST_ITERATIONS = 6
+# Bisquare tuning constant (95% efficiency under Gaussian noise) and the least history a fit needs
+BISQUARE = 4.685
+MIN_DAYS = 365
+CHUNK_SERIES = 512
+
+
+def design(days, origin, harmonics=HARMONICS):
+    """``(days, 2 + 2 * harmonics)`` regressors: level, trend in years from ``origin``, then cos/sin pairs."""
+    days = np.asarray(days, dtype=np.float64)
+    columns = [np.ones_like(days), (days - origin) / YEAR_DAYS]
+    for k in range(1, harmonics + 1):
+        angle = 2 * np.pi * k * days / YEAR_DAYS
+        columns.extend([np.cos(angle), np.sin(angle)])
+    return np.stack(columns, axis=1)
+
+
+def components(coefficients, days, origin):
+    """Trend and seasonal parts of fitted ``coefficients`` on ``days``; each is ``(days,)``."""
+    X = design(days, origin, (len(coefficients) - 2) // 2)
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+    return X[:, :2] @ coefficients[:2], X[:, 2:] @ coefficients[2:]
+
+
+def _solve(X, weights, values):
+    # Every series' weighted X'X and X'y, as two BLAS matrix products over the shared day axis
+    n, p = X.shape
+    A = (weights.T @ (X[:, :, None] * X[:, None, :]).reshape(n, p * p)).reshape(-1, p, p)
+    b = (weights * values).T @ X
+    # Series without enough weighted days get an identity system; they are masked out afterwards
+    singular = np.linalg.cond(A) > 1e12
+    A[singular] = np.eye(X.shape[1])
+    return np.linalg.solve(A, b[..., None])[..., 0], A, singular
+
+
+def _column_median(values, ok):
+    """Median of each column over its ``ok`` rows (NaN where there are none), from one sort."""
+    ordered = np.sort(np.where(ok, values, np.inf), axis=0)
+    count = ok.sum(axis=0)
+    lo = np.take_along_axis(ordered, np.maximum(count - 1, 0)[None] // 2, axis=0)[0]
+    hi = np.take_along_axis(ordered, np.minimum(count // 2, len(ordered) - 1)[None], axis=0)[0]
+    with np.errstate(invalid="ignore"):
+        return np.where(count > 0, (lo + hi) / 2, np.nan)
+
+
+def fit_harmonics(days, values, origin, harmonics=HARMONICS, iterations=ROBUST_ITERATIONS):
+    """Robust harmonic fit of every column of ``values`` (days, series) at once.
+
+    Returns a dict of per-series arrays: ``coefficients`` (series, p), the
+    trend's autocorrelation-adjusted standard error ``trend_se``, the
+    residuals' robust ``scale`` and lag-1 ``autocorrelation``, and the
+    number of ``days`` fitted.  Series with less than ``MIN_DAYS`` of
+    history come back NaN.
+    """
+    X = design(days, origin, harmonics)
+    ok = ~np.isnan(values)
+    y = np.where(ok, values, 0.0)
+    weights = ok.astype(np.float64)
+    for _ in range(iterations + 1):
+        coefficients, A, singular = _solve(X, weights, y)
+        residuals = np.where(ok, y - X @ coefficients.T, np.nan)
+        scale = 1.4826 * _column_median(np.abs(residuals), ok)
+        with np.errstate(invalid="ignore"):
+            u = np.nan_to_num(residuals / (BISQUARE * np.maximum(scale, 1e-12)), nan=np.inf)
+        weights = np.where(np.abs(u) < 1, (1 - u ** 2) ** 2, 0.0)
+    # Autocorrelation of consecutive residuals inflates the trend's variance by (1 + r) / (1 - r)
+    pairs = ok[1:] & ok[:-1]
+    lead, lag = np.where(pairs, residuals[1:], 0.0), np.where(pairs, residuals[:-1], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = (lead * lag).sum(axis=0) / np.sqrt((lead ** 2).sum(axis=0) * (lag ** 2).sum(axis=0))
+        r = np.clip(np.nan_to_num(r), 0.0, 0.95)
+        covariance = np.linalg.inv(A) * (scale ** 2)[:, None, None]
+        trend_se = np.sqrt(covariance[:, 1, 1] * (1 + r) / (1 - r))
+    spans = np.where(ok.any(axis=0), days[::-1][np.argmax(ok[::-1], axis=0)] - days[np.argmax(ok, axis=0)], 0)
+    short = singular | (spans < MIN_DAYS)
+    coefficients[short] = np.nan
+    return {
+        "coefficients": coefficients,
+        "trend_se": np.where(short, np.nan, trend_se),
+        "scale": np.where(short, np.nan, scale),
+        "autocorrelation": np.where(short, np.nan, r),
+        "days": ok.sum(axis=0),
+    }
+
+
+def daily_means(store, table, cache_dir, stations, variables=VARIABLES):
+    """``(days, series)`` daily means on a gap-free day grid, and the ``(station, variable)`` of each column."""
+    frames = {}
+    for variable in variables:
+        sums, counts = daily_sums(store, table, cache_dir / f"{table}-{variable}.json", stations, variable)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frames[variable] = sums / counts.where(counts > 0)
+    known = [frame.columns for frame in frames.values() if len(frame.columns)]
+    if not known:
+        return np.arange(0), np.empty((0, 0)), []
+    days = np.arange(min(c.min() for c in known), max(c.max() for c in known) + 1)
+    values = np.concatenate([frame.reindex(columns=days).to_numpy(dtype=np.float64).T for frame in frames.values()],
+                            axis=1)
+    series = [(station, variable) for variable in frames for station in stations]
+    return days, values, series
+
+
+def decompose(days, values, series, pool=None, chunk=CHUNK_SERIES, progress=None):
+    """Per-series trend and seasonal summary, fitting ``chunk`` series at a time across ``pool``.
+
+    ``progress(fraction)`` is called as chunks finish.
+    """
+    origin = float(days.mean()) if len(days) else 0.0
+    starts = range(0, values.shape[1], chunk)
+    parts = [values[:, start:start + chunk] for start in starts]
+    if pool is not None and len(parts) > 1:
+        fits = pool.map(fit_harmonics, *zip(*[(days, part, origin) for part in parts]))
+    else:
+        fits = (fit_harmonics(days, part, origin) for part in parts)
+    done = []
+    for fit in fits:
+        done.append(fit)
+        if progress is not None:
+            progress(len(done) / len(parts))
+    if not done:
+        return pd.DataFrame(), origin
+    fit = {name: np.concatenate([part[name] for part in done]) for name in done[0]}
+    # The seasonal cycle over the last year of data: half its range, and the day of year it peaks
+    year = np.arange(days[-1] - 365, days[-1] + 1)
+    seasonal = design(year, origin)[:, 2:] @ fit["coefficients"][:, 2:].T
+    with np.errstate(invalid="ignore"):
+        amplitude = (seasonal.max(axis=0) - seasonal.min(axis=0)) / 2
+    peak = pd.DatetimeIndex(year[np.argmax(seasonal, axis=0)].astype("datetime64[D]"))
+    frame = pd.DataFrame({
+        "Station": [station for station, _ in series],
+        "Variable": [variable for _, variable in series],
+        "Mean": fit["coefficients"][:, 0],
+        "Trend_per_year": fit["coefficients"][:, 1],
+        "Trend_CI95": 1.96 * fit["trend_se"],
+        "Seasonal_Amplitude": amplitude,
+        "Peak_Day": np.where(np.isnan(amplitude), -1, peak.dayofyear),
+        "Residual_Scale": fit["scale"],
+        "Autocorrelation": fit["autocorrelation"],
+        "Days": fit["days"],
+        "Coefficients": [row.tolist() for row in fit["coefficients"]],
+    })
+    return frame, origin
+
+
+def trends_frame(result):
+    """The per-series frame of a ``seasonal`` job's result."""
+    return pd.DataFrame(result["series"])
@@ -0,0 +1,105 @@
+"""Small threaded HTTP side-server for responses Streamlit cannot stream.
+
+Streamlit widgets need their whole payload up front, so long downloads are
+served from here with chunked transfer encoding instead: bytes reach the
+browser while the rest of the result is still being produced.
+
+If ``PORT`` is taken -- by another server worker process or a leftover one --
+the server binds any free port instead and ``url`` links to that one, unless
+``SAGARA_PUBLIC_URL`` pins the address the browser uses.
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+HOST = os.environ.get("SAGARA_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("SAGARA_SERVER_PORT", "8502"))
+# Address the browser uses to reach this server, if it differs (proxies, containers)
+PUBLIC_URL = os.environ.get("SAGARA_PUBLIC_URL")
+
+
+class Response:
+    def __init__(self, body, content_type="application/octet-stream", status=200, headers=None):
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+        self.headers = headers or {}
+
+
+class SideServer:
+    """Routes a path prefix to ``handler(subpath, params) -> Response``.
+
+    Raises ``OSError`` if no port could be bound.
+    """
+
+    def __init__(self, host=HOST, port=PORT, public_url=PUBLIC_URL):
+        self.routes = {}
+        try:
+            self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        except OSError:
+            if public_url:
+                # The browser is sent to a fixed address, which another port would not answer
+                raise
+            self._httpd = ThreadingHTTPServer((host, 0), self._handler_class())
+        self.port = self._httpd.server_address[1]
+        self.public_url = public_url or f"http://localhost:{self.port}"
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="sagara-server", daemon=True)
+        self._thread.start()
+
+    def route(self, prefix, handler):
+        self.routes[prefix.rstrip("/")] = handler
+
+    def url(self, path, **params):
+        query = urlencode(params)
+        return f"{self.public_url}{path}" + (f"?{query}" if query else "")
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                prefix = max(
+                    (p for p in server.routes if parts.path == p or parts.path.startswith(p + "/")),
+                    key=len,
+                    default=None,
+                )
+                if prefix is None:
+                    return self._send(Response([b"not found\n"], "text/plain", 404))
+                try:
+                    response = server.routes[prefix](parts.path[len(prefix):].lstrip("/"), params)
+                except (KeyError, ValueError) as exc:
+                    response = Response([f"{exc}\n".encode()], "text/plain", 400)
+                self._send(response)
+
+            def _send(self, response):
+                self.send_response(response.status)
+                self.send_header("Content-Type", response.content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    for chunk in response.body:
+                        if chunk:
+                            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away mid-download; stop producing chunks
+                    close = getattr(response.body, "close", None)
+                    if close:
+                        close()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
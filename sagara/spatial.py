@@ -0,0 +1,124 @@
+"""Grid spatial index, viewport queries and server-side clustering for the map.
+
+Points are bucketed into a uniform lat/lon grid and sorted by cell id, so a
+bounding-box query is one ``searchsorted`` per grid row followed by an exact
+filter.  Visible points are then collapsed into screen-sized clusters and
+emitted as a single GeoJSON FeatureCollection built from whole arrays.
+"""
+import numpy as np
+
+# Roughly 64 px clusters: a 256 px web tile split 4 ways
+CLUSTERS_PER_TILE = 4
+
+
+class GridIndex:
+    """Uniform-grid index over point coordinates."""
+
+    def __init__(self, lat, lon, cell_deg=0.25):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.lat0 = np.floor(self.lat.min() / cell_deg) * cell_deg if len(self.lat) else 0.0
+        self.lon0 = np.floor(self.lon.min() / cell_deg) * cell_deg if len(self.lon) else 0.0
+        rows = self._cell(self.lat, self.lat0)
+        cols = self._cell(self.lon, self.lon0)
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 1
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 1
+        keys = rows * self.n_cols + cols
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def _cell(self, values, origin):
+        return np.floor((values - origin) / self.cell_deg).astype(np.int64)
+
+    def query(self, south, west, north, east):
+        """Indices of points inside the bounding box."""
+        if len(self.keys) == 0:
+            return np.empty(0, dtype=np.int64)
+        r0 = max(0, int(self._cell(np.float64(south), self.lat0)))
+        r1 = min(self.n_rows - 1, int(self._cell(np.float64(north), self.lat0)))
+        c0 = max(0, int(self._cell(np.float64(west), self.lon0)))
+        c1 = min(self.n_cols - 1, int(self._cell(np.float64(east), self.lon0)))
+        if r0 > r1 or c0 > c1:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(r0, r1 + 1)
+        starts = np.searchsorted(self.keys, rows * self.n_cols + c0, side="left")
+        stops = np.searchsorted(self.keys, rows * self.n_cols + c1, side="right")
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(starts, stops)])
+        inside = (
+            (self.lat[candidates] >= south) & (self.lat[candidates] <= north)
+            & (self.lon[candidates] >= west) & (self.lon[candidates] <= east)
+        )
+        return np.sort(candidates[inside])
+
+
+def cluster_cell_deg(zoom):
+    """Cluster cell size in degrees for a web-map zoom level."""
+    return 360.0 / (2 ** zoom) / CLUSTERS_PER_TILE
+
+
+def cluster(lat, lon, cell_deg):
+    """Group points into grid clusters.
+
+    Returns ``(center_lat, center_lon, count, members)`` where ``members`` maps
+    each input point to its cluster number.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if len(lat) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty.astype(np.int64), empty.astype(np.int64)
+    cells = np.stack([np.floor(lat / cell_deg), np.floor(lon / cell_deg)], axis=1).astype(np.int64)
+    _, members, count = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    members = members.ravel()
+    center_lat = np.bincount(members, weights=lat) / count
+    center_lon = np.bincount(members, weights=lon) / count
+    return center_lat, center_lon, count, members
+
+
+def feature_collection(lat, lon, properties):
+    """GeoJSON FeatureCollection from coordinate arrays and per-point property arrays."""
+    coordinates = np.column_stack([np.round(lon, 5), np.round(lat, 5)]).tolist()
+    columns = {name: np.asarray(values).tolist() for name, values in properties.items()}
+    names = list(columns)
+    rows = zip(*columns.values()) if names else [()] * len(coordinates)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": point},
+                "properties": dict(zip(names, values)),
+            }
+            for point, values in zip(coordinates, rows)
+        ],
+    }
+
+
+def clustered_features(lat, lon, labels, details, zoom, min_cluster=2):
+    """Viewport points as a FeatureCollection, merging dense cells into clusters.
+
+    Clusters get a ``count`` and a radius growing with ``log(count)``; cells
+    with fewer than ``min_cluster`` points keep their individual features.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    labels = np.asarray(labels, dtype=object)
+    details = np.asarray(details, dtype=object)
+    center_lat, center_lon, count, members = cluster(lat, lon, cluster_cell_deg(zoom))
+    single = count[members] < min_cluster
+    grouped = count >= min_cluster
+    cluster_count = count[grouped]
+    return feature_collection(
+        np.concatenate([lat[single], center_lat[grouped]]),
+        np.concatenate([lon[single], center_lon[grouped]]),
+        {
+            "name": np.concatenate([labels[single], np.char.add(cluster_count.astype(str), " sensors")]),
+            "detail": np.concatenate([details[single], np.full(len(cluster_count), "Zoom in to expand", dtype=object)]),
+            "count": np.concatenate([np.ones(single.sum(), dtype=np.int64), cluster_count]),
+            "radius": np.concatenate([
+                np.full(single.sum(), 4.0),
+                np.round(6 + 4 * np.log2(cluster_count), 1),
+            ]),
+        },
+    )
@@ -0,0 +1,529 @@
+"""Date- and station-partitioned columnar store.
+
+Layout on disk::
+
+    <root>/_manifest.json
+    <root>/<table>/date=2024-03/station=ST01/part-<id>/<column>.npy
+
+Each column of a fragment is a plain ``.npy`` file opened with
+``np.load(mmap_mode="r")``, so reading a column only pages in the bytes that
+are actually touched.  The manifest keeps per-fragment row counts and min/max
+statistics ("zone maps"); filters are checked against those first, so whole
+partitions are skipped without any disk access.
+
+The manifest is the store's version pointer: a write lands new fragments
+first and then swaps in a new manifest with ``os.replace``, so readers see
+either the old version or the new one, never a mix.  ``snapshot()`` pins a
+version for as long as a reader needs it -- a rerun, a background job --
+sharing the memory maps of every other reader in the process, and fragments
+a write replaces are only deleted ``RETAIN_SECONDS`` later, so readers still
+pinned to the old version keep working.
+"""
+import hashlib
+import json
+import operator
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "_manifest.json"
+# How long fragments replaced by a write stay on disk for readers of older versions
+RETAIN_SECONDS = float(os.environ.get("SAGARA_STORE_RETAIN_S", "600"))
+# Marks a derived-data version directory as superseded, and since when
+RETIRED = ".retired"
+
+_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, wanted: np.isin(values, list(wanted)),
+}
+
+
+def _encode(series):
+    """Convert a pandas column to an array that round-trips through ``.npy``."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype="datetime64[ns]")
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.to_numpy()
+    # Fixed-width unicode keeps string columns memory-mappable
+    return np.asarray(series.astype(str).to_numpy(), dtype=str)
+
+
+def _stat(value, kind):
+    if kind == "M":
+        return int(value.astype("datetime64[ns]").astype(np.int64))
+    if kind in "biuf":
+        return value.item()
+    return str(value)
+
+
+def _column_stats(values):
+    kind = values.dtype.kind
+    if len(values) == 0:
+        return None
+    if kind == "f":
+        finite = values[~np.isnan(values)]
+        if len(finite) == 0:
+            return None
+        return [finite.min().item(), finite.max().item()]
+    if kind in "US":
+        # String ufuncs have no min/max loop
+        ordered = np.sort(values)
+        return [str(ordered[0]), str(ordered[-1])]
+    return [_stat(values.min(), kind), _stat(values.max(), kind)]
+
+
+def _coerce(value, dtype):
+    """Bring a filter literal into the same domain as the column's stats."""
+    kind = np.dtype(dtype).kind
+    if kind == "M":
+        return np.datetime64(pd.Timestamp(value).as_unit("ns").to_datetime64(), "ns")
+    if kind in "biuf":
+        return value
+    return str(value)
+
+
+def _coerce_stat(value, dtype):
+    if np.dtype(dtype).kind == "M":
+        return np.datetime64(value, "ns")
+    return value
+
+
+def _may_match(lo, hi, op, value):
+    if op == "==":
+        return lo <= value <= hi
+    if op == "!=":
+        return not (lo == hi == value)
+    if op == "<":
+        return lo < value
+    if op == "<=":
+        return lo <= value
+    if op == ">":
+        return hi > value
+    if op == ">=":
+        return hi >= value
+    if op == "in":
+        return any(lo <= v <= hi for v in value)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def _covers(lo, hi, op, value):
+    """True when every row of a fragment is known to pass the predicate."""
+    if op == "==":
+        return lo == hi == value
+    if op == "!=":
+        return value < lo or value > hi
+    if op == "<":
+        return hi < value
+    if op == "<=":
+        return hi <= value
+    if op == ">":
+        return lo > value
+    if op == ">=":
+        return lo >= value
+    if op == "in":
+        return lo == hi and lo in value
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def retire_versions(root, current):
+    """Mark the version directories under ``root`` other than ``current`` retired; delete those retired long enough.
+
+    Indexes, pyramids and cubes built for one version stay memory-mapped by
+    every session pinned to it, so like replaced fragments they are first
+    marked retired and only deleted on a later build once the mark is old.
+    """
+    now = time.time()
+    for path in Path(root).iterdir():
+        if path.name == current or path.name.endswith(".tmp") or not path.is_dir():
+            continue
+        marker = path / RETIRED
+        if not marker.exists():
+            marker.touch()
+        elif now - marker.stat().st_mtime > RETAIN_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def reinstate_version(directory):
+    """Clear the retired mark of a version directory that is being read again."""
+    (Path(directory) / RETIRED).unlink(missing_ok=True)
+
+
+class ColumnStore:
+    """Partitioned, memory-mapped column files with projection and predicate pushdown.
+
+    Filters are ``(column, op, value)`` tuples combined with AND, where ``op``
+    is one of ``== != < <= > >= in``.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._manifest_mtime = None
+        self._manifest = {"version": None, "tables": {}}
+        self.refresh()
+
+    # ------------------------------------------------------------------ metadata
+
+    @property
+    def version(self):
+        """Opaque token that changes on every write; use it as a cache key."""
+        return self._manifest["version"]
+
+    def table_version(self, *tables):
+        """Token that changes only when the fragments of ``tables`` do.
+
+        Unlike ``version`` it survives writes to other tables, so data derived
+        from one table is not rebuilt when another is written.
+        """
+        paths = "\n".join(f"{table}:{frag['path']}" for table in tables for frag in self._meta(table)["fragments"])
+        return hashlib.sha1(paths.encode()).hexdigest()[:16]
+
+    def refresh(self):
+        """Reload the manifest if another process has written to the store."""
+        path = self.root / MANIFEST
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._swap(json.load(f), mtime)
+
+    def snapshot(self):
+        """Read-only handle on the current version that later writes do not move."""
+        return StoreSnapshot(self)
+
+    def has_table(self, table):
+        return table in self._manifest["tables"]
+
+    def tables(self):
+        return list(self._manifest["tables"])
+
+    def schema(self, table):
+        """Column name -> numpy dtype string."""
+        return dict(self._meta(table)["columns"])
+
+    def time_column(self, table):
+        return self._meta(table).get("time_column")
+
+    def key_column(self, table):
+        return self._meta(table).get("key_column")
+
+    def fragments(self, table, filters=None):
+        """Fragments whose zone maps do not rule out ``filters``."""
+        meta = self._meta(table)
+        filters = self._prepare(meta, filters)
+        return [frag for frag in meta["fragments"] if self._prune(meta, frag, filters)[0]]
+
+    def num_rows(self, table, filters=None):
+        if not filters:
+            return sum(frag["rows"] for frag in self._meta(table)["fragments"])
+        return sum(len(next(iter(chunk.values()))) for chunk in self.scan(table, filters=filters))
+
+    def stats(self, table, column):
+        """Global ``(min, max)`` for ``column`` computed from the manifest alone."""
+        meta = self._meta(table)
+        dtype = meta["columns"][column]
+        ranges = [frag["stats"][column] for frag in meta["fragments"] if frag["stats"].get(column)]
+        if not ranges:
+            return None, None
+        lo = min(r[0] for r in ranges)
+        hi = max(r[1] for r in ranges)
+        if np.dtype(dtype).kind == "M":
+            return pd.Timestamp(lo), pd.Timestamp(hi)
+        return lo, hi
+
+    # ------------------------------------------------------------------ writing
+
+    def write_table(self, table, frame, time_column=None, key_column=None, mode="overwrite"):
+        """Write ``frame`` partitioned by month of ``time_column`` and by ``key_column``.
+
+        ``mode="append"`` adds new fragments next to the existing ones, which is
+        how incremental loads land without rewriting history.  ``frame`` may
+        also be an iterable of frames; each chunk goes to disk as it arrives
+        and the manifest is committed once, after the last one.
+        """
+        chunks = [frame] if isinstance(frame, pd.DataFrame) else frame
+        table_dir = self.root / table
+        fragments = []
+        columns = None
+        for chunk in chunks:
+            encoded = {name: _encode(chunk[name]) for name in chunk.columns}
+            if columns is None:
+                columns = {name: values.dtype for name, values in encoded.items()}
+            elif set(columns) != set(encoded):
+                raise ValueError(f"Cannot write {table!r}: chunks have different columns")
+            else:
+                columns = {name: np.result_type(dtype, encoded[name].dtype) for name, dtype in columns.items()}
+            fragments.extend(self._write_fragments(table_dir, encoded, time_column, key_column))
+        if columns is None:
+            raise ValueError(f"Cannot write {table!r}: no data")
+
+        with self._lock:
+            self.refresh()
+            manifest = json.loads(json.dumps(self._manifest))
+            previous = manifest["tables"].get(table)
+            if mode == "append" and previous is not None:
+                previous_columns = {k: np.dtype(v) for k, v in previous["columns"].items()}
+                if set(previous_columns) != set(columns):
+                    raise ValueError(f"Cannot append to {table!r}: column set differs")
+                merged = {}
+                for name, dtype in columns.items():
+                    merged[name] = np.result_type(previous_columns[name], dtype).str
+                previous["columns"] = merged
+                previous["fragments"].extend(fragments)
+                stale = []
+            else:
+                stale = previous["fragments"] if previous else []
+                manifest["tables"][table] = {
+                    "columns": {name: dtype.str for name, dtype in columns.items()},
+                    "time_column": time_column,
+                    "key_column": key_column,
+                    "fragments": fragments,
+                }
+            meta = manifest["tables"][table]
+            if time_column:
+                meta["fragments"].sort(key=lambda f: (f["stats"][time_column] or [0])[0])
+            self._retire(manifest, stale)
+            manifest["version"] = uuid.uuid4().hex
+            self._commit(manifest)
+
+    def _write_fragments(self, table_dir, columns, time_column, key_column):
+        fragments = []
+        for rel, index in self._partition(columns, time_column, key_column):
+            frag_dir = table_dir / rel / f"part-{uuid.uuid4().hex[:12]}"
+            frag_dir.mkdir(parents=True, exist_ok=True)
+            stats, nulls = {}, {}
+            for name, values in columns.items():
+                part = values[index] if index is not None else values
+                np.save(frag_dir / f"{name}.npy", part, allow_pickle=False)
+                stats[name] = _column_stats(part)
+                if part.dtype.kind == "f" and np.isnan(part).any():
+                    nulls[name] = int(np.isnan(part).sum())
+            fragments.append({
+                "path": str(frag_dir.relative_to(self.root)),
+                "rows": int(len(index) if index is not None else len(next(iter(columns.values())))),
+                "stats": stats,
+                "nulls": nulls,
+            })
+        return fragments
+
+    def _partition(self, columns, time_column, key_column):
+        n = len(next(iter(columns.values()))) if columns else 0
+        if n == 0:
+            return []
+        if not time_column and not key_column:
+            return [("all", None)]
+        # Partition keys are factorized to integer codes: sorting millions of
+        # label strings would cost more than writing the fragments
+        parts = []
+        if time_column:
+            months, codes = np.unique(columns[time_column].astype("datetime64[M]"), return_inverse=True)
+            parts.append((np.char.add("date=", months.astype(str)), codes))
+        if key_column:
+            codes, keys = pd.factorize(columns[key_column], sort=True)
+            parts.append((np.char.add("station=", np.asarray(keys).astype(str)), codes))
+        combined = np.zeros(n, dtype=np.int64)
+        for names, codes in parts:
+            combined = combined * len(names) + codes
+        present, inverse = np.unique(combined, return_inverse=True)
+        # Stable sort keeps rows ordered by time inside every fragment
+        order = np.lexsort((columns[time_column], inverse)) if time_column else np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(present) + 1))
+        labels = []
+        for code in present.tolist():
+            label = []
+            for names, _ in reversed(parts):
+                code, i = divmod(code, len(names))
+                label.append(str(names[i]))
+            labels.append("/".join(reversed(label)))
+        return [(label, order[bounds[i]:bounds[i + 1]]) for i, label in enumerate(labels)]
+
+    def _retire(self, manifest, fragments):
+        now = time.time()
+        manifest.setdefault("retired", []).extend({"path": frag["path"], "at": now} for frag in fragments)
+
+    def _commit(self, manifest):
+        # Fragments retired long enough ago are dropped from the manifest, then from disk
+        cutoff = time.time() - RETAIN_SECONDS
+        expired = [entry["path"] for entry in manifest.get("retired", ()) if entry["at"] < cutoff]
+        manifest["retired"] = [entry for entry in manifest.get("retired", ()) if entry["at"] >= cutoff]
+        path = self.root / MANIFEST
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+        self._swap(manifest, path.stat().st_mtime_ns)
+        for rel in expired:
+            shutil.rmtree(self.root / rel, ignore_errors=True)
+
+    def _swap(self, manifest, mtime):
+        """Make ``manifest`` current, keeping the maps of fragments it still lists."""
+        live = {frag["path"] for meta in manifest["tables"].values() for frag in meta["fragments"]}
+        maps = {key: values for key, values in self._maps.items() if key[0] in live}
+        # A new dict, not an update: snapshots of the old version keep theirs
+        self._manifest, self._manifest_mtime, self._maps = manifest, mtime, maps
+
+    def drop_table(self, table):
+        with self._lock:
+            self.refresh()
+            manifest = json.loads(json.dumps(self._manifest))
+            previous = manifest["tables"].pop(table, None)
+            if previous is None:
+                return
+            self._retire(manifest, previous["fragments"])
+            manifest["version"] = uuid.uuid4().hex
+            self._commit(manifest)
+
+    # ------------------------------------------------------------------ reading
+
+    def column(self, fragment, name):
+        """Memory-mapped, read-only view of one column of one fragment."""
+        key = (fragment["path"], name)
+        values = self._maps.get(key)
+        if values is None:
+            values = np.load(self.root / fragment["path"] / f"{name}.npy", mmap_mode="r")
+            self._maps[key] = values
+        return values
+
+    def scan(self, table, columns=None, filters=None):
+        """Yield one ``{column: array}`` chunk per fragment that matches ``filters``.
+
+        Only the projected ``columns`` (plus any filter columns) are mapped.
+        Fragments fully covered by the filters are yielded as zero-copy mmap
+        views; others are masked row-wise.
+        """
+        meta = self._meta(table)
+        columns = list(columns or meta["columns"])
+        return self._scan_fragments(meta, meta["fragments"], columns, self._prepare(meta, filters))
+
+    def read(self, table, columns=None, filters=None):
+        """Materialize the projected, filtered rows of ``table`` as a DataFrame."""
+        columns = list(columns or self._meta(table)["columns"])
+        chunks = list(self.scan(table, columns, filters))
+        return self._frame(table, columns, chunks)
+
+    def tail(self, table, n, columns=None, filters=None):
+        """Last ``n`` rows by time, reading only the newest fragments."""
+        meta = self._meta(table)
+        time_column = meta["time_column"]
+        columns = list(columns or meta["columns"])
+        wanted = columns if time_column in columns else columns + [time_column]
+        prepared = self._prepare(meta, filters)
+        candidates = sorted(
+            (f for f in meta["fragments"] if f["rows"] and self._prune(meta, f, prepared)[0]),
+            key=lambda f: f["stats"][time_column][1],
+            reverse=True,
+        )
+        chunks, threshold = [], None
+        for frag in candidates:
+            if threshold is not None and frag["stats"][time_column][1] < threshold:
+                break
+            chunk = next(self._scan_fragments(meta, [frag], wanted, prepared), None)
+            if chunk is None:
+                continue
+            chunks.append(chunk)
+            times = np.concatenate([c[time_column] for c in chunks]).astype(np.int64)
+            if len(times) >= n:
+                threshold = np.partition(times, len(times) - n)[len(times) - n]
+        frame = self._frame(table, wanted, chunks)
+        frame = frame.sort_values(time_column, kind="stable").tail(n)
+        return frame[columns].reset_index(drop=True)
+
+    def _scan_fragments(self, meta, fragments, columns, filters):
+        for frag in fragments:
+            keep, covered = self._prune(meta, frag, filters)
+            if not keep or frag["rows"] == 0:
+                continue
+            if covered:
+                yield {name: self.column(frag, name) for name in columns}
+                continue
+            mask = np.ones(frag["rows"], dtype=bool)
+            for name, op, value in filters:
+                mask &= _OPS[op](self.column(frag, name), value)
+            if mask.any():
+                yield {name: self.column(frag, name)[mask] for name in columns}
+
+    def _frame(self, table, columns, chunks):
+        schema = self._meta(table)["columns"]
+        data = {}
+        for name in columns:
+            if chunks:
+                data[name] = np.concatenate([chunk[name] for chunk in chunks])
+            else:
+                data[name] = np.empty(0, dtype=schema[name])
+        return pd.DataFrame(data)
+
+    def _meta(self, table):
+        try:
+            return self._manifest["tables"][table]
+        except KeyError:
+            raise KeyError(f"Unknown table {table!r} in store {self.root}") from None
+
+    def _prepare(self, meta, filters):
+        prepared = []
+        for name, op, value in filters or ():
+            if name not in meta["columns"]:
+                raise KeyError(f"Unknown column {name!r}")
+            if op not in _OPS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            dtype = meta["columns"][name]
+            if op == "in":
+                value = [_coerce(v, dtype) for v in value]
+            else:
+                value = _coerce(value, dtype)
+            prepared.append((name, op, value))
+        return prepared
+
+    def _prune(self, meta, frag, filters):
+        """Return ``(may_match, fully_covered)`` for a fragment using its zone map."""
+        covered = True
+        for name, op, value in filters:
+            stats = frag["stats"].get(name)
+            if stats is None:
+                covered = False
+                continue
+            dtype = meta["columns"][name]
+            lo, hi = (_coerce_stat(s, dtype) for s in stats)
+            if not _may_match(lo, hi, op, value):
+                return False, False
+            # NaNs are invisible to the zone map but fail every comparison
+            covered = covered and not frag.get("nulls", {}).get(name) and _covers(lo, hi, op, value)
+        return True, covered
+
+
+class StoreSnapshot(ColumnStore):
+    """One version of a store, pinned.
+
+    Every read sees the manifest the snapshot was taken from, whatever has
+    been committed since.  The snapshot shares that version's manifest and
+    memory maps with the store, so holding one per session costs a few
+    references, not a copy of any data.
+    """
+
+    def __init__(self, store):
+        self.root = store.root
+        self._lock = store._lock
+        self._manifest, self._manifest_mtime, self._maps = store._manifest, store._manifest_mtime, store._maps
+
+    def refresh(self):
+        """Snapshots never move; take a new one from the store for a newer version."""
+
+    def write_table(self, table, frame, time_column=None, key_column=None, mode="overwrite"):
+        raise TypeError(f"Cannot write {table!r}: store snapshots are read-only")
+
+    def drop_table(self, table):
+        raise TypeError(f"Cannot drop {table!r}: store snapshots are read-only")
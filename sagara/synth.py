@@ -0,0 +1,385 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TABLES = ('oceanographic', 'species', 'locations', 'sensors')
+
+# Monitoring stations; the oceanographic series is partitioned on ``Station``
+STATIONS = pd.DataFrame({
+    'Station': ['ST01', 'ST02', 'ST03', 'ST04', 'ST05'],
+    'Latitude': [19.0760, 18.5204, 20.1809, 19.2183, 18.9388],
+    'Longitude': [72.8777, 73.8567, 70.1647, 72.9781, 72.8305],
+    'Location': ['Mumbai Coast', 'Pune Region', 'Kutch Coast', 'Thane Creek', 'Navi Mumbai'],
+    'Temperature': [26.5, 24.8, 27.2, 25.9, 26.1],
+    'Species_Count': [45, 32, 38, 41, 36]
+})
+
+
+def sensors_frame(stations, rng, count=847):
+    """Buoys, moorings and gliders scattered around the monitoring stations."""
+    home = rng.integers(0, len(stations), count)
+    kinds = np.array(['Buoy', 'Mooring', 'Glider'])
+    return pd.DataFrame({
+        'Sensor_ID': [f'S{i:03d}' for i in range(1, count + 1)],
+        'Station': stations['Station'].to_numpy()[home],
+        'Latitude': stations['Latitude'].to_numpy()[home] + rng.normal(0, 0.35, count),
+        'Longitude': stations['Longitude'].to_numpy()[home] - np.abs(rng.normal(0, 0.45, count)),
+        'Kind': kinds[rng.choice(len(kinds), count, p=[0.7, 0.2, 0.1])]
+    })
+
+
+def oceanographic_frame(dates, stations, rng):
+    """Seasonal sine plus noise for every (date, station) pair, station-major."""
+    n = len(dates)
+    phase = 2 * np.pi * np.arange(n) / 365
+    frames = []
+    for station, base_temp in zip(stations['Station'], stations['Temperature']):
+        frames.append(pd.DataFrame({
+            'Date': dates,
+            'Station': station,
+            'Temperature': base_temp - 1.3 + 3 * np.sin(phase) + rng.normal(0, 1, n),
+            'Salinity': 35 + 0.5 * np.sin(phase) + rng.normal(0, 0.2, n),
+            'pH': 8.1 + 0.1 * np.sin(phase) + rng.normal(0, 0.05, n),
+            'Dissolved_Oxygen': 6.5 + 0.5 * np.sin(phase) + rng.normal(0, 0.3, n),
+            # Seconds between observation and arrival; a few readings straggle in late
+            'Ingest_Lag_s': rng.lognormal(np.log(180), 1.0, n).round(1)
+        }))
+    frame = pd.concat(frames, ignore_index=True)
+    inject_sensor_faults(frame, rng)
+    return frame
+
+
+def inject_sensor_faults(frame, rng, dropout=0.004, spikes=0.003):
+    """Blank out and spike a small fraction of readings, like real sensors do."""
+    spike_size = {'Temperature': 8.0, 'Salinity': 3.0, 'pH': 0.6, 'Dissolved_Oxygen': 4.0}
+    n = len(frame)
+    for name, size in spike_size.items():
+        values = frame[name].to_numpy(copy=True)
+        spiked = rng.random(n) < spikes
+        values[spiked] += size * rng.choice([-1.0, 1.0], size=spiked.sum())
+        values[rng.random(n) < dropout] = np.nan
+        frame[name] = values
+
+
+# Rows generated per chunk of the per-sensor series (~100 MB of columns)
+CHUNK_ROWS = 1_000_000
+
+
+def sensor_readings(sensors, stations, start, end, freq, rng, chunk_rows=CHUNK_ROWS):
+    """Yield every sensor's reading at ``freq`` from ``start`` to ``end``, in time-ordered chunks.
+
+    The same seasonal sine as the station series plus a daily cycle, around a
+    per-sensor offset from its station's base temperature.  Each chunk draws
+    from its own child of ``rng``, so the seed and ``chunk_rows`` fix the series.
+    """
+    times = pd.date_range(start=start, end=end, freq=freq)
+    per_chunk = max(1, chunk_rows // len(sensors))
+    n_chunks = -(-len(times) // per_chunk)
+    base = stations.set_index('Station')['Temperature'].reindex(sensors['Station']).to_numpy()
+    base = base + rng.normal(0, 0.3, len(sensors))
+    ids = sensors['Sensor_ID'].to_numpy().astype(str)
+    homes = sensors['Station'].to_numpy().astype(str)
+    origin = times[0].normalize().to_datetime64()
+    for i, chunk_rng in enumerate(rng.spawn(n_chunks)):
+        chunk = times[i * per_chunk:(i + 1) * per_chunk]
+        days = ((chunk.to_numpy() - origin) / np.timedelta64(1, 'D'))[:, None]
+        season = np.sin(2 * np.pi * days / 365)
+        daily = np.sin(2 * np.pi * (days % 1) - np.pi / 2)
+        shape = (len(chunk), len(sensors))
+        frame = pd.DataFrame({
+            'Date': np.repeat(chunk.to_numpy(), len(sensors)),
+            'Station': np.tile(homes, len(chunk)),
+            'Sensor_ID': np.tile(ids, len(chunk)),
+            'Temperature': (base - 1.3 + 3 * season + 0.4 * daily + chunk_rng.normal(0, 0.5, shape)).ravel(),
+            'Salinity': (35 + 0.5 * season + chunk_rng.normal(0, 0.2, shape)).ravel(),
+            'pH': (8.1 + 0.1 * season + chunk_rng.normal(0, 0.05, shape)).ravel(),
+            'Dissolved_Oxygen': (6.5 + 0.5 * season - 0.2 * daily + chunk_rng.normal(0, 0.3, shape)).ravel(),
+            'Ingest_Lag_s': chunk_rng.lognormal(np.log(180), 1.0, shape[0] * shape[1]).round(1)
+        })
+        inject_sensor_faults(frame, chunk_rng)
+        yield frame
+
+
+def generate_marine_data(store, seed=None, start='2024-01-01', end='2024-12-31', freq=None, chunk_rows=CHUNK_ROWS):
+    """Populate ``store`` with the oceanographic, species, location and sensor tables.
+
+    By default the oceanographic table is one daily series per station.  With
+    ``freq`` (e.g. ``'1min'``) it holds every sensor's reading at that
+    frequency instead, written to disk ``chunk_rows`` at a time, so years of
+    per-minute data never have to fit in memory.
+    """
+    rng = np.random.default_rng(seed)
+
+    sensors = None
+    if freq is None:
+        dates = pd.date_range(start=start, end=end, freq='D')
+        readings = oceanographic_frame(dates, STATIONS, rng)
+    else:
+        sensors = sensors_frame(STATIONS, rng)
+        readings = sensor_readings(sensors, STATIONS, start, end, freq, rng, chunk_rows)
+    store.write_table('oceanographic', readings, time_column='Date', key_column='Station')
+
+    species_data = pd.DataFrame({
+        'Species': ['Tuna', 'Sardine', 'Mackerel', 'Anchovy', 'Pomfret', 'Kingfish'],
+        'Count': [1250, 3400, 2100, 4500, 850, 1100],
+        'Biomass_kg': [15000, 8500, 6300, 4500, 12000, 9800],
+        'Habitat_Depth': [50, 20, 30, 15, 40, 35]
+    })
+    store.write_table('species', species_data)
+
+    store.write_table('locations', STATIONS)
+    store.write_table('sensors', sensors if sensors is not None else sensors_frame(STATIONS, rng))
+
+
+# Fishing gear and, per species in the species table's order, how its landings split across them
+GEARS = ['Trawl', 'Gillnet', 'Purse Seine', 'Hook & Line']
+GEAR_MIX = [
+    [0.05, 0.15, 0.30, 0.50],
+    [0.10, 0.20, 0.65, 0.05],
+    [0.25, 0.25, 0.45, 0.05],
+    [0.20, 0.10, 0.65, 0.05],
+    [0.60, 0.30, 0.00, 0.10],
+    [0.10, 0.30, 0.10, 0.50],
+]
+# Mean weight (kg) of one landed fish per species, and the monsoon months closed to fishing
+FISH_WEIGHT_KG = [12.0, 0.05, 0.25, 0.02, 0.6, 8.0]
+CLOSED_MONTHS = (6, 7)
+
+
+def catch_frame(dates, stations, species, rng, landings_per_day=400):
+    """One row per landing: where and when, which species and gear, weight and fish count.
+
+    Landings peak after the monsoon and all but stop during the June-July
+    fishing ban; each species splits across gears by its ``GEAR_MIX`` row.
+    """
+    weights = np.resize(FISH_WEIGHT_KG, len(species))
+    mix = np.resize(np.array(GEAR_MIX), (len(species), len(GEARS)))
+    mix = mix / mix.sum(axis=1, keepdims=True)
+    months = dates.month.to_numpy()
+    season = 1 + 0.5 * np.cos(2 * np.pi * (months - 11) / 12)
+    season[np.isin(months, CLOSED_MONTHS)] = 0.05
+    per_day = rng.poisson(landings_per_day * season)
+    n = int(per_day.sum())
+    day = np.repeat(np.arange(len(dates)), per_day)
+    station = rng.integers(0, len(stations), n)
+    kind = rng.integers(0, len(species), n)
+    # Inverse-CDF draw of each landing's gear from its species' mix
+    gear = (rng.random(n)[:, None] > np.cumsum(mix, axis=1)[kind, :-1]).sum(axis=1)
+    catch_kg = (rng.lognormal(np.log(40), 1.0, n) * (1 + 2 * (weights[kind] > 1))).round(1)
+    return pd.DataFrame({
+        'Date': dates.to_numpy()[day] + pd.to_timedelta(rng.integers(0, 86400, n), unit='s').to_numpy(),
+        'Station': np.asarray(stations['Station'])[station],
+        'Species': np.asarray(species)[kind],
+        'Gear': np.asarray(GEARS)[gear],
+        'Catch_kg': catch_kg,
+        'Count': np.maximum(1, np.round(catch_kg / weights[kind] * rng.uniform(0.8, 1.2, n))).astype(np.int64)
+    })
+
+
+def generate_catch_data(store, seed=None, start='2022-01-01', end='2024-12-31', landings_per_day=400):
+    """Populate ``store`` with the ``catch`` table, a year of landings at a time.
+
+    Species come from the store's species table, so write that first.
+    """
+    rng = np.random.default_rng(seed)
+    species = store.read('species', columns=['Species'])['Species'].tolist()
+    stations = store.read('locations', columns=['Station'])
+    dates = pd.date_range(start=start, end=end, freq='D')
+    years = np.unique(dates.year)
+    chunks = (
+        catch_frame(dates[dates.year == year], stations, species, year_rng, landings_per_day)
+        for year, year_rng in zip(years, rng.spawn(len(years)))
+    )
+    store.write_table('catch', chunks, time_column='Date', key_column='Station')
+
+
+def _mutate(sequence, rng, rate):
+    """Substitute a ``rate`` fraction of bases at random."""
+    bases = np.frombuffer(sequence.encode(), dtype='S1').copy()
+    hit = rng.random(len(bases)) < rate
+    bases[hit] = rng.choice(np.array(list(b'ACGT'), dtype=np.uint8), hit.sum()).view('S1')
+    return bases.tobytes().decode()
+
+
+def _reverse_complement(sequence):
+    return sequence.translate(str.maketrans('ACGT', 'TGCA'))[::-1]
+
+
+def edna_library(species, rng, haplotypes=4, length=1500, divergence=0.015):
+    """Barcode-like reference sequences: a few haplotypes per species."""
+    ids, sequences = [], []
+    for name in species:
+        barcode = ''.join(rng.choice(list('ACGT'), length))
+        for _ in range(haplotypes):
+            ids.append(f'REF{len(ids) + 1:04d} {name}')
+            sequences.append(_mutate(barcode, rng, divergence))
+    return ids, sequences
+
+
+def edna_reads(references, rng, reads=4000, length=150, error=0.01, off_target=0.1):
+    """Reads sampled from a sample's reference sequences, either strand, with errors.
+
+    One species dominates each sample; ``off_target`` of the reads come from
+    organisms outside the library.
+    """
+    weights = rng.dirichlet(np.full(len(references), 0.3))
+    sources = rng.choice(len(references), reads, p=weights)
+    out = []
+    for source in sources:
+        if rng.random() < off_target:
+            out.append(''.join(rng.choice(list('ACGT'), length)))
+            continue
+        reference = references[source]
+        start = rng.integers(0, len(reference) - length + 1)
+        read = _mutate(reference[start:start + length], rng, error)
+        out.append(_reverse_complement(read) if rng.random() < 0.5 else read)
+    return out
+
+
+def generate_edna_library(reference_path, samples_dir, species, seed=None, samples=5, reads=4000):
+    """Write a reference FASTA for ``species`` plus a batch of sample read files."""
+    from .edna import write_fasta
+
+    rng = np.random.default_rng(seed)
+    ids, sequences = edna_library(species, rng)
+    write_fasta(reference_path, ids, sequences)
+    for i in range(1, samples + 1):
+        sample = edna_reads(sequences, rng, reads)
+        write_fasta(Path(samples_dir) / f'DNA_{i:03d}.fasta', [f'DNA_{i:03d}.{j}' for j in range(len(sample))], sample)
+
+
+# Outline aspect ratio, growth rings, edge lobes and lobe depth of each species' otoliths
+OTOLITH_SHAPES = [(1.2, 4, 0, 0.0), (2.2, 9, 6, 0.04), (1.7, 6, 12, 0.08), (2.8, 12, 0, 0.0), (1.4, 8, 8, 0.12), (2.0, 5, 3, 0.10)]
+
+
+def otolith_image(shape, rng, size=128):
+    """Grey-scale otolith on a dark background, randomly rotated and scaled."""
+    aspect, rings, lobes, depth = shape
+    y, x = np.mgrid[-1:1:size * 1j, -1:1:size * 1j]
+    angle = rng.uniform(0, np.pi)
+    u = x * np.cos(angle) + y * np.sin(angle)
+    v = -x * np.sin(angle) + y * np.cos(angle)
+    major = rng.uniform(0.75, 0.9)
+    r = np.hypot(u / major, v * aspect * rng.uniform(0.92, 1.08) / major)
+    theta = np.arctan2(v, u)
+    edge = 1 + depth * np.cos(lobes * theta + rng.uniform(0, 2 * np.pi))
+    inside = r < edge
+    shade = 0.55 + 0.25 * np.cos(2 * np.pi * rings * r / edge) + 0.15 * (1 - r / edge)
+    image = np.where(inside, shade, 0.05) + rng.normal(0, 0.04, (size, size))
+    return (np.clip(image, 0, 1) * 255).astype(np.uint8)
+
+
+def generate_otolith_images(directory, species, seed=None, per_species=40):
+    """PNG otolith scans named ``OTO_<n>.png``, shuffled across ``species``."""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    labels = rng.permutation(np.repeat(np.arange(len(species)), per_species))
+    for i, label in enumerate(labels, 1):
+        Image.fromarray(otolith_image(OTOLITH_SHAPES[label % len(OTOLITH_SHAPES)], rng)).save(directory / f'OTO_{i:03d}.png')
+
+
+# Named taxa pinned along the niche axis (0 = basal producers, 1 = apex predators)
+NAMED_TAXA = {
+    'Phytoplankton': 0.0, 'Seaweed': 0.01, 'Seagrass': 0.02, 'Zooplankton': 0.15, 'Copepods': 0.18,
+    'Krill': 0.2, 'Crustaceans': 0.3, 'Mollusks': 0.32, 'Anchovy': 0.4, 'Sardine': 0.42, 'Mackerel': 0.55,
+    'Pomfret': 0.6, 'Kingfish': 0.8, 'Tuna': 0.88, 'Dolphin': 0.93, 'Shark': 0.97,
+}
+
+
+def interaction_edges(rng, count=156, connectance=0.05, competition=0.7, symbiotic=0.2, basal=0.1):
+    """Typed interaction edges from the niche model of food-web structure.
+
+    Predator-prey links follow the niche model, restricted to prey lower on
+    the niche axis and with the bottom ``basal`` share as producers.  A
+    ``competition`` share of that many links joins species that share prey,
+    and a ``symbiotic`` share joins random pairs.
+    """
+    names = list(NAMED_TAXA) + [f'Taxon_{i:03d}' for i in range(1, count - len(NAMED_TAXA) + 1)]
+    niche = np.concatenate([list(NAMED_TAXA.values()), rng.random(count - len(NAMED_TAXA))])
+    beta = 1 / (2 * connectance) - 1
+    reach = niche * rng.beta(1, beta, count)
+    centre = rng.uniform(reach / 2, np.maximum(niche, reach / 2))
+    eats = (np.abs(niche[None, :] - centre[:, None]) <= reach[:, None] / 2) & (niche[None, :] < niche[:, None])
+    eats[niche < basal] = False
+    predator, prey = np.nonzero(eats)
+
+    shared = (eats.astype(np.int64) @ eats.T.astype(np.int64)) > 0
+    a, b = np.nonzero(np.triu(shared, 1))
+    pick = rng.choice(len(a), min(len(a), int(competition * len(predator))), replace=False)
+    left, right = rng.choice(count, (2, int(symbiotic * len(predator))))
+    mutual = left != right
+    names = np.array(names, dtype=object)
+    return pd.concat([
+        pd.DataFrame({'source': names[predator], 'target': names[prey], 'kind': 'predator-prey'}),
+        pd.DataFrame({'source': names[a[pick]], 'target': names[b[pick]], 'kind': 'competition'}),
+        pd.DataFrame({'source': names[left[mutual]], 'target': names[right[mutual]], 'kind': 'symbiotic'}),
+    ], ignore_index=True)
+
+
+def generate_interactions(path, seed=None, count=156):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    interaction_edges(np.random.default_rng(seed), count).to_csv(path, index=False)
+
+
+# Satellite scenes: a regional sea-surface temperature composite and a finer coastal chlorophyll pass
+SATELLITE_SCENES = {
+    'sst_regional': ((17.0, 67.0, 22.0, 74.0), (1000, 1400), 'Sea-surface temperature composite'),
+    'chlorophyll_mumbai': ((18.6, 72.4, 19.4, 73.2), (1600, 1600), 'Coastal chlorophyll-a'),
+}
+
+
+def _smooth_field(shape, rng, waves=24):
+    """Sum of random plane waves in [0, 1]: eddy-like structure without any filtering."""
+    y, x = np.mgrid[0:1:shape[0] * 1j, 0:1:shape[1] * 1j]
+    field = np.zeros(shape)
+    for _ in range(waves):
+        k = rng.uniform(2, 14)
+        angle = rng.uniform(0, 2 * np.pi)
+        field += np.sin(k * (x * np.cos(angle) + y * np.sin(angle)) * 2 * np.pi + rng.uniform(0, 2 * np.pi)) / k
+    return (field - field.min()) / (field.max() - field.min())
+
+
+def satellite_scene(bounds, shape, rng, chlorophyll=False):
+    """RGB image of one scene, north row first: ocean colour ramp, land in earth tones."""
+    from .habitat import seafloor_depth
+
+    south, west, north, east = bounds
+    lat = north - (np.arange(shape[0]) + 0.5) / shape[0] * (north - south)
+    lon = west + (np.arange(shape[1]) + 0.5) / shape[1] * (east - west)
+    grid_lat, grid_lon = np.meshgrid(lat, lon, indexing='ij')
+    depth = seafloor_depth(grid_lat, grid_lon)
+    field = _smooth_field(shape, rng)
+    if chlorophyll:
+        # Blooms hug the coast
+        value = np.clip(0.7 * np.exp(-depth / 40) + 0.4 * field, 0, 1)
+        stops = np.array([[8, 29, 88], [34, 94, 168], [65, 182, 196], [161, 218, 180], [255, 255, 204]], dtype=np.float64)
+    else:
+        value = np.clip(0.6 * field + 0.4 * (grid_lat - south) / (north - south), 0, 1)[::-1]
+        stops = np.array([[49, 54, 149], [116, 173, 209], [255, 255, 191], [244, 109, 67], [165, 0, 38]], dtype=np.float64)
+    position = value * (len(stops) - 1)
+    low = np.minimum(position.astype(np.int64), len(stops) - 2)
+    frac = (position - low)[..., None]
+    ocean = stops[low] * (1 - frac) + stops[low + 1] * frac
+    land = np.array([120, 110, 80]) + 40 * field[..., None]
+    rgb = np.where((depth > 0)[..., None], ocean, land)
+    return (rgb + rng.normal(0, 3, rgb.shape)).clip(0, 255).astype(np.uint8)
+
+
+def generate_satellite_scenes(directory, seed=None):
+    """Write the synthetic scenes as PNGs with ``.json`` sidecars holding their bounds."""
+    import json
+
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, (bounds, shape, source) in SATELLITE_SCENES.items():
+        pixels = satellite_scene(bounds, shape, rng, chlorophyll=name.startswith('chlorophyll'))
+        Image.fromarray(pixels).save(directory / f'{name}.png')
+        (directory / f'{name}.json').write_text(json.dumps({'bounds': list(bounds), 'time': '2024-12-30T05:30:00', 'source': source}))
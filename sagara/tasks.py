@@ -0,0 +1,104 @@
+"""The app's background job kinds.
+
+Each function takes the running ``Job`` first and JSON-able parameters after
+it; shared resources (store, process pool) are bound by ``register_tasks``.
+Results are plain dicts and lists so the scheduler can persist them.
+"""
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from .config import CLIMATOLOGY_DIR, EXPORT_DIR, INDEX_DIR, MODEL_DIR
+from .edna import ReferenceIndex, read_sequences, sample_summary
+from .export import export_file
+from .index import TimeIndex
+from .otolith import load_classifier, train_softmax
+from .scenarios import FoodWeb, ScenarioEngine
+from .seasonal import daily_means, decompose
+
+OTOLITH_MODEL = MODEL_DIR / "otolith.npz"
+
+
+def training_job(job, species, epochs=30):
+    """Retrain the otolith classifier; it replaces the current model only if it scores at least as well."""
+    history = []
+
+    def on_epoch(epoch, loss, accuracy):
+        history.append({"Epoch": epoch, "Loss": round(loss, 4), "Accuracy": round(accuracy, 4)})
+        job.progress(epoch / epochs, f"Epoch {epoch}/{epochs}", history=history)
+
+    model = train_softmax(species, epochs, on_epoch=on_epoch)
+    current = load_classifier(OTOLITH_MODEL) if OTOLITH_MODEL.exists() else None
+    deployed = current is None or model.accuracy >= (current.accuracy or 0.0)
+    if deployed:
+        model.save(OTOLITH_MODEL)
+    return {"model": model.name, "accuracy": model.accuracy, "deployed": deployed, "history": history}
+
+
+def edna_job(job, samples, index, pool=None):
+    """Match every ``(path, modified_ns)`` sample against the index in ``index`` and summarize each."""
+    reference = ReferenceIndex(index)
+    summaries = []
+    for done, (path, _) in enumerate(samples):
+        job.progress(done / len(samples), f"Sample {done + 1}/{len(samples)}")
+        ids, sequences = read_sequences(path)
+        matches = reference.match(sequences, ids, pool=pool)
+        summaries.append({"Sample_ID": Path(path).name.split(".")[0], **sample_summary(matches)})
+    return {"samples": summaries, "sequences": reference.sequences, "species": len(reference.species)}
+
+
+def scenario_job(job, scenario, web, pool=None):
+    """Run one ensemble for the food web given as ``{"producers": records, "consumers": ..., "predators": ...}``."""
+    tables = {role: pd.DataFrame(records) for role, records in web.items()}
+    engine = ScenarioEngine(FoodWeb.from_tables(tables["producers"], tables["consumers"], tables["predators"]), pool)
+    impact = engine.run(
+        scenario, progress=lambda fraction: job.progress(fraction, f"{fraction * engine.members:,.0f} members")
+    )
+    return {"members": engine.members, "impact": impact.to_dict("records")}
+
+
+def export_job(job, table, fmt, start=None, end=None, quality=0, name=None, store=None):
+    """Write an export of ``table`` under ``EXPORT_DIR`` for the side server to hand out."""
+    index = TimeIndex.open(store, table, INDEX_DIR)
+    lo, hi = index.range(start, end)
+    filename = f"{name or table}-{job.id}.{fmt}"
+    size = export_file(
+        index, fmt, lo, hi, EXPORT_DIR / filename, quality,
+        progress=lambda fraction: job.progress(fraction, "Writing"),
+    )
+    return {"file": filename, "bytes": size, "rows": index.count(lo, hi, quality)}
+
+
+def seasonal_job(job, table, version, pool=None, store=None):
+    """Trend and seasonal cycle of every station and variable of ``table``.
+
+    ``version`` only keys the job, so each version of the data is decomposed
+    once; the result records the store version actually read.
+    """
+    snapshot = store.snapshot()
+    stations = snapshot.read("locations", columns=["Station"])["Station"].tolist()
+    job.progress(0.0, "Daily means")
+    days, values, series = daily_means(snapshot, table, CLIMATOLOGY_DIR, stations)
+    if not len(days):
+        return {"version": snapshot.version, "origin": None, "first_day": None, "last_day": None, "series": []}
+    frame, origin = decompose(
+        days, values, series, pool,
+        progress=lambda fraction: job.progress(fraction, f"{fraction * len(series):,.0f} of {len(series):,} series"),
+    )
+    return {
+        "version": snapshot.version,
+        "origin": origin,
+        "first_day": int(days[0]),
+        "last_day": int(days[-1]),
+        "series": frame.to_dict("records"),
+    }
+
+
+def register_tasks(scheduler, store, pool=None):
+    scheduler.register("training", training_job)
+    scheduler.register("edna", partial(edna_job, pool=pool))
+    scheduler.register("scenario", partial(scenario_job, pool=pool))
+    scheduler.register("export", partial(export_job, store=store))
+    scheduler.register("seasonal", partial(seasonal_job, pool=pool, store=store))
+    return scheduler
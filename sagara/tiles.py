@@ -0,0 +1,265 @@
+"""Web-mercator tile pyramids of local satellite scenes.
+
+A scene is any image Pillow reads (GeoTIFF, PNG, JPEG) in the scenes
+directory with a ``<name>.json`` sidecar giving its ``bounds`` as
+``[south, west, north, east]`` on a regular lat/lon grid, plus optional
+``time`` and ``source``.  Each scene gets its own pyramid of 256-px XYZ
+tiles: its native zoom (where a tile pixel is about a scene pixel) is
+resampled from the scene, and every coarser zoom down to ``MIN_ZOOM`` is the
+2x2 alpha-weighted average of the zoom below.  The map adds one tile layer
+per scene with that native zoom as its ``maxNativeZoom``, so a coarse
+regional scene and a fine coastal one can both be shown at any zoom without
+tiling the whole region at the finest resolution.
+
+Pyramids are built under ``<root>/<fingerprint>/<scene>/<z>/<x>/<y>.png``
+for the current set of scene files and swapped in with ``os.replace``;
+``refresh()`` notices added, changed or removed scenes.  Tiles are read
+through a byte-size LRU, so the server keeps the hot part of the pyramid in
+memory however large the scenes are.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .cache import SizedLRUCache
+from .server import Response
+
+TILE = 256
+MIN_ZOOM = 5
+MAX_ZOOM = 16
+SCENE_SUFFIXES = (".tif", ".tiff", ".png", ".jpg", ".jpeg")
+CACHE_BYTES = int(os.environ.get("SAGARA_TILE_CACHE_MB", "64")) << 20
+
+
+def tile_x(lon, zoom):
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * 2 ** zoom
+
+
+def tile_y(lat, zoom):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    return (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * 2 ** zoom
+
+
+def tile_lat(y, zoom):
+    """Latitude of fractional tile row ``y``."""
+    return np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * np.asarray(y, dtype=np.float64) / 2 ** zoom))))
+
+
+def native_zoom(bounds, width):
+    """Zoom whose tile pixels are no coarser than the scene's pixels."""
+    degrees_per_pixel = (bounds[3] - bounds[1]) / width
+    zoom = int(np.ceil(np.log2(360.0 / (TILE * degrees_per_pixel))))
+    return min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+
+
+def scene_files(directory):
+    """``(image, sidecar)`` paths of every georeferenced scene in ``directory``, by name."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(
+        (path, path.with_suffix(".json"))
+        for path in directory.iterdir()
+        if path.suffix.lower() in SCENE_SUFFIXES and path.with_suffix(".json").exists()
+    )
+
+
+def fingerprint(files):
+    digest = hashlib.sha1()
+    for image, sidecar in files:
+        for path in (image, sidecar):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def _encode_png(rgba):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+
+def _write(path, rgba):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = _encode_png(rgba)
+    path.write_bytes(data)
+    return len(data)
+
+
+def _decode_png(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGBA"))
+
+
+def _render(pixels, bounds, zoom, x, y):
+    """Tile ``(zoom, x, y)`` sampled (nearest pixel) from a scene; transparent outside it."""
+    south, west, north, east = bounds
+    height, width = pixels.shape[:2]
+    offsets = np.arange(TILE) + 0.5
+    lon = (x * TILE + offsets) / (TILE * 2 ** zoom) * 360.0 - 180.0
+    lat = tile_lat(y + offsets / TILE, zoom)
+    col = np.floor((lon - west) / (east - west) * width).astype(np.int64)
+    row = np.floor((north - lat) / (north - south) * height).astype(np.int64)
+    inside = ((row >= 0) & (row < height))[:, None] & ((col >= 0) & (col < width))[None, :]
+    tile = pixels[np.clip(row, 0, height - 1)[:, None], np.clip(col, 0, width - 1)[None, :]]
+    return np.where(inside[..., None], tile, 0).astype(np.uint8)
+
+
+def _downsample(children):
+    """Parent tile from a ``{(dx, dy): rgba}`` map of up to four children, alpha-weighted."""
+    canvas = np.zeros((2 * TILE, 2 * TILE, 4), dtype=np.float64)
+    for (dx, dy), rgba in children.items():
+        canvas[dy * TILE:(dy + 1) * TILE, dx * TILE:(dx + 1) * TILE] = rgba
+    alpha = canvas[..., 3:]
+    # Average premultiplied colour so transparent pixels do not darken the edges
+    premultiplied = (canvas[..., :3] * alpha).reshape(TILE, 2, TILE, 2, 3).sum(axis=(1, 3))
+    weight = alpha.reshape(TILE, 2, TILE, 2, 1).sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rgb = np.where(weight > 0, premultiplied / weight, 0.0)
+    return np.dstack([rgb, weight / 4]).round().astype(np.uint8)
+
+
+class TilePyramid:
+    """Tile pyramids of the scenes in ``scenes_dir``, stored under ``root``."""
+
+    def __init__(self, scenes_dir, root, cache_bytes=CACHE_BYTES):
+        self.scenes_dir = Path(scenes_dir)
+        self.root = Path(root)
+        self.cache = SizedLRUCache(cache_bytes)
+        self.version = None
+        self.meta = {"scenes": {}}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Build pyramids for the current scene files if they changed; returns the version."""
+        files = scene_files(self.scenes_dir)
+        version = fingerprint(files)
+        if version == self.version:
+            return version
+        with self._lock:
+            if version != self.version:
+                directory = self.root / version
+                if not (directory / "meta.json").exists():
+                    self.build(files, directory)
+                    for stale in self.root.iterdir():
+                        if stale != directory and not stale.name.endswith(".tmp"):
+                            shutil.rmtree(stale, ignore_errors=True)
+                with open(directory / "meta.json") as f:
+                    self.meta = json.load(f)
+                self.version = version
+        return version
+
+    def scenes(self):
+        """Per scene: bounds, native zoom, time, source and tile count, by name."""
+        return self.meta["scenes"]
+
+    @staticmethod
+    def build(files, directory):
+        """Tile every scene: its native zoom from the image, coarser zooms from the zoom below."""
+        from PIL import Image
+
+        tmp = Path(f"{directory}.{os.getpid()}-{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        scenes = {}
+        for image_path, sidecar in files:
+            with open(sidecar) as f:
+                info = json.load(f)
+            bounds = [float(v) for v in info["bounds"]]
+            with Image.open(image_path) as image:
+                pixels = np.asarray(image.convert("RGBA"))
+            zoom = native_zoom(bounds, pixels.shape[1])
+            name = image_path.stem
+            scene_dir = tmp / name
+            levels, size = {}, 0
+
+            x0, x1 = int(tile_x(bounds[1], zoom)), int(np.ceil(tile_x(bounds[3], zoom))) - 1
+            y0, y1 = int(tile_y(bounds[2], zoom)), int(np.ceil(tile_y(bounds[0], zoom))) - 1
+            present = set()
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    tile = _render(pixels, bounds, zoom, x, y)
+                    if not tile[..., 3].any():
+                        continue
+                    size += _write(scene_dir / str(zoom) / str(x) / f"{y}.png", tile)
+                    present.add((x, y))
+            del pixels
+            levels[zoom] = present
+            for z in range(zoom - 1, MIN_ZOOM - 1, -1):
+                parents = {(x // 2, y // 2) for x, y in levels[z + 1]}
+                present = set()
+                for px, py in sorted(parents):
+                    children = {
+                        (dx, dy): _decode_png(scene_dir / str(z + 1) / str(2 * px + dx) / f"{2 * py + dy}.png")
+                        for dx in (0, 1) for dy in (0, 1)
+                        if (2 * px + dx, 2 * py + dy) in levels[z + 1]
+                    }
+                    tile = _downsample(children)
+                    if not tile[..., 3].any():
+                        continue
+                    size += _write(scene_dir / str(z) / str(px) / f"{py}.png", tile)
+                    present.add((px, py))
+                levels[z] = present
+            count = sum(len(tiles) for tiles in levels.values())
+            scenes[name] = {
+                "bounds": bounds,
+                "native_zoom": zoom,
+                "min_zoom": MIN_ZOOM,
+                "time": info.get("time"),
+                "source": info.get("source"),
+                "tiles": count,
+                "bytes": size,
+                "extent": {
+                    str(z): [min(x for x, _ in tiles), max(x for x, _ in tiles),
+                             min(y for _, y in tiles), max(y for _, y in tiles)]
+                    for z, tiles in levels.items() if tiles
+                },
+            }
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({"scenes": scenes}, f)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def tile(self, scene, zoom, x, y):
+        """PNG bytes of one tile, or None where the scene has no tile."""
+        version = self.version
+        info = self.meta["scenes"].get(scene)
+        extent = info["extent"].get(str(zoom)) if info else None
+        if extent is None or not (extent[0] <= x <= extent[1] and extent[2] <= y <= extent[3]):
+            return None
+        key = (version, scene, zoom, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            path = self.root / version / scene / str(zoom) / str(x) / f"{y}.png"
+            if not path.exists():
+                return None
+            data = path.read_bytes()
+            self.cache.put(key, data)
+        return data
+
+
+def tile_route(pyramid):
+    """Side-server handler for ``<scene>/<z>/<x>/<y>.png`` tiles of ``pyramid``."""
+
+    def handle(path, params):
+        scene, zoom, x, name = path.split("/")
+        y, suffix = name.split(".")
+        data = pyramid.tile(scene, int(zoom), int(x), int(y)) if suffix == "png" else None
+        if data is None:
+            return Response([b"no tile\n"], "text/plain", 404)
+        # The version is in the query string, so a tile URL never changes meaning
+        return Response([data], "image/png", headers={"Cache-Control": "public, max-age=86400"})
+
+    return handle
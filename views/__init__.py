@@ -0,0 +1,21 @@
+"""Dashboard pages, one module each, imported only when first shown.
+
+A page module exposes ``render()`` and imports its own chart and map
+libraries, so the shell (``poc.py``) and pages that do not need them never
+load plotly or folium.  Python keeps each module after its first import, so
+later reruns of the same page pay nothing extra.
+"""
+import importlib
+
+PAGES = {
+    "🏠 Overview": "overview",
+    "📊 Data Portal": "portal",
+    "🗺️ Marine Digital Twin": "twin",
+    "🧠 AI Analytics": "analytics",
+    "🤖 Oceanic Copilot": "copilot",
+    "📈 Ecosystem Modeling": "ecosystem",
+}
+
+
+def load(page):
+    return importlib.import_module(f"{__name__}.{PAGES[page]}")
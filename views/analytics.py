@@ -0,0 +1,176 @@
+"""🧠 AI Analytics: otolith classification, eDNA matching, habitat scores and model training."""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from sagara.config import EDNA_REFERENCE, EDNA_SAMPLES_DIR, KMER_DIR, OTOLITH_CACHE, OTOLITH_DIR
+from sagara.edna import ReferenceIndex
+from sagara.jobs import ACTIVE, CANCELLED, DONE, FAILED
+from sagara.otolith import OtolithPipeline, ResultCache, image_paths, load_classifier, train_default_classifier
+from sagara.synth import generate_edna_library, generate_otolith_images
+from sagara.tasks import OTOLITH_MODEL
+from views.shared import (
+    cached_figure, current_store, open_habitat_engine, open_job_scheduler, open_marine_store, open_process_pool,
+    rerun_fragment, watch_job,
+)
+
+
+@st.cache_resource
+def open_edna_index():
+    if not EDNA_REFERENCE.exists():
+        species = open_marine_store().read('species', columns=['Species'])['Species'].tolist()
+        generate_edna_library(EDNA_REFERENCE, EDNA_SAMPLES_DIR, species)
+    return ReferenceIndex.open(EDNA_REFERENCE, KMER_DIR)
+
+
+@st.cache_resource
+def open_otolith_pipeline(model_modified_ns):
+    # Reloaded when a training job deploys a new model; results are cached per model
+    if not OTOLITH_DIR.exists():
+        species = open_marine_store().read('species', columns=['Species'])['Species'].tolist()
+        generate_otolith_images(OTOLITH_DIR, species)
+    return OtolithPipeline(load_classifier(OTOLITH_MODEL), ResultCache(OTOLITH_CACHE), open_process_pool())
+
+
+def render():
+    store = current_store()
+    st.markdown("## 🧠 AI Analytics Engine")
+    job_scheduler = open_job_scheduler()
+    species_names = store.read('species', columns=['Species'])['Species'].tolist()
+    
+    # Model performance metrics
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("### 🔍 Otolith Classification")
+        if not OTOLITH_MODEL.exists():
+            train_default_classifier(species_names, OTOLITH_MODEL)
+        otolith_pipeline = open_otolith_pipeline(OTOLITH_MODEL.stat().st_mtime_ns)
+        accuracy = 100 * otolith_pipeline.classifier.accuracy
+        st.metric("Accuracy", f"{accuracy:.1f}%", help="Held-out accuracy of the current model")
+        st.progress(accuracy/100)
+        
+        st.markdown("**Recent Classifications:**")
+        # Rows appear batch by batch; images seen before come straight from the cache
+        classifications_table = st.empty()
+        classified = []
+        for rows in otolith_pipeline.classify(image_paths(OTOLITH_DIR)):
+            classified.append(rows)
+            classifications_table.dataframe(pd.concat(classified, ignore_index=True), use_container_width=True)
+        if classified:
+            classifications = pd.concat(classified, ignore_index=True).sort_values('Image_ID', ascending=False, ignore_index=True)
+            classifications_table.dataframe(classifications, use_container_width=True)
+    
+    with col2:
+        st.markdown("### 🧬 eDNA Analysis")
+        edna_index = open_edna_index()
+        # Matched in the background once per set of sample files; the result is persisted
+        edna_job = job_scheduler.ensure(
+            'edna',
+            samples=[[str(path), path.stat().st_mtime_ns] for path in sorted(EDNA_SAMPLES_DIR.glob('*.fa*'))],
+            index=str(edna_index.directory),
+        )
+        if edna_job['status'] == DONE:
+            edna_matches = pd.DataFrame(
+                edna_job['result']['samples'], columns=['Sample_ID', 'Reads', 'Species_Match', 'Match_Score', 'Matched']
+            )
+            total_reads = edna_matches['Reads'].sum()
+            accuracy = 100 * (edna_matches['Reads'] * edna_matches['Matched']).sum() / total_reads if total_reads else 0.0
+            st.metric("Match Rate", f"{accuracy:.1f}%")
+            st.progress(accuracy/100)
+            
+            st.markdown("**Recent Matches:**")
+            st.dataframe(edna_matches[['Sample_ID', 'Species_Match', 'Match_Score']], use_container_width=True)
+            st.caption(f"{total_reads:,} reads against {edna_index.sequences} reference sequences of {len(edna_index.species)} species")
+        else:
+            st.metric("Match Rate", "…")
+            watch_job(edna_job)
+            if edna_job['status'] in (FAILED, CANCELLED) and st.button("🔁 Retry Matching"):
+                job_scheduler.submit('edna', **edna_job['params'])
+                rerun_fragment()
+    
+    with col3:
+        st.markdown("### 🏠 Habitat Prediction")
+        habitat = open_habitat_engine()
+        whole_region, _ = habitat.raster()
+        water = whole_region[~np.isnan(whole_region)]
+        suitable = 100 * (water > 0.5).mean() if len(water) else 0.0
+        st.metric("Suitable Area", f"{suitable:.1f}%", help="Share of water cells scoring above 0.5 for at least one species")
+        st.progress(suitable/100)
+        
+        st.markdown("**Habitat Suitability:**")
+        regions = store.read('locations', columns=['Location', 'Latitude', 'Longitude'])
+        habitat_data = pd.DataFrame({
+            'Region': regions['Location'],
+            'Suitability': habitat.score(regions['Latitude'].to_numpy(), regions['Longitude'].to_numpy()).round(2)
+        })
+        st.dataframe(habitat_data, use_container_width=True)
+    
+    # Model training status: its own fragment, so starting a run leaves the panels above alone
+    st.fragment(training_panel)(job_scheduler, species_names)
+
+
+def training_panel(job_scheduler, species_names):
+    st.markdown("### 🔄 Model Training Status")
+    
+    col1, col2 = st.columns(2)
+    training_jobs = job_scheduler.jobs(limit=1, kind='training')
+    
+    with col1:
+        if st.button("🚀 Start Training", disabled=bool(training_jobs) and training_jobs[0]['status'] in ACTIVE):
+            job_scheduler.submit('training', species=species_names, epochs=30)
+            training_jobs = job_scheduler.jobs(limit=1, kind='training')
+        
+        if training_jobs:
+            training_job = training_jobs[0]
+            watch_job(training_job)
+            if training_job['status'] == DONE:
+                result = training_job['result']
+                if result['deployed']:
+                    st.success(f"✅ Model training completed: {100 * result['accuracy']:.1f}% held-out accuracy, now in use")
+                else:
+                    st.info(f"Model training completed at {100 * result['accuracy']:.1f}% held-out accuracy; "
+                            "the current model scores higher and was kept")
+        else:
+            st.caption("Retrains the otolith classifier in the background; you can keep using the portal meanwhile.")
+    
+    with col2:
+        st.markdown("**Training Metrics:**")
+        # Per-epoch metrics of the latest run, as recorded by the job
+        history = None
+        if training_jobs:
+            history = (training_jobs[0]['result'] or training_jobs[0]['detail'] or {}).get('history')
+        if history:
+            fig = cached_figure(
+                ('training_metrics', training_jobs[0]['id'], len(history)), lambda: training_figure(history)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.caption("No training runs yet.")
+
+
+def training_figure(history):
+    metrics_data = pd.DataFrame(history)
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    fig.add_trace(
+        go.Scatter(x=metrics_data['Epoch'], y=metrics_data['Loss'], name="Loss"),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Scatter(x=metrics_data['Epoch'], y=metrics_data['Accuracy'], name="Accuracy"),
+        secondary_y=True,
+    )
+    
+    fig.update_yaxes(title_text="Loss", secondary_y=False)
+    fig.update_yaxes(title_text="Accuracy", secondary_y=True)
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#e8f4f8'
+    )
+    return fig
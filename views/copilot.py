@@ -0,0 +1,112 @@
+"""🤖 Oceanic Copilot: chat over the marine data and quick-action reports."""
+import streamlit as st
+
+from sagara.copilot import Copilot, Plan
+from views.shared import (
+    open_aggregates, open_anomaly_detector, open_fisheries_cube, open_habitat_engine, open_marine_store, open_metrics,
+    open_quality_engine, rerun_fragment, seasonal_trends, span
+)
+
+
+RECENT_CHAT_MESSAGES = 20
+
+
+@st.cache_resource
+def open_copilot():
+    copilot = Copilot(
+        open_marine_store(), quality=open_quality_engine(), alerts=open_anomaly_detector(),
+        fisheries=open_fisheries_cube(), trends=seasonal_trends
+    )
+    open_metrics().watch_cache('copilot', copilot.cache)
+    return copilot
+
+
+def render():
+    st.markdown("## 🤖 Oceanic Copilot - AI Assistant")
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.markdown("### 💬 Chat with Oceanic Copilot")
+        
+        # Display chat history: only the recent tail is rendered on every rerun
+        chat_container = st.container()
+        with chat_container:
+            history = list(st.session_state.chat_history)
+            older = len(history) - RECENT_CHAT_MESSAGES
+            if older > 0 and st.toggle(f"Show {older} earlier messages"):
+                shown = history
+            else:
+                shown = history[-RECENT_CHAT_MESSAGES:]
+            for message in shown:
+                if message["role"] == "assistant":
+                    st.markdown(f"🌊 **Oceanic Copilot:** {message['content']}")
+                else:
+                    st.markdown(f"👤 **You:** {message['content']}")
+        
+        # Chat input
+        user_input = st.text_input("Ask about marine data, analysis, or insights...")
+        
+        if st.button("Send") and user_input:
+            # Add user message
+            st.session_state.chat_history.append({"role": "user", "content": user_input})
+            
+            # Planned and answered locally, cached per plan and data version
+            with span('data'):
+                ai_response = open_copilot().answer(user_input)
+            st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+            
+            rerun_fragment()
+    
+    with col2:
+        st.markdown("### 🎯 Quick Actions")
+        
+        if st.button("📊 Generate Species Report"):
+            copilot = open_copilot()
+            st.session_state.chat_history.append({
+                "role": "assistant", 
+                "content": copilot.execute(Plan("species", "Count", "max", (), (), None)) + " "
+                           + copilot.execute(Plan("species", "Biomass_kg", "max", (), (), None)) + " "
+                           + copilot.execute(Plan("catch", "Catch_kg", "sum", (), (), 365))
+            })
+            rerun_fragment()
+        
+        if st.button("🌡️ Temperature Analysis"):
+            # Long-term trend from the seasonal decomposition job, recent behaviour from the rolling windows
+            if seasonal_trends() is None:
+                long_term = "The seasonal decomposition of this data version is still running. "
+            else:
+                long_term = open_copilot().execute(Plan("variable", "Temperature", "trend", (), (), None)) + " "
+            rolling = open_aggregates().snapshot('90d', 'Temperature')
+            change = rolling['Trend_per_day'].mean() * 90
+            warmest = rolling.loc[rolling['Mean'].idxmax()]
+            st.session_state.chat_history.append({
+                "role": "assistant", 
+                "content": long_term + f"Over the past 90 days across {len(rolling)} stations, "
+                           f"the average linear trend is {change:+.2f}°C over the window "
+                           f"({'warming' if change > 0 else 'cooling'}), with a mean of {rolling['Mean'].mean():.1f}°C "
+                           f"and a typical variability of ±{rolling['Std'].mean():.1f}°C. "
+                           f"{warmest['Station']} is the warmest at {warmest['Mean']:.1f}°C."
+            })
+            rerun_fragment()
+        
+        if st.button("🗺️ Create Habitat Map"):
+            habitat_summary = open_habitat_engine().summary()
+            listing = "; ".join(
+                f"{row.Species}: {row.Suitable_Area:.0%} of the region suitable, best near {row.Best_Station} ({row.Best_Score:.2f})"
+                for row in habitat_summary.itertuples()
+            )
+            st.session_state.chat_history.append({
+                "role": "assistant", 
+                "content": "Habitat suitability from the last 30 days of station temperature and salinity, "
+                           f"scored against each species' depth preference. {listing}. "
+                           "The map is on the Marine Digital Twin under the Species Distribution layer."
+            })
+            rerun_fragment()
+        
+        st.markdown("### 📈 AI Capabilities")
+        st.info("✅ Natural Language Processing")
+        st.info("✅ Data Query & Analysis")
+        st.info("✅ Visualization Generation")
+        st.info("✅ Report Creation")
+        st.info("✅ Predictive Modeling")
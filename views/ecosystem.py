@@ -0,0 +1,191 @@
+"""📈 Ecosystem Modeling: interaction network, food web and climate scenarios."""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from sagara.config import INTERACTIONS_FILE
+from sagara.jobs import CANCELLED, DONE, FAILED
+from sagara.network import KINDS, InteractionGraph
+from sagara.scenarios import HORIZON_MONTHS
+from sagara.synth import generate_interactions
+from views.shared import cached_figure, open_job_scheduler, rerun_fragment, watch_job
+
+
+@st.cache_resource
+def open_interaction_graph(modified_ns):
+    # Reloaded when the edge file changes; edits made in the app update it in place
+    return InteractionGraph.from_csv(INTERACTIONS_FILE)
+
+
+def render():
+    st.markdown("## 📈 Ecosystem Graph Modeling")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Edits rerun only this panel
+        st.fragment(network_panel)()
+    
+    with col2:
+        st.markdown("### 📊 Ecosystem Health Index")
+        fig = cached_figure(('ecosystem_health',), health_figure)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Food web analysis
+    st.markdown("### 🔗 Food Web Analysis")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("**Primary Producers**")
+        producers = pd.DataFrame({
+            'Species': ['Phytoplankton', 'Seaweed', 'Marine Plants'],
+            'Biomass': [12500, 8900, 6700],
+            'Growth_Rate': [0.12, 0.08, 0.05]
+        })
+        st.dataframe(producers, use_container_width=True)
+    
+    with col2:
+        st.markdown("**Primary Consumers**")
+        consumers = pd.DataFrame({
+            'Species': ['Zooplankton', 'Small Fish', 'Crustaceans'],
+            'Population': [450000, 85000, 67000],
+            'Feeding_Rate': [0.25, 0.18, 0.15]
+        })
+        st.dataframe(consumers, use_container_width=True)
+    
+    with col3:
+        st.markdown("**Top Predators**")
+        predators = pd.DataFrame({
+            'Species': ['Tuna', 'Shark', 'Large Fish'],
+            'Population': [1250, 340, 890],
+            'Hunt_Success': [0.68, 0.72, 0.61]
+        })
+        st.dataframe(predators, use_container_width=True)
+    
+    # Scenario modeling, in a fragment of its own
+    st.fragment(scenario_panel)(producers, consumers, predators)
+
+
+def network_panel():
+    st.markdown("### 🕸️ Species Interaction Network")
+    
+    # Network statistics
+    if not INTERACTIONS_FILE.exists():
+        generate_interactions(INTERACTIONS_FILE)
+    graph = open_interaction_graph(INTERACTIONS_FILE.stat().st_mtime_ns)
+    network_stats = graph.stats()
+    
+    for stat, value in network_stats.items():
+        st.metric(stat, value)
+    
+    st.markdown("**Keystone Species (PageRank):**")
+    st.dataframe(
+        graph.species_table().nlargest(5, 'PageRank')[['Species', 'Trophic_Level', 'Links', 'PageRank']],
+        use_container_width=True, hide_index=True
+    )
+    
+    with st.expander("✏️ Edit Interactions"):
+        edit_source = st.selectbox("Source", graph.names, key='edge_source')
+        edit_target = st.selectbox("Target", graph.names, index=min(1, len(graph.names) - 1), key='edge_target')
+        edit_kind = st.selectbox("Interaction", KINDS, key='edge_kind')
+        add_col, remove_col = st.columns(2)
+        if add_col.button("➕ Add Link"):
+            changed = graph.add_edge(edit_source, edit_target, edit_kind)
+            st.toast("Link added" if changed else "Link already present")
+            rerun_fragment()
+        if remove_col.button("➖ Remove Link"):
+            changed = graph.remove_edge(edit_source, edit_target, edit_kind)
+            st.toast("Link removed" if changed else "No such link")
+            rerun_fragment()
+
+
+def health_figure():
+    # Radar chart for ecosystem health
+    categories = ['Biodiversity', 'Productivity', 'Stability', 'Resilience', 'Connectivity']
+    values = [85, 78, 92, 73, 89]
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatterpolar(
+        r=values,
+        theta=categories,
+        fill='toself',
+        name='Ecosystem Health',
+        line_color='#00d4ff'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#e8f4f8'
+    )
+    return fig
+
+
+def scenario_panel(producers, consumers, predators):
+    st.markdown("### 🎯 Scenario Modeling")
+
+    scenario = st.selectbox(
+        "Select Climate Scenario",
+        ["Current Baseline", "+1°C Warming", "+2°C Warming", "Acidification Impact", "Overfishing Scenario"]
+    )
+
+    if scenario != "Current Baseline":
+        st.warning(f"⚠️ Analyzing impact of: {scenario}")
+    
+        # Paired baseline/scenario ensemble, run once per scenario and food web as a background job
+        job_scheduler = open_job_scheduler()
+        scenario_job = job_scheduler.ensure(
+            'scenario',
+            scenario=scenario,
+            web={
+                'producers': producers.to_dict('records'),
+                'consumers': consumers.to_dict('records'),
+                'predators': predators.to_dict('records'),
+            },
+        )
+        watch_job(scenario_job)
+        if scenario_job['status'] in (FAILED, CANCELLED) and st.button("🔁 Rerun Scenario"):
+            job_scheduler.submit('scenario', **scenario_job['params'])
+            rerun_fragment()
+    
+        if scenario_job['status'] == DONE:
+            impact_data = pd.DataFrame(scenario_job['result']['impact'])
+            st.dataframe(impact_data, use_container_width=True, hide_index=True)
+            st.caption(f"Median change after {HORIZON_MONTHS // 12} years across {scenario_job['result']['members']:,} "
+                       "perturbed food webs; error bars span the 5th to 95th percentile.")
+        
+            fig = cached_figure(
+                ('scenario_impact', scenario_job['id']), lambda: impact_figure(impact_data, scenario)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+
+def impact_figure(impact_data, scenario):
+    fig = px.bar(
+        impact_data.assign(
+            Upper=impact_data['P95'] - impact_data['Population_Change'],
+            Lower=impact_data['Population_Change'] - impact_data['P5']
+        ),
+        x='Species', 
+        y='Population_Change',
+        error_y='Upper',
+        error_y_minus='Lower',
+        title=f'Predicted Population Changes - {scenario}',
+        color='Population_Change',
+        color_continuous_scale=['red', 'yellow', 'green']
+    )
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#e8f4f8'
+    )
+    return fig
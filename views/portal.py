@@ -0,0 +1,204 @@
+"""📊 Data Portal: paged oceanographic records, fisheries catch rollups, exports and quality metrics."""
+from datetime import datetime, timedelta
+
+import time
+
+import pandas as pd
+import streamlit as st
+
+from sagara.config import INDEX_DIR
+from sagara.export import FORMATS
+from sagara.fisheries import AGGREGATIONS, DIMENSIONS, MEASURES
+from sagara.index import TimeIndex
+from sagara.jobs import DONE
+from sagara.quality import QUALITY_FILTERS
+from views.shared import (
+    current_store, open_fisheries_cube, open_job_scheduler, open_quality_engine, open_satellite_tiles,
+    start_side_server, span, watch_job
+)
+
+
+TIME_RANGES = {"Last 7 Days": 7, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365}
+PAGE_SIZE = 100
+
+
+@st.cache_resource
+def open_time_index(_store, table, version):
+    return TimeIndex.open(_store, table, INDEX_DIR)
+
+
+def render():
+    store = current_store()
+    st.markdown("## 📊 Unified Data Portal")
+    
+    # Data source selection
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        data_source = st.selectbox(
+            "Select Data Source",
+            ["Oceanographic", "Fisheries", "eDNA", "Satellite Imagery"]
+        )
+    
+    with col2:
+        time_range = st.selectbox(
+            "Time Range",
+            list(TIME_RANGES)
+        )
+    
+    with col3:
+        quality_filter = st.selectbox(
+            "Quality Filter",
+            list(QUALITY_FILTERS)
+        )
+    
+    # Data table
+    if data_source == "Oceanographic":
+        st.markdown("### 🌊 Oceanographic Data")
+        # Binary-search the time range, then page through the quality bitmap
+        time_index = open_time_index(store, 'oceanographic', store.table_version('oceanographic'))
+        _, last_time = time_index.span()
+        if last_time is None:
+            st.info("No oceanographic readings have been loaded yet.")
+        else:
+            range_start = last_time - timedelta(days=TIME_RANGES[time_range])
+            quality = QUALITY_FILTERS[quality_filter]
+            with span('data'):
+                lo, hi = time_index.range(start=range_start)
+                total_rows = time_index.count(lo, hi, quality)
+            page_count = max(1, -(-total_rows // PAGE_SIZE))
+            page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1)
+            offset = (page_number - 1) * PAGE_SIZE
+            with span('data'):
+                positions = time_index.positions(lo, hi, offset, PAGE_SIZE, quality, descending=True)
+                filtered_data = time_index.take(positions, with_quality=True)
+            st.caption(f"Rows {min(offset + 1, total_rows):,}–{offset + len(filtered_data):,} of {total_rows:,}, newest first")
+            st.dataframe(filtered_data, use_container_width=True)
+        
+            # Streamed from the side server in chunks, straight from the store
+            side_server = start_side_server()
+            export_col1, export_col2 = st.columns([1, 3])
+            with export_col1:
+                export_format = st.selectbox(
+                    "Export Format",
+                    list(FORMATS),
+                    format_func=lambda fmt: FORMATS[fmt][0]
+                )
+            with export_col2:
+                st.markdown("&nbsp;")
+                if side_server is None:
+                    st.info("📥 Downloads are unavailable: the export server could not start in this process.")
+                else:
+                    st.link_button(
+                        f"📥 Download Data ({total_rows:,} rows)",
+                        side_server.url(
+                            '/export/oceanographic',
+                            start=range_start.isoformat(),
+                            quality=quality,
+                            format=export_format,
+                            name=f'oceanographic_data_{datetime.now().strftime("%Y%m%d")}'
+                        )
+                    )
+        
+            # Large exports can also be written in the background and collected later
+            job_scheduler = open_job_scheduler()
+            if st.button("🗂️ Prepare Export in Background"):
+                st.session_state.export_job = job_scheduler.submit(
+                    'export',
+                    table='oceanographic',
+                    fmt=export_format,
+                    start=range_start.isoformat(),
+                    quality=quality,
+                    name=f'oceanographic_data_{datetime.now().strftime("%Y%m%d")}'
+                )
+            export_job = job_scheduler.get(st.session_state.export_job) if 'export_job' in st.session_state else None
+            if export_job is not None:
+                watch_job(export_job)
+                if export_job['status'] == DONE and side_server is not None:
+                    st.link_button(
+                        f"📦 Download Prepared Export ({export_job['result']['rows']:,} rows, "
+                        f"{export_job['result']['bytes'] / 1e6:.1f} MB)",
+                        side_server.url(f"/files/{export_job['result']['file']}")
+                    )
+    
+    elif data_source == "Fisheries":
+        st.markdown("### 🐟 Fisheries Catch")
+        # Group-bys are answered from pre-summed rollups; the time range is widened to whole months to match them
+        fisheries = open_fisheries_cube()
+        fisheries.refresh()
+        _, last_month = fisheries.months()
+        months = max(1, round(TIME_RANGES[time_range] / 30.44))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            group_by = st.multiselect("Group By", list(DIMENSIONS), default=['Species'])
+        with col2:
+            measure = st.selectbox("Measure", list(MEASURES), format_func=lambda name: name.replace('_', ' '))
+        with col3:
+            agg = st.selectbox("Aggregation", list(AGGREGATIONS))
+        col1, col2 = st.columns(2)
+        with col1:
+            species = st.multiselect("Species", fisheries.rollups[('Species',)]['Species'].tolist())
+        with col2:
+            gears = st.multiselect("Gear", fisheries.rollups[('Gear',)]['Gear'].tolist())
+        filters = []
+        if last_month is not None:
+            filters.append(('Month', '>=', (last_month.to_period('M') - (months - 1)).start_time))
+        if species:
+            filters.append(('Species', 'in', species))
+        if gears:
+            filters.append(('Gear', 'in', gears))
+        rollup = fisheries.plan(group_by, agg, filters)
+        start = time.perf_counter()
+        with span('data'):
+            catch = fisheries.query(group_by, measure, agg, filters)
+        elapsed_ms = 1000 * (time.perf_counter() - start)
+        if rollup is None:
+            source = "a scan of the landings"
+        else:
+            source = f"the {' × '.join(rollup) or 'grand total'} rollup ({len(fisheries.rollups[rollup]):,} rows)"
+        st.caption(
+            f"{months} month{'s' if months > 1 else ''} to {last_month:%B %Y}, answered from {source} "
+            f"in {elapsed_ms:.1f} ms" if last_month is not None else "No landings recorded yet"
+        )
+        st.dataframe(catch.round({measure: 2}), use_container_width=True, hide_index=True)
+    
+    elif data_source == "Satellite Imagery":
+        st.markdown("### 🛰️ Satellite Imagery")
+        # Scenes are tiled once per change to the scene files and shown on the Digital Twin map
+        tiles = open_satellite_tiles()
+        tiles.refresh()
+        scenes = tiles.scenes()
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Scene': name,
+                    'Source': scene['source'],
+                    'Acquired': scene['time'],
+                    'Bounds (S, W, N, E)': ', '.join(f'{v:.2f}' for v in scene['bounds']),
+                    'Zoom Levels': f"{scene['min_zoom']}–{scene['native_zoom']}",
+                    'Tiles': scene['tiles'],
+                    'Size (MB)': round(scene['bytes'] / 1e6, 1)
+                }
+                for name, scene in scenes.items()
+            ]),
+            use_container_width=True
+        )
+        cache = tiles.cache
+        st.caption(
+            f"Tile cache: {cache.bytes / 2**20:.1f} of {cache.maxbytes / 2**20:.0f} MB, "
+            f"{cache.hits:,} hits, {cache.misses:,} misses"
+        )
+    
+    # Data quality metrics
+    st.markdown("### ✅ Data Quality Metrics")
+    
+    quality_engine = open_quality_engine()
+    quality_scores = quality_engine.scores()
+    quality_deltas = quality_engine.deltas()
+    for column, (name, value) in zip(st.columns(4), quality_scores.items()):
+        with column:
+            st.metric(
+                name,
+                "n/a" if value is None else f"{value:.1f}%",
+                None if quality_deltas[name] is None else f"{quality_deltas[name]:+.1f}%"
+            )
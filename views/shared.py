@@ -0,0 +1,310 @@
+"""Resources and helpers shared by several pages.
+
+Everything here is cached per server process with ``st.cache_resource``;
+resources used by a single page live in that page's module instead, so a
+page never pays for another page's libraries or datasets.
+
+Several server worker processes can run side by side on one data directory.
+Each maps the same store files, gets its own side server (on a free port
+if ``SAGARA_SERVER_PORT`` is taken) and shares the job database, where a
+job is only ever failed once its owning process has exited.  The ingest
+socket belongs to one process at a time; the others follow the readings
+file until it is free.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from sagara.aggregates import AggregateEngine
+from sagara.anomaly import AnomalyDetector
+from sagara.cache import LRUCache
+from sagara.config import (
+    CLIMATOLOGY_DIR, EXPORT_DIR, FISHERIES_DIR, INDEX_DIR, JOBS_DB, PROFILE_DIR, QUALITY_DIR, SATELLITE_DIR, STORE_DIR,
+    TILE_DIR
+)
+from sagara.export import export_route, file_route
+from sagara.fisheries import CatchCube
+from sagara.habitat import HabitatEngine
+from sagara.index import TimeIndex
+from sagara.ingest import IngestService, RingBuffers
+from sagara.jobs import ACTIVE, CANCELLED, DONE, FAILED, JobScheduler
+from sagara.metrics import ActiveSet, Registry, metrics_route
+from sagara.profiler import SLOW_SECONDS, SamplingProfiler
+from sagara.quality import QualityEngine
+from sagara.seasonal import trends_frame
+from sagara.server import SideServer
+from sagara.store import ColumnStore
+from sagara.synth import TABLES, generate_catch_data, generate_marine_data, generate_satellite_scenes
+from sagara.tasks import register_tasks
+from sagara.tiles import TilePyramid, scene_files, tile_route
+from views import PAGES
+
+
+ONLINE_WITHIN_S = 300
+
+
+@st.cache_resource
+def open_metrics():
+    # One registry per server process, scraped from the side server's /metrics
+    return Registry()
+
+
+@st.cache_resource
+def open_session_tracker():
+    sessions = ActiveSet(window=ONLINE_WITHIN_S)
+    open_metrics().collect(lambda: [
+        ('sagara_active_sessions', 'gauge', "Sessions that reran within the last 5 minutes.", [({}, len(sessions))])
+    ])
+    return sessions
+
+
+@st.cache_resource
+def open_profiler():
+    # Off unless SAGARA_PROFILE_SLOW_S is set
+    if SLOW_SECONDS is None:
+        return None
+    profiler = SamplingProfiler(PROFILE_DIR, SLOW_SECONDS)
+    open_metrics().collect(lambda: [
+        ('sagara_slow_runs_total', 'counter', "Page runs slow enough to keep a profile of.", [({}, profiler.captured)])
+    ])
+    return profiler
+
+
+# Columnar store (built from the synthetic generator on first start)
+@st.cache_resource
+def open_marine_store():
+    store = ColumnStore(STORE_DIR)
+    if not all(store.has_table(t) for t in TABLES):
+        generate_marine_data(store)
+    return store
+
+
+def pin_store():
+    """Swap in the store's newest version and pin this session's reads to it."""
+    store = open_marine_store()
+    store.refresh()
+    st.session_state.store_snapshot = store.snapshot()
+    return st.session_state.store_snapshot
+
+
+def current_store():
+    """Version of the store this session is reading; a handle shared with every other session, not a copy."""
+    if 'store_snapshot' not in st.session_state:
+        return pin_store()
+    return st.session_state.store_snapshot
+
+
+@st.cache_resource
+def open_habitat_engine():
+    habitat = HabitatEngine(open_marine_store())
+    open_metrics().watch_cache('habitat_tiles', habitat.cache)
+    return habitat
+
+
+@st.cache_resource
+def start_ingest():
+    sensors = open_marine_store().read('sensors', columns=['Sensor_ID'])['Sensor_ID']
+    ingest = IngestService(RingBuffers(sensors.tolist()))
+    open_metrics().collect(lambda: [
+        ('sagara_ingest_readings_total', 'counter', "Sensor readings accepted.", [({}, ingest.received)]),
+        ('sagara_ingest_rejected_total', 'counter', "Sensor readings rejected as malformed or unknown.",
+         [({}, ingest.rejected)]),
+        ('sagara_ingest_subscriber_errors_total', 'counter', "Batches a subscriber (aggregates, alerts) failed on.",
+         [({}, ingest.subscriber_errors)]),
+        ('sagara_ingest_lag_seconds', 'gauge', "Age of the newest reading when its batch was written.",
+         [({}, ingest.last_lag_s)]),
+        ('sagara_sensors_online', 'gauge', "Sensors that reported within the last 5 minutes.",
+         [({}, ingest.buffers.online(ONLINE_WITHIN_S))]),
+        ('sagara_sensors', 'gauge', "Sensors known to the ingest service.", [({}, len(ingest.buffers))]),
+    ])
+    return ingest
+
+
+@st.cache_resource
+def open_aggregates():
+    store = open_marine_store()
+    engine = AggregateEngine.from_store(store)
+    sensors = store.read('sensors', columns=['Sensor_ID', 'Station'])
+    start_ingest().subscribe(engine.subscriber(dict(zip(sensors['Sensor_ID'], sensors['Station']))))
+    return engine
+
+
+@st.cache_resource
+def open_anomaly_detector():
+    store = open_marine_store()
+    detector = AnomalyDetector.from_store(store, CLIMATOLOGY_DIR / 'oceanographic-Temperature.json')
+    sensors = store.read('sensors', columns=['Sensor_ID', 'Station'])
+    start_ingest().subscribe(detector.subscriber(dict(zip(sensors['Sensor_ID'], sensors['Station']))))
+    open_metrics().collect(lambda: [
+        ('sagara_alerts', 'gauge', "Active marine alerts: ongoing heatwaves and spikes in the last hour.",
+         [({'kind': kind}, count) for kind, count in detector.summary().items()])
+    ])
+    return detector
+
+
+@st.cache_resource
+def open_quality_engine():
+    # One engine per server process, shared by every session
+    return QualityEngine(open_marine_store(), 'oceanographic', QUALITY_DIR / 'oceanographic.json')
+
+
+@st.cache_resource
+def open_fisheries_cube():
+    store = open_marine_store()
+    # Synthetic landings stand in until a real catch table is loaded
+    if not store.has_table('catch'):
+        generate_catch_data(store)
+    cube = CatchCube(store, FISHERIES_DIR / 'catch.json')
+    open_metrics().collect(lambda: [
+        ('sagara_fisheries_queries_total', 'counter', "Fisheries queries, by whether a rollup or a scan answered them.",
+         [({'source': source}, count) for source, count in cube.answered.items()])
+    ])
+    return cube
+
+
+@st.cache_resource
+def open_process_pool():
+    # Spawned, not forked: the server process already runs ingest and HTTP threads
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'))
+
+
+@st.cache_resource
+def open_job_scheduler():
+    # Training, eDNA batches, scenario ensembles and exports run here, off the script thread
+    return register_tasks(JobScheduler(JOBS_DB), open_marine_store(), open_process_pool())
+
+
+def seasonal_job():
+    """The seasonal decomposition of the current station data, started if it has not been yet.
+
+    Only the job's status is read; ``seasonal_result`` has its result.
+    """
+    version = open_marine_store().table_version('oceanographic', 'locations')
+    return open_job_scheduler().ensure('seasonal', with_result=False, table='oceanographic', version=version)
+
+
+@st.cache_resource(max_entries=4)
+def seasonal_result(job_id):
+    """A finished seasonal job's result and its per-series frame, decoded once: a done job's result never changes."""
+    result = open_job_scheduler().get(job_id)['result']
+    return result, trends_frame(result)
+
+
+def seasonal_trends():
+    """Per station and variable trends of the current data, or None while they are being computed."""
+    job = seasonal_job()
+    return seasonal_result(job['id'])[1] if job['status'] == DONE else None
+
+
+@st.cache_resource
+def open_satellite_tiles():
+    # Synthetic scenes stand in until real ones are dropped into SATELLITE_DIR
+    if not scene_files(SATELLITE_DIR):
+        generate_satellite_scenes(SATELLITE_DIR)
+    tiles = TilePyramid(SATELLITE_DIR, TILE_DIR)
+    tiles.refresh()
+    open_metrics().watch_cache('tiles', tiles.cache)
+    return tiles
+
+
+def serve_tile(path, params):
+    # Resolved per request so starting the server does not tile the scenes; the map opens them first
+    return tile_route(open_satellite_tiles())(path, params)
+
+
+@st.cache_resource
+def start_side_server():
+    """The export, tile and metrics server, or None if it could not bind a port; pages then leave out its links."""
+    store = open_marine_store()
+    try:
+        server = SideServer()
+    except OSError:
+        return None
+    server.route('/export', export_route(lambda table: TimeIndex.open(store, table, INDEX_DIR)))
+    server.route('/files', file_route(EXPORT_DIR))
+    server.route('/tiles', serve_tile)
+    server.route('/metrics', metrics_route(open_metrics()))
+    return server
+
+
+@st.cache_resource
+def open_figure_cache():
+    return open_metrics().watch_cache('figures', LRUCache(256))
+
+
+def cached_figure(key, build):
+    """Figure (or map layer) for ``key``, built once per server process.
+
+    The key must hold everything the figure depends on -- the store version
+    and the widget values -- so a rerun that changes none of them reuses it.
+    """
+    def timed_build():
+        with span('figure'):
+            return build()
+
+    return open_figure_cache().get_or_compute(key, timed_build)
+
+
+def span(section):
+    """Time a section of the current page (data load, figure build, map render) into ``sagara_span_seconds``."""
+    return open_metrics().histogram(
+        'sagara_span_seconds', "Wall time of page sections.", ('page', 'section')
+    ).time(page=PAGES.get(st.session_state.get('page'), ''), section=section)
+
+
+def track_session():
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        open_session_tracker().touch(ctx.session_id)
+
+
+def page_seconds():
+    return open_metrics().histogram('sagara_page_seconds', "Wall time of page runs.", ('page',))
+
+
+@contextmanager
+def instrument_page(page):
+    """Count the session, time the page's run and, when the profiler is on, keep a profile of slow runs."""
+    track_session()
+    profiler = open_profiler()
+    with page_seconds().time(page=page):
+        with profiler.capture(page) if profiler else nullcontext():
+            yield
+
+
+def rerun_fragment():
+    """Rerun just the fragment being executed, or the whole app when this is a full run."""
+    ctx = get_script_run_ctx()
+    st.rerun(scope='fragment' if ctx is not None and ctx.fragment_ids_this_run else 'app')
+
+
+JOB_POLL_SECONDS = 1.0
+JOB_LABELS = {
+    'training': "Model training", 'edna': "eDNA batch", 'scenario': "Scenario ensemble", 'export': "Data export",
+    'seasonal': "Seasonal decomposition"
+}
+
+
+def show_job_progress(job_id, polling):
+    job = open_job_scheduler().get(job_id, with_result=False)
+    if job['status'] in ACTIVE:
+        st.progress(job['progress'], text=f"{JOB_LABELS[job['kind']]}: {job['message']} ({100 * job['progress']:.0f}%)")
+        if st.button("✖️ Cancel", key=f"cancel_{job_id}"):
+            open_job_scheduler().cancel(job_id)
+    elif polling:
+        # Finished while this fragment was polling: rerun the page to show the result
+        st.rerun()
+    elif job['status'] == FAILED:
+        st.error(f"{JOB_LABELS[job['kind']]} failed: {job['error']}")
+    elif job['status'] == CANCELLED:
+        st.warning(f"{JOB_LABELS[job['kind']]} was cancelled")
+
+
+def watch_job(job):
+    """Progress of a background job, polled in a fragment so the rest of the page never waits on it."""
+    polling = job['status'] in ACTIVE
+    st.fragment(show_job_progress, run_every=JOB_POLL_SECONDS if polling else None)(job['id'], polling)
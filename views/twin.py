@@ -0,0 +1,238 @@
+"""🗺️ Marine Digital Twin: sensor map, ocean and habitat layers, live sensor status."""
+from datetime import timedelta
+
+import folium
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit_folium import st_folium
+
+from sagara.config import CUBE_DIR
+from sagara.cube import LAYERS, OceanCube
+from sagara.habitat import ALL_SPECIES, colorize
+from sagara.spatial import GridIndex, clustered_features, feature_collection
+from views.shared import (
+    current_store, open_habitat_engine, open_metrics, open_satellite_tiles, span, start_ingest,
+    start_side_server
+)
+
+
+ONLINE_WITHIN = pd.Timedelta(minutes=5)
+# Colour ramps of the ocean layers, low to high
+LAYER_COLORS = {
+    'Temperature': [[49, 54, 149], [116, 173, 209], [255, 255, 191], [244, 109, 67], [165, 0, 38]],
+    'Salinity': [[247, 252, 240], [168, 221, 181], [67, 162, 202], [8, 104, 172], [8, 64, 129]],
+    'Current Flow': [[255, 255, 255], [199, 233, 192], [116, 196, 118], [35, 139, 69], [0, 68, 27]],
+}
+
+
+@st.cache_resource
+def open_sensor_index(_store, version):
+    sensors = _store.read('sensors', columns=['Sensor_ID', 'Station', 'Latitude', 'Longitude', 'Kind'])
+    return sensors, GridIndex(sensors['Latitude'], sensors['Longitude'])
+
+
+@st.cache_resource
+def open_ocean_cube(_store, version):
+    cube = OceanCube.open(_store, CUBE_DIR)
+    open_metrics().watch_cache('ocean_cube', cube.cache)
+    return cube
+
+
+def render():
+    store = current_store()
+    ingest = start_ingest()
+    cube = open_ocean_cube(store, store.table_version('oceanographic', 'locations'))
+    st.markdown("## 🗺️ Marine Digital Twin Visualization")
+    
+    # Map controls
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        layer_select = st.multiselect(
+            "Map Layers",
+            ["Temperature", "Salinity", "Species Distribution", "Current Flow", "Satellite Imagery"],
+            default=["Temperature", "Species Distribution"]
+        )
+        habitat = open_habitat_engine()
+        habitat_species = st.selectbox("Habitat Species", [ALL_SPECIES] + habitat.species())
+    
+    with col2:
+        depth_range = st.slider("Depth Range (m)", 0, 200, (0, 50))
+    
+    with col3:
+        time_slider = st.slider(
+            "Time",
+            min_value=cube.times[0].to_pydatetime(),
+            max_value=cube.times[-1].to_pydatetime(),
+            value=cube.times[-12].to_pydatetime(),
+            step=timedelta(hours=1),
+            format="MMM D, HH:00"
+        )
+    
+  
+    # Real-time data simulation
+    col1, col2, col3 = st.columns(3)
+    with col2:
+        # Base map never changes; markers go in a feature group added on top
+        m = folium.Map(
+            location=[19.0760, 72.8777],
+            zoom_start=8,
+            tiles='CartoDB dark_matter'
+        )
+        
+        # Padded viewport st_folium reported last run; the layer is rebuilt only when it or the controls change
+        view = st.session_state.get('twin_map') or {}
+        zoom = view.get('zoom') or 8
+        viewport = None
+        if view.get('bounds'):
+            south, west = view['bounds']['_southWest']['lat'], view['bounds']['_southWest']['lng']
+            north, east = view['bounds']['_northEast']['lat'], view['bounds']['_northEast']['lng']
+            pad_lat, pad_lon = (north - south) / 2, (east - west) / 2
+            viewport = (south - pad_lat, west - pad_lon, north + pad_lat, east + pad_lon)
+        show_habitat = "Species Distribution" in layer_select
+        ocean_layers = tuple(name for name in layer_select if name in LAYERS)
+        step = cube.step(time_slider)
+        # Rebuilt pyramids get a new version, and with it new tile URLs; the side server serves them
+        satellite = None
+        if "Satellite Imagery" in layer_select:
+            if start_side_server() is None:
+                st.info("🛰️ Satellite tiles are unavailable: the tile server could not start in this process.")
+            else:
+                satellite = open_satellite_tiles().refresh()
+        # st_folium re-parents and renders the layer it is given, so it is kept per session, not shared
+        layer_key = (store.version, viewport, zoom, show_habitat, habitat_species, depth_range, ocean_layers, step, satellite)
+        cached_key, marker_layer = st.session_state.get('twin_layer', (None, None))
+        if cached_key != layer_key:
+            with span('data'):
+                marker_layer = map_layer(
+                    store, habitat, cube, viewport, zoom, show_habitat, habitat_species, depth_range, ocean_layers, step,
+                    satellite
+                )
+            st.session_state.twin_layer = (layer_key, marker_layer)
+        
+        # Display map
+        with span('map'):
+            st_folium(
+                m,
+                key='twin_map',
+                width=800,
+                height=500,
+                feature_group_to_add=marker_layer,
+                returned_objects=['bounds', 'zoom']
+            )
+        
+    with col1:
+        st.markdown("### 📡 Real-time Sensors")
+        # Zero-copy views of the ingest ring buffers
+        latest_time, latest = ingest.buffers.latest_snapshot()
+        now_ns = pd.Timestamp.now(tz='UTC').tz_localize(None).value
+        seen = latest_time > 0
+        online = seen & (now_ns - latest_time < ONLINE_WITHIN.value)
+        st.caption(f"{int(online.sum())} of {len(ingest.buffers)} sensors online · {ingest.received:,} readings received")
+        recent = np.argsort(-latest_time, kind='stable')[:10]
+        age_min = (now_ns - latest_time[recent]) / 60e9
+        sensor_data = pd.DataFrame({
+            'Sensor_ID': [ingest.buffers.sensor_ids[i] for i in recent],
+            'Status': np.where(online[recent], 'Online', 'Offline'),
+            'Last_Update': np.where(seen[recent], np.char.add(age_min.round().astype(int).astype(str), ' min ago'), 'No data'),
+            'Battery': latest['Battery'][recent]
+        })
+        st.dataframe(sensor_data, use_container_width=True)
+    
+    with col3:
+        st.markdown("### 🌊 Current Conditions")
+        current_conditions = {
+            'Sea Surface Temp': '26.3°C',
+            'Wave Height': '1.2 m',
+            'Wind Speed': '15 km/h',
+            'Visibility': '8.5 km',
+            'Tide': 'High (+1.8m)'
+        }
+        
+        for condition, value in current_conditions.items():
+            st.metric(condition, value)
+
+
+def map_layer(store, habitat, cube, viewport, zoom, show_habitat, habitat_species, depth_range, ocean_layers, step,
+              satellite):
+    """Sensor clusters, stations, satellite, ocean and (optionally) habitat layers for one viewport."""
+    # Query the sensor grid index with the padded viewport
+    sensors, sensor_index = open_sensor_index(store, store.table_version('sensors'))
+    visible = sensor_index.query(*viewport) if viewport else np.arange(len(sensors))
+    
+    markers = clustered_features(
+        sensors['Latitude'].to_numpy()[visible],
+        sensors['Longitude'].to_numpy()[visible],
+        sensors['Sensor_ID'].to_numpy()[visible],
+        (sensors['Kind'] + ' · ' + sensors['Station']).to_numpy()[visible],
+        zoom
+    )
+    for feature in markers['features']:
+        feature['properties']['color'] = '#f7931e'
+    
+    locations_data = store.read(
+        'locations',
+        columns=['Latitude', 'Longitude', 'Location', 'Temperature', 'Species_Count']
+    )
+    markers['features'] += feature_collection(
+        locations_data['Latitude'],
+        locations_data['Longitude'],
+        {
+            'name': locations_data['Location'],
+            'detail': 'Temp: ' + locations_data['Temperature'].astype(str) + '°C, Species: '
+                      + locations_data['Species_Count'].astype(str),
+            'count': np.ones(len(locations_data), dtype=np.int64),
+            'radius': locations_data['Species_Count'] / 2,
+            'color': np.full(len(locations_data), '#00d4ff')
+        }
+    )['features']
+    
+    marker_layer = folium.FeatureGroup(name='Stations & Sensors')
+    if satellite is not None:
+        # One tile layer per scene, oldest first, served from the pyramid by the side server;
+        # past its native zoom Leaflet scales that zoom's tiles up instead of requesting more
+        scenes = open_satellite_tiles().scenes()
+        for name, scene in sorted(scenes.items(), key=lambda item: item[1]['time'] or ''):
+            folium.TileLayer(
+                tiles=start_side_server().url(f'/tiles/{name}/{{z}}/{{x}}/{{y}}.png', v=satellite),
+                attr=scene['source'] or name,
+                name=name,
+                min_zoom=scene['min_zoom'],
+                max_native_zoom=scene['native_zoom'],
+                max_zoom=18,
+                bounds=[scene['bounds'][:2], scene['bounds'][2:]],
+                overlay=True
+            ).add_to(marker_layer)
+    for name in ocean_layers:
+        # Depth-averaged field at this hour, read from the cube chunks the viewport covers
+        field, cells = cube.layer(name, step, depth_range, viewport)
+        if field is not None:
+            low, high = cube.ranges[name]
+            folium.raster_layers.ImageOverlay(
+                colorize((field - low) / max(high - low, 1e-9), stops=LAYER_COLORS[name], fade=False),
+                bounds=[[cells[0], cells[1]], [cells[2], cells[3]]],
+                mercator_project=True,
+                name=name
+            ).add_to(marker_layer)
+    if show_habitat:
+        # Suitability over the padded viewport, assembled from cached tiles
+        suitability, cells = habitat.raster(viewport, habitat_species, depth_range)
+        if suitability is not None:
+            folium.raster_layers.ImageOverlay(
+                colorize(suitability),
+                bounds=[[cells[0], cells[1]], [cells[2], cells[3]]],
+                mercator_project=True,
+                pixelated=False
+            ).add_to(marker_layer)
+    folium.GeoJson(
+        markers,
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.7, weight=1),
+        style_function=lambda feature: {
+            'radius': feature['properties']['radius'],
+            'color': feature['properties']['color'],
+            'fillColor': feature['properties']['color']
+        },
+        popup=folium.GeoJsonPopup(fields=['name', 'detail'], labels=False)
+    ).add_to(marker_layer)
+    return marker_layer